@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Compile public/locales/*.csv into namespace-sharded JSON bundles
+Each key namespace (accounts.*, dashboard.*, common.* ...) becomes its own small
+JSON file per language, precompressed with gzip (and brotli when installed), plus
+an index.json so the app can fetch only the namespaces a screen uses
+"""
+
+import os
+import gzip
+import json
+import glob
+import time
+import hashlib
+import argparse
+from locale_files import LOCALES_DIR, read_locale, write_bytes
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLES_DIR = os.path.join(LOCALES_DIR, 'bundles')
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+
+# Keys without a dot are grouped here
+ROOT_NAMESPACE = '_'
+
+def split_key(key):
+    """('accounts', 'account_name') for 'accounts.account_name'"""
+    namespace, dot, rest = key.partition('.')
+    return (namespace, rest) if dot and rest else (ROOT_NAMESPACE, key)
+
+def shard_locale(translations):
+    """
+    Group {key: translation} by namespace.
+    
+    Shard keys drop the namespace prefix; the loader adds it back. Empty
+    translations are left out so the app falls back as it does for the CSV.
+    """
+    shards = {}
+    for key, translation in translations.items():
+        if not translation:
+            continue
+        namespace, name = split_key(key)
+        shards.setdefault(namespace, {})[name] = translation
+    return {namespace: shards[namespace] for namespace in sorted(shards)}
+
+def encode_shard(shard):
+    return json.dumps(shard, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+def compress_variants(data):
+    """{suffix: bytes} of the precompressed copies to write next to a bundle"""
+    # mtime=0 keeps the gzip output identical between builds
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+def build_bundles(locale_paths, output_dir=BUNDLES_DIR):
+    """
+    Write {output_dir}/{lang}/{namespace}.json (+ .gz/.br) and the index.
+    
+    Returns (index, written) where written counts files whose content changed.
+    Stale shards of namespaces that no longer exist are removed.
+    """
+    index = {'version': INDEX_VERSION, 'languages': {}}
+    written = 0
+    
+    for path in locale_paths:
+        lang = os.path.splitext(os.path.basename(path))[0]
+        lang_dir = os.path.join(output_dir, lang)
+        os.makedirs(lang_dir, exist_ok=True)
+        
+        entries = {}
+        expected = set()
+        for namespace, shard in shard_locale(read_locale(path)).items():
+            data = encode_shard(shard)
+            file_name = f"{namespace}.json"
+            entry = {
+                'file': f"{lang}/{file_name}",
+                'keys': len(shard),
+                'bytes': len(data),
+                'sha256': hashlib.sha256(data).hexdigest(),
+            }
+            
+            written += write_bytes(os.path.join(lang_dir, file_name), data)
+            expected.add(file_name)
+            for suffix, compressed in compress_variants(data).items():
+                written += write_bytes(os.path.join(lang_dir, file_name + suffix), compressed)
+                expected.add(file_name + suffix)
+                entry[suffix.lstrip('.') + '_bytes'] = len(compressed)
+            
+            entries[namespace] = entry
+        
+        for existing in os.listdir(lang_dir):
+            if existing not in expected:
+                os.remove(os.path.join(lang_dir, existing))
+        
+        index['languages'][lang] = entries
+    
+    data = json.dumps(index, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8')
+    written += write_bytes(os.path.join(output_dir, INDEX_FILE), data)
+    
+    return index, written
+
+def report(index, locale_paths):
+    """Per-language comparison of the CSV against the sharded bundles"""
+    csv_sizes = {os.path.splitext(os.path.basename(path))[0]: os.path.getsize(path) for path in locale_paths}
+    
+    for lang, entries in index['languages'].items():
+        raw = sum(entry['bytes'] for entry in entries.values())
+        gz = sum(entry['gz_bytes'] for entry in entries.values())
+        largest = max(entries.items(), key=lambda item: item[1]['gz_bytes'], default=(None, None))[0]
+        line = (f"  {lang.upper()}: {len(entries)} namespaces, CSV {csv_sizes[lang]:,} bytes → "
+                f"JSON {raw:,} bytes, gzip {gz:,} bytes")
+        if brotli is not None:
+            line += f", brotli {sum(entry['br_bytes'] for entry in entries.values()):,} bytes"
+        if largest:
+            line += f" (largest shard: {largest}, {entries[largest]['gz_bytes']:,} bytes gzip)"
+        print(line)
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Compile locale CSVs into namespace-sharded JSON bundles')
+    parser.add_argument('--locales-dir', default=LOCALES_DIR,
+                        help=f'directory holding the locale CSVs (default: {LOCALES_DIR})')
+    parser.add_argument('--output-dir', default=None,
+                        help='bundle output directory (default: <locales-dir>/bundles)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_dir = args.output_dir or os.path.join(args.locales_dir, 'bundles')
+    
+    locale_paths = sorted(glob.glob(os.path.join(args.locales_dir, '*.csv')))
+    if not locale_paths:
+        print(f"❌ No locale files found in {args.locales_dir}")
+        return
+    
+    print(f"Compiling {len(locale_paths)} locale files from {args.locales_dir}...")
+    if brotli is None:
+        print("   (brotli not installed; writing gzip only)")
+    
+    start = time.perf_counter()
+    index, written = build_bundles(locale_paths, output_dir)
+    elapsed = time.perf_counter() - start
+    
+    report(index, locale_paths)
+    print(f"✅ Bundles written to {output_dir} ({written} files updated, {elapsed:.2f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,45 @@
 #!/usr/bin/env python3
 """
 Extract translatable strings from React/TypeScript application
-Generates CSV template for external translation
+Generates CSV template for external translation, and on request a key -> file:line
+usage index (--usage) and a report of locale keys nothing uses (--unused, --prune)
 """
 
 import os
 import re
 import csv
+import json
+import time
+import hashlib
+import argparse
+import threading
+from bisect import bisect_right
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from translation_catalogue import TranslationCatalogue
+from locale_files import LANGUAGES, LOCALES_DIR, locale_path, prune_locale, read_locale
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None  # --watch falls back to polling
+
+# Extraction manifest: per-file content hash plus the strings and t() calls it produced
+CACHE_FILE = '.translations_cache.json'
+CACHE_VERSION = 2
+
+OUTPUT_FILE = 'translations_template.csv'
+PUBLIC_OUTPUT_FILE = os.path.join('public', 'translations_template.csv')
+
+# Reverse index (key -> file:line) and the dead-key report
+USAGE_FILE = 'translations_usage.csv'
+UNUSED_FILE = 'translations_unused.csv'
+
+# t('key') calls mark a key as used; t(`prefix.${...}`) marks every key under the
+# static prefix. Plain .ts files are only searched for these calls.
+KEY_CALL_RE = re.compile(r"""\bt\(\s*(['"`])([A-Za-z0-9_.\-]+)\1""")
+KEY_PREFIX_RE = re.compile(r"""\bt\(\s*`([A-Za-z0-9_.\-]*)\$\{""")
 
 # Patterns to extract strings
 PATTERNS = [
@@ -35,6 +66,41 @@ IGNORE_PATTERNS = [
     r'^(px|rem|em|%|vh|vw)$',  # CSS units
 ]
 
+# Precompiled rules shared by both extraction engines
+COMPILED_PATTERNS = {context: re.compile(pattern, re.MULTILINE) for pattern, context in PATTERNS}
+IGNORE_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in IGNORE_PATTERNS))
+
+def scan_branch(pattern, context):
+    """
+    (anchor, branch, back) of one PATTERNS rule in SCAN_RE.
+    
+    Every rule starts with a fixed literal. The scan stops on one character of
+    it (the '=' of an attribute, else the first one) so the combined pattern
+    only has three first characters; the rest of the literal is checked by a
+    lookbehind, and the whole rule runs in a lookahead named after its context,
+    so rules can overlap each other as they do with one pass each. back is how
+    far the rule's match starts before the anchor.
+    """
+    literal = re.match(r'[^\\\[\](){}.*+?|^$]*', pattern).group()
+    back = literal.find('=') if '=' in literal else 0
+    lookbehind = f'(?<={re.escape(literal[:back + 1])})' if back else ''
+    return literal[back], f'{lookbehind}(?=(?P<{context}>{pattern[back + 1:]}))', back
+
+def compile_scan(patterns):
+    """(SCAN_RE, {context: back}): every rule in one alternation, grouped by anchor"""
+    branches = {}
+    back = {}
+    for pattern, context in patterns:
+        anchor, branch, back[context] = scan_branch(pattern, context)
+        branches.setdefault(anchor, []).append(branch)
+    alternation = '|'.join(f"{re.escape(anchor)}(?:{'|'.join(group)})" for anchor, group in branches.items())
+    return re.compile(alternation, re.MULTILINE), back
+
+# Single-pass engine: one finditer per file over the combined rules
+SCAN_RE, SCAN_BACK = compile_scan(PATTERNS)
+
+ENGINES = ('regex', 'scan')
+
 # Common words that appear frequently (extract once)
 COMMON_TRANSLATIONS = {
     'Save': 'common.save',
@@ -81,12 +147,9 @@ def should_ignore(text):
     """Check if text should be ignored"""
     if not text or len(text) < 3:
         return True
-    for pattern in IGNORE_PATTERNS:
-        if re.match(pattern, text):
-            return True
-    return False
+    return IGNORE_RE.match(text) is not None
 
-def extract_from_file(filepath):
+def extract_from_file(filepath, engine='regex'):
     """Extract translatable strings from a single file"""
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
@@ -94,17 +157,68 @@ def extract_from_file(filepath):
     except:
         return []
     
+    return extract_from_content(content, engine)
+
+def extract_from_content(content, engine='regex', lines=False):
+    """
+    Extract translatable strings from already-loaded file content.
+    
+    Items are (text, context), or (text, context, line) with lines=True.
+    """
+    if engine == 'scan':
+        return extract_with_scan(content, lines)
+    return extract_with_regex(content, lines)
+
+def line_locator(content):
+    """Function mapping an offset in content to its 1-based line number"""
+    newlines = [match.start() for match in re.finditer('\n', content)]
+    return lambda offset: bisect_right(newlines, offset - 1) + 1
+
+def extract_with_regex(content, lines=False):
+    """Default engine: one full pass over the content per pattern"""
     found = []
+    line_of = line_locator(content) if lines else None
     
     for pattern, context in PATTERNS:
-        matches = re.finditer(pattern, content, re.MULTILINE)
+        matches = COMPILED_PATTERNS[context].finditer(content)
         for match in matches:
             text = match.group(1).strip()
             if not should_ignore(text):
-                found.append((text, context))
+                found.append((text, context, line_of(match.start(1))) if lines else (text, context))
     
     return found
 
+def extract_with_scan(content, lines=False):
+    """
+    Single-pass engine: one finditer of SCAN_RE over the content.
+    
+    Each rule keeps its own resume offset so its matches never overlap, which
+    reproduces finditer() per rule; results are grouped per rule in PATTERNS
+    order so the output is identical to extract_with_regex().
+    """
+    found = {context: [] for _, context in PATTERNS}
+    resume = dict.fromkeys(found, 0)
+    line_of = line_locator(content) if lines else None
+    
+    for match in SCAN_RE.finditer(content):
+        context = match.lastgroup
+        if match.start() - SCAN_BACK[context] < resume[context]:
+            continue
+        resume[context] = match.end(context)
+        group = match.lastindex + 1
+        text = match.group(group).strip()
+        if not should_ignore(text):
+            found[context].append((text, context, line_of(match.start(group))) if lines else (text, context))
+    
+    return [item for _, context in PATTERNS for item in found[context]]
+
+def find_key_calls(content):
+    """[key, line, kind] of every t('key') call ('t') and t(`prefix${...}`) prefix ('t_prefix')"""
+    line_of = line_locator(content)
+    calls = [[match.group(2), line_of(match.start()), 't'] for match in KEY_CALL_RE.finditer(content)]
+    calls.extend([match.group(1), line_of(match.start()), 't_prefix'] for match in KEY_PREFIX_RE.finditer(content))
+    return calls
+
 def generate_key(text, module, context):
     """Generate a translation key from text and context"""
     # Check if it's a common word
@@ -142,23 +256,148 @@ def get_module_from_path(filepath):
     
     return 'common'
 
-def main():
-    src_dir = Path('src')
-    translations = {}
+def rules_fingerprint():
+    """Fingerprint of the extraction rules, so editing them invalidates the cache"""
+    payload = json.dumps([PATTERNS, IGNORE_PATTERNS, KEY_CALL_RE.pattern, KEY_PREFIX_RE.pattern])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def decode_source(data):
+    """Decode raw file bytes the same way open(..., 'r') would"""
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def load_cache(cache_file):
+    """Load the extraction manifest, or an empty one if missing or stale"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
     
-    print("Scanning application files...")
+    if data.get('version') != CACHE_VERSION or data.get('rules') != rules_fingerprint():
+        return {}
     
-    # Scan all TSX files
-    tsx_files = list(src_dir.glob('**/*.tsx'))
-    print(f"Found {len(tsx_files)} files to scan")
+    return data.get('files', {})
+
+def save_cache(cache_file, entries):
+    """Atomically write the extraction manifest"""
+    data = {
+        'version': CACHE_VERSION,
+        'rules': rules_fingerprint(),
+        'files': entries
+    }
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_file, cache_file)
+
+def scan_file(filepath, cached_hash=None, engine='regex'):
+    """
+    Read, hash and extract a single file.
+    
+    Runs in worker processes when scanning in parallel. Returns (digest, found)
+    where found is {'strings': [[text, context, line]], 'calls': [[key, line, kind]]},
+    or (digest, None) when the content hash matches cached_hash; returns None when
+    the file cannot be read.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == cached_hash:
+        return digest, None
+    
+    content = decode_source(data)
+    if content is None:
+        return digest, {'strings': [], 'calls': []}
+    strings = extract_from_content(content, engine, lines=True)
+    return digest, {'strings': [list(item) for item in strings], 'calls': find_key_calls(content)}
+
+def scan_files(tsx_files, cache, jobs=1, engine='regex'):
+    """
+    Extract strings from every file, reusing cached results where possible.
+    
+    A file is a cache hit when its size and mtime are unchanged, or when its
+    content hash still matches (e.g. after a checkout that only touched mtimes).
+    With jobs > 1 the remaining files are scanned on a process pool; results
+    are collected in input order so the output matches a serial run.
+    Returns (entries, stats) where entries maps path -> manifest entry.
+    """
+    entries = {}
+    stats = {'hits': 0, 'misses': 0, 'added': 0, 'deleted': 0}
+    pending = []
+    
+    for filepath in tsx_files:
+        path = str(filepath)
+        cached = cache.get(path)
+        
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            continue
+        
+        if cached and cached['mtime_ns'] == st.st_mtime_ns and cached['size'] == st.st_size:
+            entries[path] = cached
+            stats['hits'] += 1
+        else:
+            entries[path] = None
+            pending.append((path, st, cached))
+    
+    paths = [path for path, _, _ in pending]
+    hashes = [cached['hash'] if cached else None for _, _, cached in pending]
+    engines = [engine] * len(pending)
+    
+    if jobs > 1 and len(pending) > 1:
+        chunksize = max(1, len(pending) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(scan_file, paths, hashes, engines, chunksize=chunksize))
+    else:
+        results = [scan_file(path, digest, engine) for path, digest in zip(paths, hashes)]
+    
+    for (path, st, cached), result in zip(pending, results):
+        if result is None:
+            del entries[path]
+            continue
+        
+        digest, found = result
+        if found is None:
+            found = {'strings': cached['strings'], 'calls': cached['calls']}
+            stats['hits'] += 1
+        else:
+            stats['misses'] += 1
+            if not cached:
+                stats['added'] += 1
+        
+        entries[path] = {
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'hash': digest,
+            'strings': found['strings'],
+            'calls': found['calls']
+        }
+    
+    stats['deleted'] = len(set(cache) - set(entries))
+    return entries, stats
+
+def build_translations(tsx_files, entries):
+    """Merge per-file strings into the key table (first occurrence wins)"""
+    translations = {}
     
     for filepath in tsx_files:
+        entry = entries.get(str(filepath))
+        if entry is None:
+            continue
+        
         module = get_module_from_path(str(filepath))
         screen = filepath.stem
         
-        strings = extract_from_file(filepath)
-        
-        for text, context in strings:
+        for text, context, _ in entry['strings']:
             key = generate_key(text, module, context)
             
             # Avoid duplicates
@@ -173,21 +412,368 @@ def main():
                     'screen': screen
                 }
     
-    print(f"Extracted {len(translations)} unique strings")
-    
-    # Write to CSV
-    output_file = 'translations_template.csv'
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+    return translations
+
+def write_template(translations, output_file):
+    """Atomically write the key table to a CSV template sorted by key"""
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=['key', 'en', 'es', 'fr', 'ar', 'context', 'screen'])
         writer.writeheader()
         
         # Sort by key
         for key in sorted(translations.keys()):
             writer.writerow(translations[key])
+    os.replace(tmp_file, output_file)
+
+def publish_template(translations, outputs, catalogue=None):
+    """
+    Write the key table to the template files, through the translation catalogue.
+    
+    The catalogue diff against the previous extraction is an indexed update
+    rather than a full rewrite; returns its {'added', 'changed', 'removed'}
+    counts, or None without a catalogue (--no-catalogue).
+    """
+    if catalogue is None:
+        for output_file in outputs:
+            write_template(translations, output_file)
+        return None
+    
+    stats = catalogue.sync_extraction(translations.values())
+    for output_file in outputs:
+        catalogue.export(output_file, 'template', 'extracted')
+    return stats
+
+def build_usage_index(tsx_files, entries, ts_files=()):
+    """
+    Reverse index of the sources: ({key: [(file, line, kind)]}, {prefix: [(file, line)]}).
+    
+    kind is the extraction context of a literal or 't' for a t('key') call; the
+    prefixes come from t(`prefix${...}`) calls. .ts files are scanned for calls
+    only (they are not in the extraction manifest).
+    """
+    usages = defaultdict(list)
+    prefixes = defaultdict(list)
+    
+    def add_calls(path, calls):
+        for key, line, kind in calls:
+            if kind == 't_prefix':
+                prefixes[key].append((path, line))
+            else:
+                usages[key].append((path, line, kind))
+    
+    for filepath in tsx_files:
+        entry = entries.get(str(filepath))
+        if entry is None:
+            continue
+        module = get_module_from_path(str(filepath))
+        for text, context, line in entry['strings']:
+            usages[generate_key(text, module, context)].append((str(filepath), line, context))
+        add_calls(str(filepath), entry['calls'])
+    
+    for filepath in ts_files:
+        try:
+            with open(filepath, 'rb') as f:
+                content = decode_source(f.read())
+        except OSError:
+            continue
+        if content is not None:
+            add_calls(str(filepath), find_key_calls(content))
+    
+    return usages, prefixes
+
+def write_usage(usages, prefixes, output_file):
+    """Atomically write the reverse index as key,file,line,kind rows sorted by key"""
+    rows = [(key, path, line, kind) for key, sites in usages.items() for path, line, kind in sites]
+    rows.extend((prefix + '*', path, line, 't_prefix') for prefix, sites in prefixes.items() for path, line in sites)
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['key', 'file', 'line', 'kind'])
+        writer.writerows(sorted(rows))
+    os.replace(tmp_file, output_file)
+    return len(rows)
+
+def find_unused(keys, usages, prefixes, keep=()):
+    """Keys referenced by no literal, t() call or dynamic t() prefix, nor kept by --keep"""
+    covered = tuple(prefixes) + tuple(keep)
+    return [key for key in keys if key not in usages and not key.startswith(covered)]
+
+def report_unused(locales_dir, usages, prefixes, keep, prune_dir=None):
+    """Print the dead keys of the locale files and optionally write pruned copies"""
+    locales = {lang: read_locale(locale_path(lang, locales_dir)) for lang in LANGUAGES}
+    keys = list(dict.fromkeys(key for translations in locales.values() for key in translations))
+    unused = find_unused(keys, usages, prefixes, keep)
+    called = {key for key, sites in usages.items() if any(kind == 't' for _, _, kind in sites)}
+    missing = sorted(key for key in called if not any(key in translations for translations in locales.values()))
+    
+    if '' in prefixes:
+        print("⚠️  A t(`${...}`) call has no static prefix, so every key counts as used")
+    print(f"{len(unused)} of {len(keys)} keys in {locales_dir} are not referenced in src/ "
+          f"({len(prefixes)} dynamic prefixes: {', '.join(sorted(prefixes)) or 'none'})")
+    namespaces = defaultdict(int)
+    for key in unused:
+        namespaces[key.partition('.')[0]] += 1
+    for namespace, count in sorted(namespaces.items(), key=lambda item: -item[1])[:10]:
+        print(f"   {namespace:<24} {count:>5}")
+    if missing:
+        print(f"⚠️  {len(missing)} key(s) passed to t() are in no locale file: {', '.join(missing[:10])}"
+              + (' ...' if len(missing) > 10 else ''))
+    
+    tmp_file = f"{UNUSED_FILE}.tmp"
+    with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['key', 'en'])
+        writer.writerows((key, locales['en'].get(key, '')) for key in unused)
+    os.replace(tmp_file, UNUSED_FILE)
+    print(f"   Full list: {UNUSED_FILE}")
+    
+    if prune_dir is None:
+        return unused
+    
+    os.makedirs(prune_dir, exist_ok=True)
+    unused_keys = set(unused)
+    for lang in LANGUAGES:
+        source = locale_path(lang, locales_dir)
+        if not os.path.exists(source):
+            continue
+        target = locale_path(lang, prune_dir)
+        before = os.path.getsize(source)
+        removed = prune_locale(source, target, unused_keys)
+        print(f"   {lang.upper()}: {len(locales[lang]) - removed} keys, {before:,} → "
+              f"{os.path.getsize(target):,} bytes ({target})")
+    return unused
+
+class ChangeTracker:
+    """
+    Collects change notifications and reports when a burst of them has settled.
+    
+    Doubles as a watchdog event handler (anything with a dispatch() method can be
+    scheduled on an Observer); without watchdog, poll() compares file stats.
+    """
+    
+    def __init__(self, src_dir, debounce):
+        self.src_dir = src_dir
+        self.debounce = debounce
+        self.lock = threading.Lock()
+        self.last_change = None
+        self.snapshot = self.take_snapshot()
+    
+    def take_snapshot(self):
+        snapshot = {}
+        for filepath in self.src_dir.glob('**/*.tsx'):
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                continue
+            snapshot[str(filepath)] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+    
+    def mark(self):
+        with self.lock:
+            self.last_change = time.monotonic()
+    
+    def dispatch(self, event):
+        paths = [event.src_path, getattr(event, 'dest_path', '')]
+        if any(str(path).endswith('.tsx') for path in paths):
+            self.mark()
+    
+    def poll(self):
+        snapshot = self.take_snapshot()
+        if snapshot != self.snapshot:
+            self.snapshot = snapshot
+            self.mark()
+    
+    def settled(self):
+        """True once, after changes stopped arriving for the debounce period"""
+        with self.lock:
+            if self.last_change is None or time.monotonic() - self.last_change < self.debounce:
+                return False
+            self.last_change = None
+            return True
+
+def watch(src_dir, args, jobs, catalogue=None):
+    """Keep the key table in memory and rewrite the template whenever it changes"""
+    outputs = [OUTPUT_FILE] + ([PUBLIC_OUTPUT_FILE] if args.public else [])
+    
+    tsx_files = list(src_dir.glob('**/*.tsx'))
+    cache = {} if args.no_cache else load_cache(args.cache_file)
+    entries, _ = scan_files(tsx_files, cache, jobs=jobs, engine=args.engine)
+    translations = build_translations(tsx_files, entries)
+    publish_template(translations, outputs, catalogue)
+    if not args.no_cache:
+        save_cache(args.cache_file, entries)
+    if args.usage:
+        write_usage(*build_usage_index(tsx_files, entries, src_dir.glob('**/*.ts')), args.usage)
+    
+    tracker = ChangeTracker(src_dir, args.debounce)
+    observer = None
+    if Observer is not None and not args.poll:
+        observer = Observer()
+        observer.schedule(tracker, str(src_dir), recursive=True)
+        observer.start()
+        mode = 'file-system events'
+    else:
+        mode = f'polling every {args.interval}s'
+    
+    print(f"👀 Watching {src_dir}/ ({mode}), {len(translations)} strings. Ctrl-C to stop.")
+    
+    try:
+        while True:
+            time.sleep(args.interval)
+            if observer is None:
+                tracker.poll()
+            if not tracker.settled():
+                continue
+            
+            start = time.perf_counter()
+            tsx_files = list(src_dir.glob('**/*.tsx'))
+            entries, stats = scan_files(tsx_files, entries, jobs=jobs, engine=args.engine)
+            if not stats['misses'] and not stats['deleted']:
+                continue
+            
+            updated = build_translations(tsx_files, entries)
+            if not args.no_cache:
+                save_cache(args.cache_file, entries)
+            # Line numbers move with every edit, so the index is rewritten even without key changes
+            if args.usage:
+                write_usage(*build_usage_index(tsx_files, entries, src_dir.glob('**/*.ts')), args.usage)
+            
+            elapsed = (time.perf_counter() - start) * 1000
+            if updated == translations:
+                print(f"   {stats['misses']} file(s) rescanned, no key changes ({elapsed:.0f} ms)")
+                continue
+            
+            added = len(updated.keys() - translations.keys())
+            removed = len(translations.keys() - updated.keys())
+            translations = updated
+            publish_template(translations, outputs, catalogue)
+            print(f"✅ {stats['misses']} file(s) rescanned: +{added} -{removed} keys, "
+                  f"{len(translations)} total ({elapsed:.0f} ms)")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+def run_benchmark(tsx_files, rounds):
+    """Compare extraction throughput of each engine and check their output agrees"""
+    contents = []
+    for filepath in tsx_files:
+        with open(filepath, 'rb') as f:
+            content = decode_source(f.read())
+        if content is not None:
+            contents.append(content)
+    
+    print(f"Benchmarking {len(contents)} files x {rounds} rounds...")
+    
+    outputs = {}
+    for engine in ENGINES:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            output = [extract_from_content(content, engine) for content in contents]
+        elapsed = time.perf_counter() - start
+        outputs[engine] = output
+        print(f"   {engine:<6} {len(contents) * rounds / elapsed:>8,.0f} files/sec "
+              f"({elapsed / rounds * 1000:.1f} ms per pass)")
+    
+    if outputs['regex'] == outputs['scan']:
+        print("✅ Engines produce identical output")
+    else:
+        print("❌ Engines disagree")
+    
+    return outputs['regex'] == outputs['scan']
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Extract translatable strings into a CSV template')
+    parser.add_argument('--cache-file', default=CACHE_FILE,
+                        help=f'extraction manifest path (default: {CACHE_FILE})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore the extraction manifest and rescan every file')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='number of worker processes for scanning (0 = one per CPU)')
+    parser.add_argument('--engine', choices=ENGINES, default='regex',
+                        help='extraction engine: regex (one pass per rule) or scan (one pass per file) (default: regex)')
+    parser.add_argument('--benchmark', type=int, nargs='?', const=20, metavar='ROUNDS',
+                        help='benchmark both engines on src/ instead of writing the template')
+    parser.add_argument('--public', action='store_true',
+                        help=f'also write {PUBLIC_OUTPUT_FILE}')
+    parser.add_argument('--no-catalogue', action='store_true',
+                        help='write the template directly without updating the translation catalogue')
+    parser.add_argument('--usage', nargs='?', const=USAGE_FILE, metavar='FILE',
+                        help=f'write the key -> file:line reverse index (default file: {USAGE_FILE})')
+    parser.add_argument('--unused', action='store_true',
+                        help=f'report locale keys no source references (full list in {UNUSED_FILE})')
+    parser.add_argument('--prune', metavar='DIR',
+                        help='like --unused, and write the locale files without those keys to DIR '
+                             '(the locales dir itself prunes in place)')
+    parser.add_argument('--keep', action='append', default=[], metavar='PREFIX',
+                        help='with --unused/--prune, never report keys starting with PREFIX (repeatable)')
+    parser.add_argument('--locales-dir', default=LOCALES_DIR,
+                        help=f'locale files checked by --unused/--prune (default: {LOCALES_DIR})')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and regenerate the template when sources change')
+    parser.add_argument('--poll', action='store_true',
+                        help='with --watch, poll file stats even if watchdog is installed')
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='with --watch, seconds between change checks (default: 0.5)')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help='with --watch, quiet period before rescanning (default: 0.3)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    src_dir = Path('src')
+    
+    print("Scanning application files...")
+    
+    # Scan all TSX files
+    tsx_files = list(src_dir.glob('**/*.tsx'))
+    print(f"Found {len(tsx_files)} files to scan")
+    
+    if args.benchmark:
+        return run_benchmark(tsx_files, args.benchmark)
+    
+    catalogue = None if args.no_catalogue else TranslationCatalogue()
+    
+    if args.watch:
+        return watch(src_dir, args, jobs, catalogue)
+    
+    cache = {} if args.no_cache else load_cache(args.cache_file)
+    entries, stats = scan_files(tsx_files, cache, jobs=jobs, engine=args.engine)
+    
+    if not args.no_cache:
+        save_cache(args.cache_file, entries)
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['added']} new), {stats['deleted']} deleted")
+    
+    translations = build_translations(tsx_files, entries)
+    
+    print(f"Extracted {len(translations)} unique strings")
+    
+    # Write to CSV
+    output_file = OUTPUT_FILE
+    stats = publish_template(translations, [output_file] + ([PUBLIC_OUTPUT_FILE] if args.public else []), catalogue)
+    if stats is not None:
+        print(f"Catalogue: +{stats['added']} new, {stats['changed']} changed, "
+              f"{stats['removed']} no longer extracted")
+        catalogue.close()
     
     print(f"✅ CSV template generated: {output_file}")
     print(f"   Total translations: {len(translations)}")
     print(f"   Ready for external translation")
+    
+    if args.usage or args.unused or args.prune:
+        ts_files = list(src_dir.glob('**/*.ts'))
+        usages, prefixes = build_usage_index(tsx_files, entries, ts_files)
+        if args.usage:
+            rows = write_usage(usages, prefixes, args.usage)
+            print(f"✅ Usage index: {len(usages)} keys, {rows} references → {args.usage}")
+        if args.unused or args.prune:
+            report_unused(args.locales_dir, usages, prefixes, args.keep, args.prune)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,158 @@
+"""
+Read and write the key,translation locale CSVs (public/locales/*.csv, *_final.csv)
+Parsing mirrors parseCSV in src/hooks/useTranslation.ts: everything after the first
+comma is the translation, so hand-edited rows with unquoted commas survive a round trip
+"""
+
+import io
+import os
+import csv
+
+LOCALES_DIR = os.path.join('public', 'locales')
+LANGUAGES = ['en', 'es', 'fr', 'ar']
+
+def locale_path(lang, locales_dir=LOCALES_DIR):
+    return os.path.join(locales_dir, f'{lang}.csv')
+
+def parse_locale(lines):
+    """Return {key: translation} in file order from an iterable of CSV lines"""
+    translations = {}
+    reader = csv.reader(lines)
+    next(reader, None)  # header
+    for row in reader:
+        if not row or not row[0].strip():
+            continue
+        translations[row[0].strip()] = ','.join(row[1:]).strip()
+    
+    return translations
+
+def read_locale(path):
+    """Return {key: translation} in file order; a missing file is an empty locale"""
+    if not os.path.exists(path):
+        return {}
+    
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return parse_locale(f)
+
+def detect_line_terminator(path, default='\r\n'):
+    """Keep whatever line ending an existing locale file already uses"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(4096)
+    except OSError:
+        return default
+    if b'\r\n' in head:
+        return '\r\n'
+    return '\n' if b'\n' in head else default
+
+def write_locale(path, translations, line_terminator=None):
+    """Atomically write {key: translation} as a key,translation CSV"""
+    if line_terminator is None:
+        line_terminator = detect_line_terminator(path)
+    
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator=line_terminator)
+        writer.writerow(['key', 'translation'])
+        for key, translation in translations.items():
+            writer.writerow([key, translation])
+    os.replace(tmp_path, path)
+
+def write_bytes(path, data):
+    """Atomically write data, leaving an identical file untouched"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+def format_row(key, translation):
+    """One key,translation line, quoted the way csv.writer (and parseCSV) expect"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='').writerow([key, translation])
+    return buffer.getvalue()
+
+def update_locale(path, updates, line_terminator=None):
+    """
+    Apply {key: translation} to a locale file in place.
+    
+    Only rows whose key is updated are rewritten, every other line is kept byte
+    for byte (quoted values may span several lines, as in prune_locale); keys
+    not yet in the file are appended in the order given.
+    Returns the number of rows rewritten or added.
+    """
+    if not os.path.exists(path):
+        write_locale(path, updates, line_terminator)
+        return len(updates)
+    
+    if line_terminator is None:
+        line_terminator = detect_line_terminator(path)
+    
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        source = f.readlines()
+    
+    lines = source[:1]
+    reader = csv.reader(source[1:])
+    consumed = 0
+    pending = dict(updates)
+    changed = 0
+    for row in reader:
+        span = source[1 + consumed:1 + reader.line_num]
+        consumed = reader.line_num
+        key = row[0].strip() if row else ''
+        pending.pop(key, None)
+        if key not in updates or ','.join(row[1:]).strip() == updates[key]:
+            lines.extend(span)
+            continue
+        ending = span[-1][len(span[-1].rstrip('\r\n')):] or line_terminator
+        lines.append(format_row(key, updates[key]) + ending)
+        changed += 1
+    
+    if lines and not lines[-1].endswith(('\n', '\r')):
+        lines[-1] += line_terminator
+    for key, translation in pending.items():
+        lines.append(format_row(key, translation) + line_terminator)
+        changed += 1
+    
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(lines)
+    os.replace(tmp_path, path)
+    
+    return changed
+
+def prune_locale(path, output_path, keys):
+    """
+    Write the locale file at path to output_path without the rows of keys.
+    
+    Every kept row is copied byte for byte, including quoted values that span
+    several lines; output_path may be path itself. Returns the rows removed.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        lines = f.readlines()
+    
+    kept = lines[:1]
+    reader = csv.reader(lines[1:])
+    consumed = 0
+    removed = 0
+    for row in reader:
+        span = lines[1 + consumed:1 + reader.line_num]
+        consumed = reader.line_num
+        if row and row[0].strip() in keys:
+            removed += 1
+            continue
+        kept.extend(span)
+    
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(kept)
+    os.replace(tmp_path, output_path)
+    
+    return removed
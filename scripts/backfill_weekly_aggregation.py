@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Parallel, resumable backfill of the E2E DB weekly tables through PostgREST
+Splits the history into (account, week) units and computes them on a process pool
+with the same engine as scripts/weekly_aggregation.py, instead of walking the weeks
+one by one in the setup_etl_cron.sql DO loop and the accounts one by one in the
+edge function.
+
+Each unit reads its account week of one_db, replaces the account week in
+weekly_routes, weekly_carriers, weekly_products, weekly_cities and weekly_regions
+(delete, then insert, so a unit can be run any number of times) and logs itself in
+etl_log under the --run label (migration 20260208_etl_log_backfill_units.sql).
+Running the same --run again skips the units already logged as success, so an
+interrupted or partly failed backfill resumes where it stopped. Every process
+can run a unit at a time, but at most --db-concurrency PostgREST requests are in
+flight across all of them.
+
+Usage:
+    SUPABASE_URL=https://<project>.supabase.co SUPABASE_SERVICE_ROLE_KEY=... \\
+        python3 scripts/backfill_weekly_aggregation.py --since 2024-01-01 --run thresholds-2026-10
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from insert_demo2_seed_data import SUPABASE_URL, SUPABASE_KEY, RestError, RestSession
+from transit_histograms import HISTOGRAM_COLUMN, parse_histogram
+from weekly_aggregation import (SHIPMENT_FIELDS, TABLE_COLUMNS, WEEK_END_DAYS, aggregate_all, aggregate_routes,
+                                table_chunks)
+
+ETL_VERSION = '1.0-backfill'
+LOG_CONFLICT = 'backfill_run,account_id,week_start_date'
+
+# PostgREST caps responses at 1000 rows by default (max-rows)
+PAGE_SIZE = 1000
+INSERT_ROWS = 1000
+DB_CONCURRENCY = 8
+PROGRESS_SECONDS = 10
+
+class Worker:
+    """Per-process state, set up by init_worker"""
+    session = None
+    db_slots = None
+    region_lookups = {}
+
+def init_worker(url, key, db_slots):
+    Worker.session = RestSession(url, key)
+    Worker.db_slots = db_slots
+    Worker.region_lookups = {}
+
+def db(method, path, rows=None, headers=None):
+    """One PostgREST request, holding one of the DB slots shared by every process"""
+    body = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8') if rows is not None else None
+    if body is not None:
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+    with Worker.db_slots:
+        return Worker.session.request(method, path, body, headers)
+
+def fetch_all(table, columns, filters='', page_size=PAGE_SIZE):
+    """Every matching row, paged by id so pages stay cheap however deep they go"""
+    rows = []
+    last_id = None
+    while True:
+        after = f"&id=gt.{last_id}" if last_id else ''
+        page = db('GET', f"/{table}?select=id,{columns}{filters}{after}&order=id&limit={page_size}")
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        last_id = page[-1]['id']
+
+def region_lookup(account_id, page_size):
+    """{(account_id, city name): region name}, fetched once per account and process"""
+    if account_id not in Worker.region_lookups:
+        regions = fetch_all('regions', 'name', f"&account_id=eq.{account_id}", page_size)
+        names = {region['id']: region['name'] for region in regions}
+        cities = fetch_all('cities', 'name,region_id', f"&account_id=eq.{account_id}", page_size)
+        Worker.region_lookups[account_id] = {(account_id, city['name']): names.get(city['region_id']) or None
+                                             for city in cities}
+    return Worker.region_lookups[account_id]
+
+def json_value(value):
+    # NaN is not valid JSON; Postgres gets NULL like the edge function would send
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+def json_rows(chunk, columns):
+    rows = [{column: json_value(value) for column, value in zip(columns, values)}
+            for values in zip(*(chunk[column] for column in columns))]
+    if HISTOGRAM_COLUMN in columns:
+        for row in rows:
+            row[HISTOGRAM_COLUMN] = parse_histogram(row[HISTOGRAM_COLUMN])
+    return rows
+
+def replace_unit(account_id, week_start, tables, week_end_days):
+    """Replace one account week in every weekly table; returns the rows written per table"""
+    unit = f"account_id=eq.{account_id}&week_start_date=eq.{week_start}"
+    for table in TABLE_COLUMNS:
+        db('DELETE', f"/{table}?{unit}")
+    
+    written = {}
+    for table, columns in TABLE_COLUMNS.items():
+        written[table] = 0
+        if tables is None:
+            continue
+        for chunk in table_chunks(tables[table], columns, week_end_days, INSERT_ROWS):
+            rows = json_rows(chunk, columns)
+            db('POST', f"/{table}", rows, {'Prefer': 'return=minimal'})
+            written[table] += len(rows)
+    return written
+
+def log_unit(entry):
+    db('POST', f"/etl_log?on_conflict={LOG_CONFLICT}", [entry],
+       {'Prefer': 'resolution=merge-duplicates,return=minimal'})
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+def process_unit(account_id, week_start, run, week_end_days, page_size):
+    """Compute and store one account week; runs in a pool process"""
+    started = time.perf_counter()
+    requests, retries = Worker.session.requests, Worker.session.retries
+    week_end = (datetime.date.fromisoformat(week_start) + datetime.timedelta(days=week_end_days)).isoformat()
+    entry = {
+        'backfill_run': run, 'account_id': account_id,
+        'week_start_date': week_start, 'week_end_date': week_end,
+        'execution_start': now(), 'execution_end': None, 'status': 'running',
+        'records_processed': 0, 'routes_created': 0, 'error_message': None, 'etl_version': ETL_VERSION,
+    }
+    result = {'account_id': account_id, 'week_start_date': week_start, 'shipments': 0, 'routes': 0, 'error': None}
+    
+    try:
+        log_unit(entry)
+        rows = fetch_all('one_db', ','.join(SHIPMENT_FIELDS),
+                         f"&account_id=eq.{account_id}&sent_at=gte.{week_start}&sent_at=lte.{week_end}", page_size)
+        tables = None
+        if rows:
+            shipments = {field: [row[field] for row in rows] for field in SHIPMENT_FIELDS}
+            routes, result['shipments'] = aggregate_routes(shipments, region_lookup(account_id, page_size),
+                                                           week_end_days, week_start, week_start)
+            tables = aggregate_all(routes)
+        result['routes'] = replace_unit(account_id, week_start, tables, week_end_days)['weekly_routes']
+        entry.update(status='success', records_processed=result['shipments'], routes_created=result['routes'])
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        entry.update(status='error', error_message=result['error'][:2000])
+    
+    entry['execution_end'] = now()
+    try:
+        log_unit(entry)
+    except RestError as e:
+        result['error'] = result['error'] or f"etl_log: {e}"
+    
+    result['seconds'] = time.perf_counter() - started
+    result['requests'] = Worker.session.requests - requests
+    result['retries'] = Worker.session.retries - retries
+    return result
+
+def week_starts(since, until):
+    """Mondays of the weeks from since to until (both snapped back to their Monday)"""
+    first = datetime.date.fromisoformat(since)
+    first -= datetime.timedelta(days=first.weekday())
+    last = datetime.date.fromisoformat(until)
+    last -= datetime.timedelta(days=last.weekday())
+    return [(first + datetime.timedelta(weeks=i)).isoformat() for i in range((last - first).days // 7 + 1)]
+
+def last_complete_week():
+    """Monday of last week, the week the weekly cron run aggregates"""
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    return (today - datetime.timedelta(days=today.weekday() + 7)).isoformat()
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+def print_progress(done, total, failed, shipments, elapsed):
+    rate = done / elapsed * 60 if elapsed else 0
+    eta = format_duration((total - done) / rate * 60) if rate else '?'
+    print(f"  {done:>7,}/{total:,} account-weeks  {rate:8,.1f} account-weeks/min  "
+          f"{shipments:>11,} shipments  {failed} failed  ETA {eta}", flush=True)
+
+def run_units(units, args, week_end_days, db_slots):
+    """Run the units on the pool; returns the results of the units that finished"""
+    results = []
+    shipments = failed = 0
+    start = last_report = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker,
+                                   initargs=(SUPABASE_URL, SUPABASE_KEY, db_slots))
+    try:
+        futures = [executor.submit(process_unit, account_id, week_start, args.run, week_end_days, args.page_size)
+                   for account_id, week_start in units]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            shipments += result['shipments']
+            if result['error']:
+                failed += 1
+                print(f"  ❌ {result['account_id']} {result['week_start_date']}: {result['error']}", flush=True)
+            if time.perf_counter() - last_report >= PROGRESS_SECONDS:
+                last_report = time.perf_counter()
+                print_progress(len(results), len(units), failed, shipments, last_report - start)
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        print(f"\n⚠️  Interrupted after {len(results):,} account-weeks; "
+              f"run again with --run {args.run} to resume")
+        raise SystemExit(130)
+    executor.shutdown()
+    return results
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Backfill the E2E DB weekly tables in parallel, per account week')
+    parser.add_argument('--since', required=True, help='first week to compute (YYYY-MM-DD, snapped to Monday)')
+    parser.add_argument('--until', help='last week to compute (default: last complete week)')
+    parser.add_argument('--account', action='append',
+                        help='account id to backfill (repeatable; default: every account)')
+    parser.add_argument('--week-end', choices=WEEK_END_DAYS, default='sunday',
+                        help='last day of each week: sunday as the setup_etl_cron.sql backfill, '
+                             'saturday as the weekly cron run (default: sunday)')
+    parser.add_argument('--run', help='run label in etl_log; reuse it to resume (default: derived from the range)')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count(),
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--db-concurrency', type=int, default=DB_CONCURRENCY,
+                        help=f'max PostgREST requests in flight across all workers (default: {DB_CONCURRENCY})')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE,
+                        help=f'rows per read request, at most the API max-rows (default: {PAGE_SIZE})')
+    parser.add_argument('--force', action='store_true', help='recompute units already logged as success in this run')
+    parser.add_argument('--dry-run', action='store_true', help='only report how many units would run')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    week_end_days = WEEK_END_DAYS[args.week_end]
+    until = args.until or last_complete_week()
+    args.run = args.run or f"backfill-{args.since}-{until}-{args.week_end}"
+    
+    if not SUPABASE_KEY:
+        print("❌ Error: SUPABASE_SERVICE_ROLE_KEY environment variable not set")
+        sys.exit(1)
+    
+    db_slots = multiprocessing.BoundedSemaphore(args.db_concurrency)
+    init_worker(SUPABASE_URL, SUPABASE_KEY, db_slots)
+    weeks = week_starts(args.since, until)
+    accounts = args.account or [account['id'] for account in fetch_all('accounts', 'id', page_size=args.page_size)]
+    units = [(account_id, week_start) for week_start in weeks for account_id in accounts]
+    
+    done = set()
+    if not args.force:
+        try:
+            logged = fetch_all('etl_log', 'account_id,week_start_date',
+                               f"&backfill_run=eq.{args.run}&status=eq.success", args.page_size)
+        except RestError as e:
+            if e.status != 400:
+                raise
+            print(f"❌ Error: etl_log has no backfill columns (run migration 20260208_etl_log_backfill_units.sql)\n"
+                  f"   {e.message}")
+            sys.exit(1)
+        done = {(entry['account_id'], entry['week_start_date']) for entry in logged}
+    pending = [unit for unit in units if unit not in done]
+    
+    print(f"Run {args.run}: {len(accounts):,} accounts x {len(weeks):,} weeks ({weeks[0]} to {weeks[-1]}) = "
+          f"{len(units):,} account-weeks, {len(units) - len(pending):,} already done, {len(pending):,} to run")
+    if args.dry_run or not pending:
+        if not pending and units:
+            print("✅ Nothing to do (use --force or a new --run to recompute)")
+        return
+    print(f"   {args.jobs} processes, {args.db_concurrency} concurrent DB requests\n")
+    
+    start = time.perf_counter()
+    results = run_units(pending, args, week_end_days, db_slots)
+    elapsed = time.perf_counter() - start
+    
+    failed = sum(1 for result in results if result['error'])
+    shipments = sum(result['shipments'] for result in results)
+    routes = sum(result['routes'] for result in results)
+    requests = sum(result['requests'] for result in results)
+    retries = sum(result['retries'] for result in results)
+    unit_seconds = sum(result['seconds'] for result in results)
+    print_progress(len(results), len(pending), failed, shipments, elapsed)
+    print(f"\nSUMMARY: {len(results) - failed:,} account-weeks stored, {failed:,} failed in {format_duration(elapsed)}")
+    print(f"   {len(results) / elapsed * 60:,.1f} account-weeks/min, {shipments / elapsed:,.0f} shipments/s, "
+          f"{routes:,} routes; {requests:,} requests ({retries:,} retries), "
+          f"{unit_seconds / max(len(results), 1):.2f}s per unit")
+    if failed:
+        print(f"\n⚠️  Run again with --run {args.run} to retry the failed account-weeks")
+        sys.exit(1)
+    print("✅ Backfill complete")
+
+if __name__ == '__main__':
+    main()
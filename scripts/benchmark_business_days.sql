@@ -0,0 +1,78 @@
+-- Benchmark: day-by-day loop (migration 017) vs business-day ordinal lookups
+-- Run after 20260209_business_calendar.sql; everything here is temporary and
+-- rolled back, so it is safe on a production database.
+--
+--   psql "$DATABASE_URL" -f scripts/benchmark_business_days.sql
+--
+-- Times 200k synthetic shipments of one account three ways: the old PL/pgSQL loop,
+-- the new calculate_business_days() per row, and a set-based join on
+-- business_calendar (the form to use in bulk UPDATEs such as a reprocess), and
+-- checks that all three agree.
+
+\timing on
+
+BEGIN;
+
+-- The migration 017 loop, with the holiday check its TODO described
+CREATE FUNCTION pg_temp.calculate_business_days_loop(p_start_date TIMESTAMPTZ, p_end_date TIMESTAMPTZ,
+                                                     p_account_id UUID)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_business_days INTEGER := 0;
+  v_current_date DATE := p_start_date::DATE;
+BEGIN
+  WHILE v_current_date < p_end_date::DATE LOOP
+    IF EXTRACT(DOW FROM v_current_date) BETWEEN 1 AND 5
+       AND NOT EXISTS (SELECT 1 FROM account_holidays
+                       WHERE account_id = p_account_id AND holiday_date = v_current_date) THEN
+      v_business_days := v_business_days + 1;
+    END IF;
+    v_current_date := v_current_date + INTERVAL '1 day';
+  END LOOP;
+  RETURN v_business_days;
+END;
+$$;
+
+CREATE TEMP TABLE benchmark_shipments ON COMMIT DROP AS
+SELECT
+  (SELECT id FROM accounts ORDER BY id LIMIT 1) AS account_id,
+  sent_at,
+  sent_at + (random() * 12 + 0.1) * INTERVAL '1 day' AS received_at
+FROM (
+  SELECT TIMESTAMPTZ '2024-01-01' + random() * INTERVAL '730 days' AS sent_at
+  FROM generate_series(1, 200000)
+) s;
+
+-- A dozen holidays, so the holiday path is exercised
+INSERT INTO account_holidays (account_id, holiday_date, name)
+SELECT (SELECT account_id FROM benchmark_shipments LIMIT 1), day::DATE, 'benchmark'
+FROM generate_series(DATE '2024-01-01', DATE '2025-12-31', INTERVAL '61 days') AS day
+ON CONFLICT DO NOTHING;
+
+ANALYZE benchmark_shipments;
+
+\echo 'Day-by-day loop'
+CREATE TEMP TABLE result_loop ON COMMIT DROP AS
+SELECT pg_temp.calculate_business_days_loop(sent_at, received_at, account_id) AS days
+FROM benchmark_shipments;
+
+\echo 'calculate_business_days() lookups'
+CREATE TEMP TABLE result_lookup ON COMMIT DROP AS
+SELECT calculate_business_days(sent_at, received_at, account_id) AS days
+FROM benchmark_shipments;
+
+\echo 'Set-based join on business_calendar'
+CREATE TEMP TABLE result_join ON COMMIT DROP AS
+SELECT GREATEST(r.business_ordinal - s.business_ordinal, 0) AS days
+FROM benchmark_shipments b
+JOIN business_calendar s ON s.account_id = b.account_id AND s.calendar_date = b.sent_at::DATE
+JOIN business_calendar r ON r.account_id = b.account_id AND r.calendar_date = b.received_at::DATE;
+
+\echo 'Agreement (expect equal counts and sums)'
+SELECT 'loop' AS method, COUNT(*), SUM(days) FROM result_loop
+UNION ALL SELECT 'lookup', COUNT(*), SUM(days) FROM result_lookup
+UNION ALL SELECT 'join', COUNT(*), SUM(days) FROM result_join;
+
+ROLLBACK;
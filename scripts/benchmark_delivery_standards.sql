@@ -0,0 +1,136 @@
+-- Benchmark: nested-loop generate_delivery_standards (migration 008) vs the
+-- set-based INSERT ... SELECT of 20260210_set_based_delivery_standards_generation.sql
+-- Everything runs on temporary copies of the tables and is rolled back, so it is
+-- safe on a production database.
+--
+--   psql "$DATABASE_URL" -v cities=200 -f scripts/benchmark_delivery_standards.sql
+--
+-- Builds a synthetic topology of 3 carriers x 5 products and :cities cities (200
+-- by default), pre-fills 10% of the matrix, then generates it twice per method:
+-- once with the 10% already present and once more with everything present (the
+-- all-skipped path, where the loop pays one failed subtransaction per cell).
+-- Both methods must report the same inserted / skipped counts.
+
+\if :{?cities}
+\else
+  \set cities 200
+\endif
+
+\timing on
+
+BEGIN;
+
+CREATE TEMP TABLE benchmark_products ON COMMIT DROP AS
+SELECT gen_random_uuid() AS id, c.carrier_id
+FROM (SELECT gen_random_uuid() AS carrier_id FROM generate_series(1, 3)) c
+CROSS JOIN generate_series(1, 5);
+
+CREATE TEMP TABLE benchmark_cities ON COMMIT DROP AS
+SELECT gen_random_uuid() AS id FROM generate_series(1, :cities);
+
+-- Only the unique constraint matters here: no foreign keys, triggers or RLS
+CREATE TEMP TABLE benchmark_standards (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  carrier_id UUID NOT NULL,
+  product_id UUID NOT NULL,
+  origin_city_id UUID NOT NULL,
+  destination_city_id UUID NOT NULL,
+  CONSTRAINT benchmark_standards_unique UNIQUE (carrier_id, product_id, origin_city_id, destination_city_id)
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE benchmark_prefill ON COMMIT DROP AS
+SELECT p.carrier_id, p.id AS product_id, o.id AS origin_city_id, d.id AS destination_city_id
+FROM benchmark_products p, benchmark_cities o, benchmark_cities d
+WHERE o.id <> d.id AND random() < 0.1;
+
+-- The migration 008 loops, on the benchmark tables
+CREATE FUNCTION pg_temp.generate_loop(p_carriers UUID[], p_cities UUID[])
+RETURNS TABLE(inserted_count INTEGER, skipped_count INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_carrier_id UUID;
+  v_product_id UUID;
+  v_origin_city_id UUID;
+  v_destination_city_id UUID;
+  v_carrier_products UUID[];
+  v_inserted INTEGER := 0;
+  v_skipped INTEGER := 0;
+BEGIN
+  FOREACH v_carrier_id IN ARRAY p_carriers
+  LOOP
+    SELECT ARRAY_AGG(id) INTO v_carrier_products FROM benchmark_products WHERE carrier_id = v_carrier_id;
+    FOREACH v_product_id IN ARRAY v_carrier_products
+    LOOP
+      FOREACH v_origin_city_id IN ARRAY p_cities
+      LOOP
+        FOREACH v_destination_city_id IN ARRAY p_cities
+        LOOP
+          IF v_origin_city_id != v_destination_city_id THEN
+            BEGIN
+              INSERT INTO benchmark_standards (carrier_id, product_id, origin_city_id, destination_city_id)
+              VALUES (v_carrier_id, v_product_id, v_origin_city_id, v_destination_city_id);
+              v_inserted := v_inserted + 1;
+            EXCEPTION WHEN unique_violation THEN
+              v_skipped := v_skipped + 1;
+            END;
+          END IF;
+        END LOOP;
+      END LOOP;
+    END LOOP;
+  END LOOP;
+  RETURN QUERY SELECT v_inserted, v_skipped;
+END;
+$$;
+
+-- The set-based statement of the new generate_delivery_standards, on the benchmark tables
+CREATE FUNCTION pg_temp.generate_set(p_carriers UUID[], p_cities UUID[])
+RETURNS TABLE(inserted_count INTEGER, skipped_count INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_inserted INTEGER;
+  v_candidates INTEGER;
+BEGIN
+  WITH cells AS (
+    SELECT c.carrier_id, p.id AS product_id, o.city_id AS origin_city_id, d.city_id AS destination_city_id
+    FROM unnest(p_carriers) AS c(carrier_id)
+    JOIN benchmark_products p ON p.carrier_id = c.carrier_id
+    CROSS JOIN unnest(p_cities) AS o(city_id)
+    CROSS JOIN unnest(p_cities) AS d(city_id)
+    WHERE o.city_id <> d.city_id
+  ),
+  inserted AS (
+    INSERT INTO benchmark_standards (carrier_id, product_id, origin_city_id, destination_city_id)
+    SELECT carrier_id, product_id, origin_city_id, destination_city_id
+    FROM cells
+    ON CONFLICT ON CONSTRAINT benchmark_standards_unique DO NOTHING
+    RETURNING 1
+  )
+  SELECT (SELECT COUNT(*) FROM inserted), (SELECT COUNT(*) FROM cells)
+  INTO v_inserted, v_candidates;
+  RETURN QUERY SELECT v_inserted, v_candidates - v_inserted;
+END;
+$$;
+
+\set carriers '(SELECT ARRAY_AGG(DISTINCT carrier_id) FROM benchmark_products)'
+\set city_ids '(SELECT ARRAY_AGG(id) FROM benchmark_cities)'
+
+INSERT INTO benchmark_standards (carrier_id, product_id, origin_city_id, destination_city_id)
+SELECT * FROM benchmark_prefill;
+
+\echo 'Nested loops, 10% present'
+SELECT * FROM pg_temp.generate_loop(:carriers, :city_ids);
+\echo 'Nested loops, everything present'
+SELECT * FROM pg_temp.generate_loop(:carriers, :city_ids);
+
+TRUNCATE benchmark_standards;
+INSERT INTO benchmark_standards (carrier_id, product_id, origin_city_id, destination_city_id)
+SELECT * FROM benchmark_prefill;
+
+\echo 'Set-based, 10% present'
+SELECT * FROM pg_temp.generate_set(:carriers, :city_ids);
+\echo 'Set-based, everything present'
+SELECT * FROM pg_temp.generate_set(:carriers, :city_ids);
+
+ROLLBACK;
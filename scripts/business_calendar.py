@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Vectorized business-day calculator
+Computes one_db.business_transit_days for millions of (sent_at, received_at)
+pairs as differences of business-day ordinals, with the rules of
+calculate_business_days (migration 20260209_business_calendar.sql): Mon-Fri days
+from the sent date up to the day before the received date, skipping the
+account's holidays, 0 when received on or before the sent date. Dates are taken
+in UTC, like the database session.
+
+The ordinal of a day is the number of business days before it since 1900-01-01:
+a closed formula for weekdays minus the holidays before it. Like the
+business_calendar table, the ordinals of the days a batch spans are precomputed
+per account, so each shipment costs two array lookups whatever its transit time.
+
+Usage:
+    psql "$DATABASE_URL" -c "\\copy (SELECT id, account_id, sent_at, received_at, business_transit_days FROM one_db) TO 'one_db.csv' CSV HEADER"
+    psql "$DATABASE_URL" -c "\\copy account_holidays TO 'holidays.csv' CSV HEADER"
+    python3 scripts/business_calendar.py --shipments one_db.csv --holidays holidays.csv --output business_days.csv
+    python3 scripts/business_calendar.py --benchmark 1000000
+"""
+
+import csv
+import time
+import argparse
+
+import numpy as np
+
+from weekly_aggregation import DAY_US, parse_timestamps, read_extract
+
+EPOCH_MONDAY = np.datetime64('1900-01-01', 'D')
+# Days from 1900-01-01 to 1970-01-01
+UNIX_EPOCH_DAYS = 25_567
+# Per-account key space of a holiday: account code * ACCOUNT_SPAN + day
+ACCOUNT_SPAN = 1 << 20
+SHIPMENT_FIELDS = ['id', 'account_id', 'sent_at', 'received_at', 'business_transit_days']
+LOOP_SAMPLE = 200_000
+
+def weekday_ordinals(days):
+    """Mon-Fri days before each day, counted from 1900-01-01; days are int64 days since 1900-01-01"""
+    weeks, weekday = np.divmod(days, 7)
+    return weeks * 5 + np.minimum(weekday, 5)
+
+def holiday_keys(holidays, account_index):
+    """
+    Sorted keys of the weekday holidays of the accounts in account_index.
+    
+    holidays is {'account_id': list, 'holiday_date': list}; account_index maps
+    account ids to the codes of the shipments.
+    """
+    accounts = holidays['account_id']
+    days = (np.array(holidays['holiday_date'], dtype='datetime64[D]') - EPOCH_MONDAY).astype(np.int64)
+    codes = np.array([account_index.get(account, -1) for account in accounts], dtype=np.int64)
+    keep = (codes >= 0) & (days % 7 < 5)
+    return np.unique(codes[keep] * ACCOUNT_SPAN + days[keep])
+
+def ordinal_table(first_day, last_day, account_count, keys=None):
+    """
+    business_calendar as a dense (account, day) matrix of business_ordinal for
+    first_day..last_day; keys are the holiday_keys of the accounts.
+    """
+    days = np.arange(first_day, last_day + 1)
+    # Each holiday lowers the ordinal of every later day by one
+    shift = np.zeros((account_count, len(days) + 1), dtype=np.int32)
+    if keys is not None and len(keys):
+        accounts, holiday_days = np.divmod(keys, ACCOUNT_SPAN)
+        keep = holiday_days <= last_day
+        column = np.clip(holiday_days[keep] - first_day + 1, 0, len(days))
+        np.add.at(shift, (accounts[keep], column), 1)
+    return weekday_ordinals(days).astype(np.int32) - np.cumsum(shift, axis=1, dtype=np.int32)[:, :-1]
+
+def timestamp_days(texts):
+    """Days since 1900-01-01 of the UTC dates of timestamptz texts"""
+    return parse_timestamps(texts) // DAY_US + UNIX_EPOCH_DAYS
+
+def business_days(sent_days, received_days, accounts=None, keys=None):
+    """calculate_business_days for arrays of days since 1900-01-01 and account codes"""
+    if not len(sent_days):
+        return np.zeros(0, dtype=np.int64)
+    if accounts is None:
+        accounts = np.zeros(len(sent_days), dtype=np.int64)
+    first_day = min(sent_days.min(), received_days.min())
+    table = ordinal_table(first_day, max(sent_days.max(), received_days.max()), accounts.max() + 1, keys)
+    transit = table[accounts, received_days - first_day] - table[accounts, sent_days - first_day]
+    return np.maximum(transit, 0).astype(np.int64)
+
+def loop_business_days(sent_day, received_day, holidays=()):
+    """The day-by-day WHILE loop of migration 017, with its holiday TODO done; for comparisons"""
+    count = 0
+    day = sent_day
+    while day < received_day:
+        if day % 7 < 5 and day not in holidays:
+            count += 1
+        day += 1
+    return count
+
+def compute_extract(shipments_path, holidays_path=None):
+    """(ids, business days, stored business_transit_days) for a one_db extract"""
+    shipments = read_extract(shipments_path, SHIPMENT_FIELDS)
+    account_index = {}
+    accounts = np.fromiter((account_index.setdefault(account, len(account_index))
+                            for account in shipments['account_id']), dtype=np.int64,
+                           count=len(shipments['account_id']))
+    keys = holiday_keys(read_extract(holidays_path, ['account_id', 'holiday_date']), account_index) \
+        if holidays_path else None
+    days = business_days(timestamp_days(shipments['sent_at']), timestamp_days(shipments['received_at']),
+                         accounts, keys)
+    return shipments['id'], days, shipments['business_transit_days']
+
+def benchmark(count, seed=42):
+    """Time the vectorized calculator against the loop on random shipments and check they agree"""
+    rng = np.random.default_rng(seed)
+    accounts = rng.integers(0, 10, count)
+    sent = (np.datetime64('2024-01-01', 'D') - EPOCH_MONDAY).astype(np.int64) + rng.integers(0, 730, count)
+    received = sent + rng.geometric(0.25, count)
+    # About ten holidays a year per account
+    holiday_days = [(account, int(day)) for account in range(10)
+                    for day in sent.min() + rng.choice(800, 20, replace=False)]
+    keys = np.unique([account * ACCOUNT_SPAN + day for account, day in holiday_days if day % 7 < 5])
+    
+    start = time.perf_counter()
+    vectorized = business_days(sent, received, accounts, keys)
+    vectorized_seconds = time.perf_counter() - start
+    
+    sample = min(count, LOOP_SAMPLE)
+    holidays = [set() for _ in range(10)]
+    for account, day in holiday_days:
+        holidays[account].add(day)
+    start = time.perf_counter()
+    looped = [loop_business_days(s, r, holidays[a])
+              for s, r, a in zip(sent[:sample].tolist(), received[:sample].tolist(), accounts[:sample].tolist())]
+    loop_seconds = (time.perf_counter() - start) * count / sample
+    
+    mismatches = int((vectorized[:sample] != np.array(looped)).sum())
+    print(f"{count:,} shipments, {len(keys)} weekday holidays over 10 accounts")
+    print(f"  vectorized ordinals  {vectorized_seconds:8.3f}s  {count / vectorized_seconds:>14,.0f} shipments/s")
+    print(f"  day-by-day loop      {loop_seconds:8.3f}s  {count / loop_seconds:>14,.0f} shipments/s"
+          + (f"  (extrapolated from {sample:,})" if sample < count else ''))
+    print(f"  speed-up x{loop_seconds / vectorized_seconds:,.0f}, "
+          + ("✅ identical results" if not mismatches else f"❌ {mismatches:,} mismatches"))
+    return mismatches
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Compute business transit days in bulk from business-day ordinals')
+    parser.add_argument('--shipments', help='one_db extract with id, account_id, sent_at, received_at '
+                                            '(and business_transit_days to count changes)')
+    parser.add_argument('--holidays', help='account_holidays extract with account_id, holiday_date')
+    parser.add_argument('--output', default='business_days.csv',
+                        help='CSV of id,business_transit_days (default: business_days.csv)')
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help='compare with the day-by-day loop on N random shipments instead')
+    args = parser.parse_args(argv)
+    if not args.shipments and not args.benchmark:
+        parser.error('--shipments or --benchmark is required')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.benchmark:
+        raise SystemExit(1 if benchmark(args.benchmark) else 0)
+    
+    start = time.perf_counter()
+    ids, days, stored = compute_extract(args.shipments, args.holidays)
+    changed = sum(1 for old, new in zip(stored, days.tolist()) if old not in (None, '') and int(old) != new)
+    with open(args.output, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'business_transit_days'])
+        writer.writerows(zip(ids, days.tolist()))
+    print(f"✅ {len(ids):,} shipments in {time.perf_counter() - start:.1f}s, "
+          f"{changed:,} differ from the stored business_transit_days; written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Streaming bulk export of ONE DB records through the onedb-api edge function
+Pages an account's records with the API's cursor pagination (pagination=cursor,
+then cursor=<next_cursor>): every page is a keyset lookup after the last record
+of the previous one, so page 500 costs what page 1 does, where offset pages get
+slower the deeper they go. Against a deployment without cursor support it falls
+back to offset pages.
+
+A scheduler keeps the requests inside the API's rate limit (10 per minute per
+key) instead of running into 429s, and waits for reset_at when one happens
+anyway. Pages are streamed to NDJSON (one file) or Parquet (a directory of part
+files of --row-group rows, needs pyarrow), so memory holds one page or one row
+group whatever the size of the export. After each durable write the cursor is
+checkpointed next to the output; running the same command again resumes from
+it, truncating any NDJSON written after the checkpoint.
+
+Usage:
+    ONEDB_API_URL=https://<project>.supabase.co/functions/v1/onedb-api ONEDB_API_KEY=onedb_live_... \\
+        python3 scripts/export_onedb.py --start-date 2024-01-01 --end-date 2025-12-31 --output onedb.ndjson
+    python3 scripts/export_onedb.py --start-date 2024-01-01 --end-date 2025-12-31 --format parquet --output onedb/
+    python3 scripts/stub_onedb_api_server.py --window 6     # local endpoint for trying it out
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import datetime
+import http.client
+from collections import deque
+from urllib.parse import urlencode, urlsplit
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from insert_demo2_seed_data import MAX_RETRIES, SUPABASE_URL, RestError, retry_delay
+
+API_URL = os.environ.get('ONEDB_API_URL', SUPABASE_URL.rstrip('/') + '/functions/v1/onedb-api')
+API_KEY = os.environ.get('ONEDB_API_KEY', '')
+PAGE_LIMIT = 1000
+RATE_LIMIT = 10
+RATE_WINDOW = 60.0
+ROW_GROUP = 50_000
+PROGRESS_SECONDS = 10
+RETRY_STATUSES = {500, 502, 503, 504}
+# 429s waited out before giving up, in case the limit is shared with another client
+MAX_RATE_LIMITED = 20
+
+class RateScheduler:
+    """
+    Sliding-window limiter: at most `limit` requests in any `window` seconds.
+    
+    A request is recorded when its response arrives, which is after the API
+    logged it, so the local window never closes before the server's does.
+    """
+    
+    def __init__(self, limit=RATE_LIMIT, window=RATE_WINDOW):
+        self.limit = limit
+        self.window = window
+        self.sent = deque()
+        self.blocked_until = 0.0
+        self.waited = 0.0
+    
+    def wait(self):
+        """Sleep until a request is allowed"""
+        while True:
+            now = time.monotonic()
+            while self.sent and self.sent[0] <= now - self.window:
+                self.sent.popleft()
+            ready = max(self.blocked_until, self.sent[0] + self.window if len(self.sent) >= self.limit else 0)
+            if ready <= now:
+                return
+            self.waited += ready - now
+            time.sleep(ready - now)
+    
+    def record(self):
+        self.sent.append(time.monotonic())
+    
+    def block(self, seconds):
+        """No requests for the next seconds (after a 429)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class OneDbApiClient:
+    """GET pages of the onedb-api endpoint on one keep-alive connection, within the rate limit"""
+    
+    def __init__(self, url, api_key, scheduler, timeout=120):
+        parts = urlsplit(url)
+        self.connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                                 else http.client.HTTPConnection)
+        self.host = parts.netloc
+        self.path = parts.path
+        self.headers = {'Authorization': f'Bearer {api_key}', 'Accept': 'application/json',
+                        'Accept-Encoding': 'gzip'}
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.conn = None
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+    
+    def get(self, params):
+        """Decoded JSON body of a successful page"""
+        attempt = 0
+        limited = 0
+        while True:
+            self.scheduler.wait()
+            self.requests += 1
+            try:
+                if self.conn is None:
+                    self.conn = self.connection_class(self.host, timeout=self.timeout)
+                self.conn.request('GET', f"{self.path}?{urlencode(params)}", headers=self.headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.scheduler.record()
+                self.conn.close()
+                self.conn = None
+                if attempt == MAX_RETRIES:
+                    raise RestError(None, e)
+                retry_after = None
+            else:
+                self.scheduler.record()
+                if response.getheader('Content-Encoding') == 'gzip':
+                    data = gzip.decompress(data)
+                if response.status == 200:
+                    return json.loads(data)
+                if response.status == 429 and limited < MAX_RATE_LIMITED:
+                    limited += 1
+                    self.rate_limited += 1
+                    self.scheduler.block(reset_seconds(data, response.getheader('Retry-After'),
+                                                       self.scheduler.window))
+                    continue
+                if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    raise RestError(response.status, data.decode('utf-8', 'replace'))
+                retry_after = response.getheader('Retry-After')
+            attempt += 1
+            self.retries += 1
+            time.sleep(retry_delay(attempt, retry_after))
+
+def reset_seconds(body, retry_after, default):
+    """Seconds to wait after a 429: Retry-After, else the rate_limit.reset_at of the body"""
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        pass
+    try:
+        reset_at = datetime.datetime.fromisoformat(json.loads(body)['rate_limit']['reset_at'].replace('Z', '+00:00'))
+    except (ValueError, KeyError, TypeError):
+        return default
+    return max(1.0, (reset_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+class NdjsonSink:
+    """One JSON record per line, appended to a single file"""
+    
+    def __init__(self, path, state):
+        self.path = path
+        mode = 'r+b' if state.get('bytes') else 'wb'
+        self.file = open(path, mode)
+        # Anything past the checkpoint was written after it and will be fetched again
+        self.file.truncate(state.get('bytes', 0))
+        self.file.seek(0, os.SEEK_END)
+    
+    def write(self, rows):
+        """Append rows; flushing is left to --checkpoint-pages"""
+        self.file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows).encode('utf-8'))
+        return False
+    
+    def flush(self, state):
+        """Make the written rows durable; updates the checkpoint state"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        state['bytes'] = self.file.tell()
+    
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    """A directory of part-NNNNN.parquet files of up to row_group rows each"""
+    
+    def __init__(self, path, state, row_group=ROW_GROUP):
+        if pa is None:
+            raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow), or use --format ndjson")
+        self.path = path
+        self.row_group = row_group
+        self.rows = []
+        os.makedirs(path, exist_ok=True)
+        self.parts = state.get('parts', 0)
+        # Parts written after the checkpoint are rewritten
+        for name in os.listdir(path):
+            if name.startswith('part-') and name.endswith('.parquet') and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(path, name))
+        self.schema = pq.read_schema(self.part_path(0)) if self.parts else None
+    
+    def part_path(self, part):
+        return os.path.join(self.path, f"part-{part:05d}.parquet")
+    
+    def write(self, rows):
+        """Buffer rows; True when a row group is full and should be flushed"""
+        self.rows.extend({key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                          for key, value in row.items()} for row in rows)
+        return len(self.rows) >= self.row_group
+    
+    def flush(self, state):
+        if self.rows:
+            if self.schema is None:
+                # Columns that are empty in the first part are typed as text
+                schema = pa.Table.from_pylist(self.rows).schema
+                self.schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                         for field in schema])
+            pq.write_table(pa.Table.from_pylist(self.rows, schema=self.schema), self.part_path(self.parts))
+            self.parts += 1
+            self.rows = []
+        state['parts'] = self.parts
+    
+    def close(self):
+        pass
+
+def load_checkpoint(path, identity):
+    """The saved state of an export with the same identity, or a fresh one"""
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('identity') != identity:
+            raise SystemExit(f"❌ {path} belongs to a different export ({state.get('identity')}); "
+                             f"use --restart to start over")
+        return state
+    return {'identity': identity, 'rows': 0, 'pages': 0}
+
+def save_checkpoint(path, state):
+    state['updated_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+def page_params(args, state):
+    params = {'start_date': args.start_date, 'end_date': args.end_date, 'limit': args.limit}
+    if state.get('mode') == 'offset':
+        params['offset'] = state.get('offset', 0)
+    elif state.get('cursor'):
+        params['cursor'] = state['cursor']
+    else:
+        params['pagination'] = 'cursor'
+    return params
+
+def export(client, sink, args, state):
+    """Fetch pages from the checkpointed position to the end; returns the rows exported by this run"""
+    start = last_report = time.perf_counter()
+    exported = 0
+    # Position after the last fetched page, saved once its rows are durable
+    position = {key: state[key] for key in ('mode', 'cursor', 'offset') if key in state}
+    while True:
+        body = client.get(page_params(args, position))
+        rows = body.get('data') or []
+        pagination = body.get('pagination') or {}
+        if 'next_cursor' in pagination:
+            position.update(mode='cursor', cursor=pagination['next_cursor'])
+        else:
+            if position.get('mode') != 'offset':
+                print("⚠️  The API has no cursor pagination; falling back to offset pages", flush=True)
+            position.update(mode='offset', offset=position.get('offset', 0) + len(rows))
+            position.pop('cursor', None)
+        done = not pagination.get('has_more') or not rows
+        
+        full = sink.write(rows)
+        state['pages'] += 1
+        state['rows'] += len(rows)
+        exported += len(rows)
+        if full or done or args.format == 'ndjson' and state['pages'] % args.checkpoint_pages == 0:
+            sink.flush(state)
+            state.update(position)
+            state['complete'] = done
+            save_checkpoint(args.checkpoint, state)
+        
+        if done:
+            return exported
+        if time.perf_counter() - last_report >= PROGRESS_SECONDS:
+            last_report = time.perf_counter()
+            total = f" of {pagination['total']:,}" if 'total' in pagination else ''
+            print(f"  {state['rows']:>10,}{total} rows, {state['pages']:,} pages, "
+                  f"{exported / (last_report - start):,.0f} rows/s, "
+                  f"{client.scheduler.waited:,.0f}s waiting for the rate limit", flush=True)
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Export ONE DB records through the onedb-api endpoint')
+    parser.add_argument('--start-date', required=True, help='first sent date (YYYY-MM-DD)')
+    parser.add_argument('--end-date', required=True, help='last sent date (YYYY-MM-DD)')
+    parser.add_argument('--output', required=True, help='NDJSON file, or Parquet directory with --format parquet')
+    parser.add_argument('--format', choices=['ndjson', 'parquet'],
+                        help='output format (default: from the --output extension, else ndjson)')
+    parser.add_argument('--url', default=API_URL, help='endpoint URL (default: $ONEDB_API_URL or the '
+                                                       'onedb-api function of $SUPABASE_URL)')
+    parser.add_argument('--limit', type=int, default=PAGE_LIMIT, help=f'records per page (default: {PAGE_LIMIT}, '
+                                                                      f'the API maximum)')
+    parser.add_argument('--rate-limit', type=int, default=RATE_LIMIT,
+                        help=f'requests allowed per window (default: {RATE_LIMIT})')
+    parser.add_argument('--rate-window', type=float, default=RATE_WINDOW,
+                        help=f'rate-limit window in seconds (default: {RATE_WINDOW:g})')
+    parser.add_argument('--row-group', type=int, default=ROW_GROUP,
+                        help=f'rows per Parquet part file (default: {ROW_GROUP})')
+    parser.add_argument('--checkpoint-pages', type=int, default=1,
+                        help='NDJSON pages between checkpoints (default: 1)')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <output>.checkpoint.json)')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and start over')
+    args = parser.parse_args(argv)
+    for name in ('start_date', 'end_date'):
+        try:
+            datetime.date.fromisoformat(getattr(args, name))
+        except ValueError:
+            parser.error(f"--{name.replace('_', '-')} must be YYYY-MM-DD")
+    args.format = args.format or ('parquet' if args.output.rstrip('/').endswith('.parquet') or args.output.endswith('/')
+                                  else 'ndjson')
+    args.checkpoint = args.checkpoint or args.output.rstrip('/') + '.checkpoint.json'
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not API_KEY:
+        print("❌ Error: ONEDB_API_KEY environment variable not set")
+        sys.exit(1)
+    
+    identity = {'url': args.url, 'start_date': args.start_date, 'end_date': args.end_date, 'format': args.format}
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    state = load_checkpoint(args.checkpoint, identity)
+    if state.get('complete'):
+        print(f"✅ {args.output} is already complete ({state['rows']:,} rows); use --restart to export again")
+        return
+    if state['pages']:
+        print(f"Resuming {args.output} after {state['rows']:,} rows ({state['pages']:,} pages)")
+    
+    sink = NdjsonSink(args.output, state) if args.format == 'ndjson' else ParquetSink(args.output, state, args.row_group)
+    scheduler = RateScheduler(args.rate_limit, args.rate_window)
+    client = OneDbApiClient(args.url, API_KEY, scheduler)
+    print(f"Exporting {args.start_date}..{args.end_date} from {args.url} to {args.output} ({args.format}), "
+          f"{args.limit} records per page, at most {args.rate_limit} requests per {args.rate_window:g}s")
+    
+    start = time.perf_counter()
+    try:
+        exported = export(client, sink, args, state)
+    except KeyboardInterrupt:
+        print(f"\n⚠️  Interrupted after {state['rows']:,} rows; run the same command again to resume")
+        raise SystemExit(130)
+    except RestError as e:
+        print(f"❌ Export stopped after {state['rows']:,} rows: {e}\n   Run the same command again to resume")
+        sys.exit(1)
+    finally:
+        sink.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"✅ {state['rows']:,} rows in {args.output} ({exported:,} this run) in {elapsed:.1f}s, "
+          f"{client.requests:,} requests ({client.retries:,} retries, {client.rate_limited:,} rate limited), "
+          f"{scheduler.waited:.0f}s waiting for the rate limit")
+
+if __name__ == '__main__':
+    main()
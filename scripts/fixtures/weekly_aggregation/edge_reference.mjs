@@ -0,0 +1,91 @@
+// Reference dumps for scripts/weekly_aggregation.py --compare
+//
+// Runs processAccount from supabase/functions/weekly-aggregation/index.ts over the
+// fixture extracts with an in-memory supabase client, one Monday week per account
+// as the setup_etl_cron.sql backfill does, and writes what it upserts as
+// reference/{table}.ndjson. The type annotations the function uses are stripped
+// so plain Node can run it without Deno or a TypeScript compiler.
+//
+// Usage (from the repository root):
+//   node scripts/fixtures/weekly_aggregation/edge_reference.mjs [week end days, default 6]
+
+import fs from 'node:fs'
+import path from 'node:path'
+import { fileURLToPath } from 'node:url'
+
+const here = path.dirname(fileURLToPath(import.meta.url))
+const source = path.join(here, '../../../supabase/functions/weekly-aggregation/index.ts')
+const weekEndDays = Number(process.argv[2] ?? 6)
+
+const TYPE = String.raw`(?:Promise<[^>]*>|Map<[^>]*>|(?:any|string|number|boolean|Date|Shipment|RouteStats)(?:\[\])?)`
+
+function stripTypes(ts) {
+  const body = ts.slice(ts.indexOf('function getLastCompleteWeek'))
+  return body
+    .replace(new RegExp(String.raw`(\w)\??: ${TYPE}(?=\s*[,)=\n{])`, 'g'), '$1')
+    .replace(new RegExp(String.raw`\): ${TYPE} \{`, 'g'), ') {')
+    .replace(/new Map<[^>]*>\(/g, 'new Map(')
+    .replace(/\)!(?=\s)/g, ')')
+    + '\nexport { processAccount, getISOWeek }\n'
+}
+
+const { processAccount, getISOWeek } = await import(
+  'data:text/javascript,' + encodeURIComponent(stripTypes(fs.readFileSync(source, 'utf8')))
+)
+
+const readNdjson = (name) =>
+  fs.readFileSync(path.join(here, name), 'utf8').split('\n').filter(Boolean).map((line) => JSON.parse(line))
+const tables = { one_db: readNdjson('one_db.ndjson'), cities: readNdjson('cities.ndjson'), regions: readNdjson('regions.ndjson') }
+const written = {}
+
+// PostgREST compares a timestamptz column with a date as midnight UTC
+const midnight = (date) => Date.parse(`${date}T00:00:00Z`)
+
+function query(table) {
+  const filters = []
+  let range = null
+  const builder = {
+    select() { return builder },
+    eq(column, value) { filters.push((row) => row[column] === value); return builder },
+    gte(column, value) { filters.push((row) => Date.parse(row[column]) >= midnight(value)); return builder },
+    lte(column, value) { filters.push((row) => Date.parse(row[column]) <= midnight(value)); return builder },
+    range(from, to) { range = [from, to]; return builder },
+    upsert(rows, { onConflict }) {
+      const keys = onConflict.split(',')
+      const stored = (written[table] ||= new Map())
+      for (const row of rows) stored.set(keys.map((key) => row[key]).join('|'), JSON.parse(JSON.stringify(row)))
+      return Promise.resolve({ error: null })
+    },
+    then(resolve) {
+      let data = tables[table].filter((row) => filters.every((filter) => filter(row)))
+      if (range) data = data.slice(range[0], range[1] + 1)
+      resolve({ data, error: null })
+    },
+  }
+  return builder
+}
+
+const supabase = { from: query }
+console.log = () => {}
+
+const DAY = 86_400_000
+const accounts = [...new Set(tables.one_db.map((row) => row.account_id))].sort()
+const times = tables.one_db.map((row) => Date.parse(row.sent_at))
+const last = Math.max(...times)
+// 1970-01-05 was the first Monday after the epoch
+for (let week = Math.floor((Math.min(...times) - 4 * DAY) / (7 * DAY)) * 7 * DAY + 4 * DAY; week <= last; week += 7 * DAY) {
+  const start = new Date(week)
+  const weekStart = start.toISOString().split('T')[0]
+  const weekEnd = new Date(week + weekEndDays * DAY).toISOString().split('T')[0]
+  for (const account of accounts) {
+    await processAccount(supabase, account, weekStart, weekEnd, getISOWeek(start), start.getFullYear())
+  }
+}
+
+const outDir = path.join(here, 'reference')
+fs.mkdirSync(outDir, { recursive: true })
+for (const [table, rows] of Object.entries(written).sort()) {
+  const sorted = [...rows.entries()].sort(([a], [b]) => (a < b ? -1 : a > b ? 1 : 0)).map(([, row]) => JSON.stringify(row))
+  fs.writeFileSync(path.join(outDir, `${table}.ndjson`), sorted.join('\n') + '\n')
+  process.stderr.write(`${table}: ${rows.size} rows\n`)
+}
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Bulk delivery-standards generation
+Builds the carrier product x origin x destination matrix that
+generate_delivery_standards (migration 008) inserts cell by cell, as NumPy code
+arrays, and writes it as one COPY file plus a load.sql that merges it with
+ON CONFLICT DO NOTHING. Selection follows the RPC:
+
+- no carriers given: the account's active carriers
+- products: the carrier's active products, restricted to --product when given
+- no origins/destinations given: the account's active cities
+- origin = destination is never generated; existing
+  (carrier, product, origin, destination) rows are skipped
+
+New rows are pending (standard_time and success_percentage NULL), take the
+product's time_unit and leave warning_threshold, critical_threshold and
+threshold_type NULL, as the RPC does; --warning-threshold, --critical-threshold
+and --threshold-type set them explicitly. With --existing, the rows already
+in delivery_standards are skipped here and the inserted / skipped counts are
+exact; load.sql skips them again in any case.
+
+--benchmark times the matrix build against a row-by-row port of the RPC's four
+nested loops on synthetic topologies; scripts/benchmark_delivery_standards.sql
+compares the PL/pgSQL loop with the set-based function of
+20260210_set_based_delivery_standards_generation.sql in the database.
+
+Usage:
+    psql "$DATABASE_URL" -c "\\copy (SELECT id, account_id, status FROM carriers) TO 'carriers.csv' CSV HEADER"
+    psql "$DATABASE_URL" -c "\\copy (SELECT id, carrier_id, status, time_unit FROM products) TO 'products.csv' CSV HEADER"
+    psql "$DATABASE_URL" -c "\\copy (SELECT id, account_id, status FROM cities) TO 'cities.csv' CSV HEADER"
+    psql "$DATABASE_URL" -c "\\copy (SELECT carrier_id, product_id, origin_city_id, destination_city_id FROM delivery_standards) TO 'standards.csv' CSV HEADER"
+    python3 scripts/generate_delivery_standards.py --account <account_id> --carriers carriers.csv \\
+        --products products.csv --cities cities.csv --existing standards.csv
+    cd delivery_standards && psql "$DATABASE_URL" -f load.sql
+    python3 scripts/generate_delivery_standards.py --benchmark
+"""
+
+import os
+import time
+import argparse
+
+import numpy as np
+
+from weekly_aggregation import read_extract
+
+OUTPUT_DIR = 'delivery_standards'
+CARRIER_FIELDS = ['id', 'account_id', 'status']
+PRODUCT_FIELDS = ['id', 'carrier_id', 'status', 'time_unit']
+CITY_FIELDS = ['id', 'account_id', 'status']
+STANDARD_KEY_FIELDS = ['carrier_id', 'product_id', 'origin_city_id', 'destination_city_id']
+STANDARD_COLUMNS = ['account_id', 'carrier_id', 'product_id', 'origin_city_id', 'destination_city_id',
+                    'time_unit', 'warning_threshold', 'critical_threshold', 'threshold_type']
+# NULL unless given, as generate_delivery_standards inserts them
+WARNING_THRESHOLD = None
+CRITICAL_THRESHOLD = None
+THRESHOLD_TYPE = None
+CHUNK_ROWS = 500_000
+# Lines assembled per write by StandardsMatrix.write_copy
+LINE_BLOCK = 65_536
+BENCHMARK_CITIES = [50, 100, 250, 500, 1000]
+BENCHMARK_CARRIERS = 3
+BENCHMARK_PRODUCTS_PER_CARRIER = 5
+BENCHMARK_EXISTING = 0.1
+LOOP_SAMPLE = 2_000_000
+ACCOUNT_ID = '00000000-0000-4000-8000-000000000000'
+
+def select_topology(carriers, products, cities, account_id, carrier_ids=None, product_ids=None,
+                    origin_ids=None, destination_ids=None):
+    """
+    ([(carrier_id, product_id, time_unit)], origin ids, destination ids) as
+    generate_delivery_standards picks them; carriers, products and cities are
+    extracts as {field: list}.
+    """
+    active_cities = [city_id for city_id, account, status in zip(*(cities[field] for field in CITY_FIELDS))
+                     if account == account_id and status == 'active']
+    if not carrier_ids:
+        carrier_ids = [carrier_id for carrier_id, account, status in zip(*(carriers[field] for field in CARRIER_FIELDS))
+                       if account == account_id and status == 'active']
+    wanted = set(product_ids or ())
+    carrier_products = {}
+    for product_id, carrier_id, status, time_unit in zip(*(products[field] for field in PRODUCT_FIELDS)):
+        if status == 'active' and (not wanted or product_id in wanted):
+            carrier_products.setdefault(carrier_id, []).append((product_id, time_unit or 'hours'))
+    
+    pairs = [(carrier_id, product_id, time_unit) for carrier_id in carrier_ids
+             for product_id, time_unit in carrier_products.get(carrier_id, ())]
+    return pairs, list(origin_ids or active_cities), list(destination_ids or active_cities)
+
+class StandardsMatrix:
+    """
+    The (carrier, product) x origin x destination cells of one generation.
+    
+    Cities are coded once; a cell is origin * city_count + destination, so the
+    cells of every product are the same int64 array, filtered per product by the
+    existing standards of that product.
+    """
+    
+    def __init__(self, account_id, pairs, origin_ids, destination_ids, existing=None):
+        self.account_id = account_id
+        self.pairs = pairs
+        city_index = {}
+        origins = np.array([city_index.setdefault(city_id, len(city_index)) for city_id in origin_ids],
+                           dtype=np.int64)
+        destinations = np.array([city_index.setdefault(city_id, len(city_index)) for city_id in destination_ids],
+                                dtype=np.int64)
+        self.city_index = city_index
+        self.city_ids = np.array(list(city_index), dtype=object)
+        self.city_count = len(city_index)
+        
+        # Every origin x destination cell in the RPC's loop order, first occurrence only
+        origin = np.repeat(origins, len(destinations))
+        destination = np.tile(destinations, len(origins))
+        cells = (origin * self.city_count + destination)[origin != destination]
+        self.candidates_per_pair = len(cells)
+        if len(np.unique(origins)) < len(origins) or len(np.unique(destinations)) < len(destinations):
+            _, first = np.unique(cells, return_index=True)
+            cells = cells[np.sort(first)]
+        self.cells = cells
+        
+        self.pair_index = {}
+        for carrier_id, product_id, _ in pairs:
+            self.pair_index.setdefault((carrier_id, product_id), len(self.pair_index))
+        self.existing = self.existing_keys(existing) if existing else np.zeros(0, dtype=np.int64)
+        self.inserted = 0
+        self.skipped = 0
+    
+    @property
+    def candidates(self):
+        """Cells the RPC visits, duplicates included: inserted + skipped"""
+        return len(self.pairs) * self.candidates_per_pair
+    
+    def existing_keys(self, existing):
+        """Sorted pair * city_count^2 + cell keys of the existing standards inside this matrix"""
+        pair = np.fromiter((self.pair_index.get(key, -1) for key in zip(existing['carrier_id'], existing['product_id'])),
+                           dtype=np.int64, count=len(existing['carrier_id']))
+        origin, destination = (np.fromiter((self.city_index.get(city_id, -1) for city_id in existing[field]),
+                                           dtype=np.int64, count=len(existing[field]))
+                               for field in ('origin_city_id', 'destination_city_id'))
+        inside = (pair >= 0) & (origin >= 0) & (destination >= 0)
+        keys = np.sort((pair * self.city_count + origin)[inside] * self.city_count + destination[inside])
+        return keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+    
+    def new_cells(self, pair):
+        """Cells of a (carrier, product) code without an existing standard"""
+        span = self.city_count * self.city_count
+        low, high = np.searchsorted(self.existing, [pair * span, (pair + 1) * span])
+        if low == high:
+            return self.cells
+        free = np.ones(span, dtype=bool)
+        free[self.existing[low:high] - pair * span] = False
+        return self.cells[free[self.cells]]
+    
+    def codes(self):
+        """Yield (pair position, cells to insert) in the RPC's order, counting inserted and skipped"""
+        seen = set()
+        for position, (carrier_id, product_id, _) in enumerate(self.pairs):
+            pair = self.pair_index[(carrier_id, product_id)]
+            # A carrier or product listed twice revisits cells it has just inserted
+            cells = self.new_cells(pair) if pair not in seen else self.cells[:0]
+            seen.add(pair)
+            self.inserted += len(cells)
+            self.skipped += self.candidates_per_pair - len(cells)
+            yield position, cells
+    
+    def constants(self, position, warning_threshold, critical_threshold, threshold_type):
+        """{column: value} of the columns that do not vary inside a (carrier, product)"""
+        carrier_id, product_id, time_unit = self.pairs[position]
+        return {'account_id': self.account_id, 'carrier_id': carrier_id, 'product_id': product_id,
+                'time_unit': time_unit, 'warning_threshold': warning_threshold,
+                'critical_threshold': critical_threshold, 'threshold_type': threshold_type}
+    
+    def chunks(self, chunk_rows=CHUNK_ROWS, warning_threshold=WARNING_THRESHOLD,
+               critical_threshold=CRITICAL_THRESHOLD, threshold_type=THRESHOLD_TYPE):
+        """Yield column chunks of the rows to insert"""
+        for position, cells in self.codes():
+            constants = self.constants(position, warning_threshold, critical_threshold, threshold_type)
+            for first in range(0, len(cells), chunk_rows):
+                origin, destination = np.divmod(cells[first:first + chunk_rows], self.city_count)
+                n = len(origin)
+                yield {
+                    **{column: [value] * n for column, value in constants.items()},
+                    'origin_city_id': self.city_ids[origin].tolist(),
+                    'destination_city_id': self.city_ids[destination].tolist(),
+                }
+    
+    def write_copy(self, path, warning_threshold=WARNING_THRESHOLD, critical_threshold=CRITICAL_THRESHOLD,
+                   threshold_type=THRESHOLD_TYPE):
+        """
+        Write the rows to insert as a STANDARD_COLUMNS COPY file; returns the row count.
+        
+        With city ids of one length (UUIDs) every line of a (carrier, product) has
+        the same width, so lines are assembled as a byte matrix from the encoded
+        cities; other ids go through CopyWriter.
+        """
+        from generate_demo_account import CopyWriter
+        
+        cities = [value.encode('utf-8') for value in CopyWriter.encode_column(self.city_ids.tolist())]
+        width = len(cities[0]) if cities else 0
+        rows = 0
+        if any(len(city) != width for city in cities):
+            writer = CopyWriter(path, STANDARD_COLUMNS)
+            try:
+                for chunk in self.chunks(warning_threshold=warning_threshold, critical_threshold=critical_threshold,
+                                         threshold_type=threshold_type):
+                    writer.write(chunk)
+                    rows += len(chunk['origin_city_id'])
+            finally:
+                writer.close()
+            return rows
+        
+        city_bytes = np.frombuffer(b''.join(cities), dtype=np.uint8).reshape(len(cities), width)
+        origin_at = STANDARD_COLUMNS.index('origin_city_id')
+        with open(path, 'wb') as f:
+            for position, cells in self.codes():
+                constants = self.constants(position, warning_threshold, critical_threshold, threshold_type)
+                fields = CopyWriter.encode_column([constants.get(column) for column in STANDARD_COLUMNS])
+                prefix = ('\t'.join(fields[:origin_at]) + '\t').encode('utf-8')
+                suffix = ('\t' + '\t'.join(fields[origin_at + 2:]) + '\n').encode('utf-8')
+                start = len(prefix)
+                line = np.empty((min(len(cells), LINE_BLOCK), start + 2 * width + 1 + len(suffix)), dtype=np.uint8)
+                line[:, :start] = np.frombuffer(prefix, dtype=np.uint8)
+                line[:, start + width] = ord('\t')
+                line[:, start + 2 * width + 1:] = np.frombuffer(suffix, dtype=np.uint8)
+                for first in range(0, len(cells), LINE_BLOCK):
+                    origin, destination = np.divmod(cells[first:first + LINE_BLOCK], self.city_count)
+                    n = len(origin)
+                    line[:n, start:start + width] = city_bytes[origin]
+                    line[:n, start + width + 1:start + 2 * width + 1] = city_bytes[destination]
+                    f.write(line[:n].data)
+                rows += len(cells)
+        return rows
+
+def loop_generate(pairs, origin_ids, destination_ids, existing=()):
+    """The four nested loops of migration 008, one membership test per cell; for comparisons"""
+    present = set(existing)
+    rows = []
+    inserted = skipped = 0
+    for carrier_id, product_id, _ in pairs:
+        for origin_id in origin_ids:
+            for destination_id in destination_ids:
+                if origin_id != destination_id:
+                    key = (carrier_id, product_id, origin_id, destination_id)
+                    if key in present:
+                        skipped += 1
+                    else:
+                        present.add(key)
+                        rows.append(key)
+                        inserted += 1
+    return rows, inserted, skipped
+
+def synthetic_topology(city_count, rng):
+    """Pairs, city ids and a BENCHMARK_EXISTING share of existing standards keys"""
+    from generate_demo_account import random_uuids
+    
+    city_ids = random_uuids(rng, city_count)
+    pairs = [(carrier_id, product_id, 'days') for carrier_id in random_uuids(rng, BENCHMARK_CARRIERS)
+             for product_id in random_uuids(rng, BENCHMARK_PRODUCTS_PER_CARRIER)]
+    size = int(len(pairs) * city_count * city_count * BENCHMARK_EXISTING)
+    pair = rng.integers(0, len(pairs), size)
+    origin = rng.integers(0, city_count, size)
+    destination = rng.integers(0, city_count, size)
+    existing = {field: [] for field in STANDARD_KEY_FIELDS}
+    for p, o, d in zip(pair.tolist(), origin.tolist(), destination.tolist()):
+        if o != d:
+            existing['carrier_id'].append(pairs[p][0])
+            existing['product_id'].append(pairs[p][1])
+            existing['origin_city_id'].append(city_ids[o])
+            existing['destination_city_id'].append(city_ids[d])
+    return pairs, city_ids, existing
+
+def run_benchmark(seed=42):
+    """Time the matrix build against the nested loops on growing synthetic topologies"""
+    rng = np.random.default_rng(seed)
+    print(f"Synthetic topologies: {BENCHMARK_CARRIERS} carriers x {BENCHMARK_PRODUCTS_PER_CARRIER} products, "
+          f"{BENCHMARK_EXISTING:.0%} of the cells already present")
+    print(f"{'Cities':>7} {'Cells':>12} {'Inserted':>12} {'Loop':>9} {'Matrix':>8} {'+ COPY':>8} "
+          f"{'Speed-up':>9}  Result")
+    mismatches = 0
+    for city_count in BENCHMARK_CITIES:
+        pairs, city_ids, existing = synthetic_topology(city_count, rng)
+        
+        began = time.perf_counter()
+        matrix = StandardsMatrix(ACCOUNT_ID, pairs, city_ids, city_ids, existing)
+        codes = list(matrix.codes())
+        matrix_seconds = time.perf_counter() - began
+        
+        began = time.perf_counter()
+        StandardsMatrix(ACCOUNT_ID, pairs, city_ids, city_ids, existing).write_copy(os.devnull)
+        copy_seconds = time.perf_counter() - began
+        
+        # The loop runs on the first products only past LOOP_SAMPLE cells, and is extrapolated
+        sample = max(1, min(len(pairs), LOOP_SAMPLE // max(1, matrix.candidates_per_pair)))
+        keys = list(zip(*(existing[field] for field in STANDARD_KEY_FIELDS)))
+        began = time.perf_counter()
+        rows, inserted, skipped = loop_generate(pairs[:sample], city_ids, city_ids, keys)
+        loop_seconds = (time.perf_counter() - began) * len(pairs) / sample
+        
+        expected = {(carrier_id, product_id, origin_id, destination_id)
+                    for carrier_id, product_id, origin_id, destination_id in rows}
+        found = {(pairs[position][0], pairs[position][1], city_ids[cell // city_count], city_ids[cell % city_count])
+                 for position, cells in codes[:sample] for cell in cells.tolist()}
+        sampled = sum(len(cells) for _, cells in codes[:sample])
+        same = found == expected and sampled == inserted
+        mismatches += not same
+        print(f"{city_count:>7,} {matrix.candidates:>12,} {matrix.inserted:>12,} {loop_seconds:8.2f}s "
+              f"{matrix_seconds:7.3f}s {copy_seconds:7.2f}s {loop_seconds / matrix_seconds:8.0f}x  "
+              + ('✅ identical' if same else '❌ different')
+              + (f" (loop extrapolated from {sample} of {len(pairs)} products)" if sample < len(pairs) else ''))
+    return mismatches
+
+def write_outputs(matrix, output_dir, args):
+    """delivery_standards.copy and load.sql"""
+    os.makedirs(output_dir, exist_ok=True)
+    rows = matrix.write_copy(os.path.join(output_dir, 'delivery_standards.copy'), args.warning_threshold,
+                             args.critical_threshold, args.threshold_type)
+    
+    lines = [
+        f"-- Delivery standards of account {matrix.account_id} generated by scripts/generate_delivery_standards.py",
+        "-- Same rows as generate_delivery_standards; cells that already exist are skipped",
+        "",
+        "BEGIN;",
+        "",
+        "CREATE TEMP TABLE delivery_standards_load (LIKE delivery_standards INCLUDING DEFAULTS) ON COMMIT DROP;",
+        f"\\copy delivery_standards_load ({', '.join(STANDARD_COLUMNS)}) FROM 'delivery_standards.copy'",
+        "",
+        f"INSERT INTO delivery_standards ({', '.join(STANDARD_COLUMNS)})",
+        f"SELECT {', '.join(STANDARD_COLUMNS)}",
+        "FROM delivery_standards_load",
+        "ON CONFLICT ON CONSTRAINT delivery_standards_unique DO NOTHING;",
+        "",
+        "COMMIT;",
+        "",
+    ]
+    with open(os.path.join(output_dir, 'load.sql'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+    return rows
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Generate the delivery standards matrix in bulk, as '
+                                                 'generate_delivery_standards does')
+    parser.add_argument('--account', help='account id')
+    parser.add_argument('--carriers', help='carriers extract with id, account_id, status')
+    parser.add_argument('--products', help='products extract with id, carrier_id, status, time_unit')
+    parser.add_argument('--cities', help='cities extract with id, account_id, status')
+    parser.add_argument('--existing', help='delivery_standards extract with carrier_id, product_id, '
+                                           'origin_city_id, destination_city_id')
+    parser.add_argument('--carrier', action='append', help='carrier id (repeatable; default: active carriers)')
+    parser.add_argument('--product', action='append', help='product id (repeatable; default: active products)')
+    parser.add_argument('--origin', action='append', help='origin city id (repeatable; default: active cities)')
+    parser.add_argument('--destination', action='append',
+                        help='destination city id (repeatable; default: active cities)')
+    parser.add_argument('--warning-threshold', type=float, default=WARNING_THRESHOLD,
+                        help='warning_threshold of the new rows (default: NULL)')
+    parser.add_argument('--critical-threshold', type=float, default=CRITICAL_THRESHOLD,
+                        help='critical_threshold of the new rows (default: NULL)')
+    parser.add_argument('--threshold-type', choices=['relative', 'absolute'], default=THRESHOLD_TYPE,
+                        help='threshold_type of the new rows (default: NULL)')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f'output directory (default: {OUTPUT_DIR})')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='compare with the nested loops on synthetic topologies instead')
+    args = parser.parse_args(argv)
+    if not args.benchmark and not (args.account and args.carriers and args.products and args.cities):
+        parser.error('--account, --carriers, --products and --cities are required unless --benchmark is given')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.benchmark:
+        raise SystemExit(1 if run_benchmark() else 0)
+    
+    began = time.perf_counter()
+    pairs, origin_ids, destination_ids = select_topology(
+        read_extract(args.carriers, CARRIER_FIELDS), read_extract(args.products, PRODUCT_FIELDS),
+        read_extract(args.cities, CITY_FIELDS), args.account, args.carrier, args.product,
+        args.origin, args.destination)
+    existing = read_extract(args.existing, STANDARD_KEY_FIELDS) if args.existing else None
+    matrix = StandardsMatrix(args.account, pairs, origin_ids, destination_ids, existing)
+    print(f"{len(pairs)} carrier products, {len(origin_ids)} origins x {len(destination_ids)} destinations: "
+          f"{matrix.candidates:,} cells")
+    
+    rows = write_outputs(matrix, args.output_dir, args)
+    print(f"✅ {rows:,} standards to insert, {matrix.skipped:,} skipped"
+          + ('' if args.existing else ' (no --existing: load.sql skips the rows already present)')
+          + f", in {time.perf_counter() - began:.1f}s; load with: cd {args.output_dir} && psql -f load.sql")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Generate a large synthetic demo account for load testing
+Uses the demo2 seed (seed_data/demo2_seed_data.json) as the column template and
+writes one consistent account: regions, cities, nodes, panelists, carriers,
+products, the full delivery-standards matrix and one_db shipments.
+
+Output is streamed in chunks as NDJSON or as Postgres COPY text files (with a
+load.sql for psql), so memory stays flat however many shipments are requested.
+The same --seed always produces the same files; each table draws from its own
+random stream, so changing --shipments does not change the reference data.
+
+Transit times are lognormal per route, calibrated so that the share of
+shipments within the route's standard matches a per-route compliance target
+(most routes near the product's success percentage, a tail of problem routes
+well below it). As in the transfer trigger (migration 018), on_time_delivery is
+total_transit_days <= standard_time; business_transit_days counts Mon-Fri days
+like calculate_business_days (migration 017).
+
+Usage:
+    python3 scripts/generate_demo_account.py --cities 2000 --shipments 5000000 --seed 7
+    cd seed_data/generated && psql "$DATABASE_URL" -f load.sql
+"""
+
+import os
+import json
+import time
+import argparse
+import datetime
+from statistics import NormalDist
+
+import numpy as np
+
+from insert_demo2_seed_data import SEED_DATA_FILE, iter_seed_tables
+
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '../seed_data/generated')
+FORMATS = ('copy', 'ndjson')
+
+# Rows generated and written per chunk
+CHUNK_ROWS = 100_000
+
+# Tables taken from the demo2 seed, in load (foreign key) order
+TEMPLATE_TABLES = ['regions', 'cities', 'nodes', 'carriers', 'products', 'panelists', 'delivery_standards']
+
+ACCOUNT_COLUMNS = ['id', 'name', 'slug', 'status', 'created_at', 'updated_at']
+
+# Migration 015_create_one_db_table.sql
+ONE_DB_COLUMNS = [
+    'id', 'account_id', 'allocation_detail_id', 'tag_id', 'plan_name', 'carrier_name', 'product_name',
+    'origin_city_name', 'destination_city_name', 'sent_at', 'received_at', 'total_transit_days',
+    'business_transit_days', 'on_time_delivery', 'created_at', 'source_data_snapshot',
+]
+
+# Product lines cloned for every carrier, as in the demo2 seed
+PRODUCT_LINES = [
+    # (code suffix, description, standard_delivery_hours, time_unit, base standard days, success %)
+    ('EXPRESS', 'EXPRESS', 24, 'hours', 1, 90.0),
+    ('STANDARD', 'STANDARD', 3, 'days', 3, 85.0),
+]
+
+# Route quality: share of routes one day slower (remote) and well below target (problem)
+REMOTE_SHARE = 0.15
+PROBLEM_SHARE = 0.10
+TRANSIT_SIGMA = 0.35
+MIN_TRANSIT_SECONDS = 4 * 3600
+MAX_TRANSIT_DAYS = 60
+
+SYLLABLES = ['ba', 'ca', 'da', 'fe', 'gi', 'lo', 'ma', 'no', 'pa', 'qui', 're', 'sa', 'ta', 'vi', 'zo',
+             'bel', 'cor', 'dan', 'fer', 'gal', 'lin', 'mor', 'nar', 'pol', 'ros', 'sel', 'tor', 'val']
+FIRST_NAMES = ['Ana', 'Luis', 'Marta', 'David', 'Sara', 'Jorge', 'Elena', 'Omar', 'Lucia', 'Pablo',
+               'Nadia', 'Hugo', 'Irene', 'Karim', 'Julia', 'Tomas', 'Laura', 'Samir', 'Carmen', 'Ivan']
+LAST_NAMES = ['Garcia', 'Miller', 'Dubois', 'Haddad', 'Lopez', 'Smith', 'Martin', 'Rossi', 'Nunez',
+              'Benali', 'Moreau', 'Silva', 'Khan', 'Romero', 'Fischer', 'Costa', 'Ortega', 'Laurent']
+
+NORMAL = NormalDist()
+inverse_normal = np.vectorize(NORMAL.inv_cdf, otypes=[float])
+
+def load_template(path=SEED_DATA_FILE):
+    """{table: column list} from the first record of each demo2 seed table"""
+    columns = {}
+    for table_name, records in iter_seed_tables(path):
+        if records:
+            columns[table_name] = list(records[0])
+    missing = [table for table in TEMPLATE_TABLES if table not in columns]
+    if missing:
+        raise SystemExit(f"❌ {path} has no template rows for: {', '.join(missing)}")
+    return columns
+
+def random_uuids(rng, n):
+    """n version-4 UUID strings drawn from rng"""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    flat = raw.tobytes().hex()
+    hexes = [flat[i:i + 32] for i in range(0, len(flat), 32)]
+    return [f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}" for h in hexes]
+
+def mix64(values):
+    """SplitMix64 finalizer over a uint64 array: a cheap, well-spread hash"""
+    with np.errstate(over='ignore'):
+        x = values + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+def unique_names(rng, n, parts=(2, 3)):
+    """n distinct capitalised pseudo place names"""
+    names = []
+    seen = {}
+    while len(names) < n:
+        count = rng.integers(parts[0], parts[1] + 1)
+        name = ''.join(rng.choice(SYLLABLES, size=count)).capitalize()
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name} {seen[name]}")
+    return names
+
+def iso(timestamp):
+    return timestamp.isoformat(timespec='seconds')
+
+class CopyWriter:
+    """Postgres COPY text format: tab separated, \\N for NULL"""
+    suffix = '.copy'
+    
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', encoding='utf-8', newline='\n')
+        self.columns = columns
+        self.rows = 0
+    
+    @staticmethod
+    def encode_column(values):
+        encoded = []
+        for value in values:
+            if value is None:
+                encoded.append('\\N')
+            elif value is True or value is False:
+                encoded.append('t' if value else 'f')
+            elif isinstance(value, str):
+                if '\\' in value or '\t' in value or '\n' in value or '\r' in value:
+                    value = (value.replace('\\', '\\\\').replace('\t', '\\t')
+                             .replace('\n', '\\n').replace('\r', '\\r'))
+                encoded.append(value)
+            elif isinstance(value, (dict, list)):
+                encoded.append(json.dumps(value).replace('\\', '\\\\'))
+            else:
+                encoded.append(str(value))
+        return encoded
+    
+    def write(self, data):
+        """Write a chunk given as {column: list of values}"""
+        encoded = [self.encode_column(data[column]) for column in self.columns]
+        lines = ['\t'.join(row) for row in zip(*encoded)]
+        if lines:
+            self.file.write('\n'.join(lines) + '\n')
+        self.rows += len(lines)
+    
+    def close(self):
+        self.file.close()
+
+class NdjsonWriter:
+    """One JSON object per line"""
+    suffix = '.ndjson'
+    
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', encoding='utf-8', newline='\n')
+        self.columns = columns
+        self.rows = 0
+    
+    def write(self, data):
+        """Write a chunk given as {column: list of values}"""
+        values = [data[column] for column in self.columns]
+        lines = [json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) for row in zip(*values)]
+        if lines:
+            self.file.write('\n'.join(lines) + '\n')
+        self.rows += len(lines)
+    
+    def close(self):
+        self.file.close()
+
+WRITERS = {'copy': CopyWriter, 'ndjson': NdjsonWriter}
+
+class DemoAccountGenerator:
+    """Builds the reference tables in memory and streams the large ones"""
+    
+    def __init__(self, template, args):
+        self.template = template
+        self.args = args
+        self.seed = args.seed
+        self.start = datetime.date.fromisoformat(args.start)
+        self.created_at = iso(datetime.datetime.combine(self.start, datetime.time(), datetime.timezone.utc))
+        self.account_id = random_uuids(self.rng('account'), 1)[0]
+    
+    def rng(self, stream):
+        """Independent random stream per table, derived from the seed"""
+        salt = int.from_bytes(stream.encode('utf-8')[:8].ljust(8, b'\0'), 'little')
+        return np.random.default_rng([self.seed, salt])
+    
+    def common(self, n):
+        return {
+            'account_id': [self.account_id] * n,
+            'status': ['active'] * n,
+            'created_at': [self.created_at] * n,
+            'updated_at': [self.created_at] * n,
+        }
+    
+    def build_reference(self):
+        """Account, regions, cities, nodes, panelists, carriers and products as column dicts"""
+        args = self.args
+        tables = {}
+        
+        tables['accounts'] = {
+            'id': [self.account_id],
+            'name': [f"Load Test {self.seed}"],
+            'slug': [f"load-test-{self.seed}"],
+            'status': ['active'],
+            'created_at': [self.created_at],
+            'updated_at': [self.created_at],
+        }
+        
+        rng = self.rng('regions')
+        n_regions = args.regions
+        region_names = unique_names(rng, n_regions)
+        region_codes = [f"R{i + 1:03d}" for i in range(n_regions)]
+        self.region_ids = random_uuids(rng, n_regions)
+        self.region_names = region_names
+        region_centers = np.column_stack([rng.uniform(-40, 60, n_regions), rng.uniform(-120, 140, n_regions)])
+        tables['regions'] = {
+            **self.common(n_regions),
+            'id': self.region_ids,
+            'name': region_names,
+            'code': region_codes,
+            'description': [''] * n_regions,
+            'country_code': [f"L{i % 100:02d}" for i in range(n_regions)],
+        }
+        
+        rng = self.rng('cities')
+        n_cities = args.cities
+        self.city_ids = random_uuids(rng, n_cities)
+        self.city_names = unique_names(rng, n_cities, parts=(2, 4))
+        self.city_region = np.sort(rng.integers(0, n_regions, n_cities))
+        # Zipf-like populations; shipments are drawn proportionally to population
+        ranks = rng.permutation(n_cities) + 1
+        population = (8_000_000 / ranks ** 1.05 * rng.lognormal(0, 0.2, n_cities)).astype(np.int64) + 5_000
+        self.city_weights = population / population.sum()
+        classification = np.where(ranks <= max(1, n_cities // 20), 'A', np.where(ranks <= n_cities // 4, 'B', 'C'))
+        coordinates = region_centers[self.city_region] + rng.normal(0, 2.0, (n_cities, 2))
+        city_codes = [f"C{i + 1:05d}" for i in range(n_cities)]
+        tables['cities'] = {
+            **self.common(n_cities),
+            'id': self.city_ids,
+            'region_id': [self.region_ids[r] for r in self.city_region],
+            'name': self.city_names,
+            'code': city_codes,
+            'latitude': np.round(coordinates[:, 0], 4).tolist(),
+            'longitude': np.round(coordinates[:, 1], 4).tolist(),
+            'classification': classification.tolist(),
+            'city_type': [None] * n_cities,
+            'region_name': [region_names[r] for r in self.city_region],
+            'population': population.tolist(),
+        }
+        
+        rng = self.rng('nodes')
+        per_city = args.nodes_per_city
+        node_city = np.repeat(np.arange(n_cities), per_city)
+        node_seq = np.tile(np.arange(1, per_city + 1), n_cities)
+        n_nodes = len(node_city)
+        node_ids = random_uuids(rng, n_nodes)
+        tables['nodes'] = {
+            **self.common(n_nodes),
+            'id': node_ids,
+            'city_id': [self.city_ids[c] for c in node_city],
+            'auto_id': [f"{region_codes[self.city_region[c]]}-{city_codes[c]}-{s:03d}"
+                        for c, s in zip(node_city, node_seq)],
+        }
+        
+        rng = self.rng('panelists')
+        per_node = args.panelists_per_node
+        panelist_node = np.repeat(np.arange(n_nodes), per_node)
+        n_panelists = len(panelist_node)
+        first = rng.choice(FIRST_NAMES, n_panelists)
+        last = rng.choice(LAST_NAMES, n_panelists)
+        tables['panelists'] = {
+            **self.common(n_panelists),
+            'id': random_uuids(rng, n_panelists),
+            'panelist_code': [f"PAN-{city_codes[node_city[n]]}-{node_seq[n]:03d}-{i % per_node + 1:03d}"
+                              for i, n in enumerate(panelist_node)],
+            'name': [f"{f} {l}" for f, l in zip(first, last)],
+            'email': [f"{f.lower()}.{l.lower()}.{i}@example.com" for i, (f, l) in enumerate(zip(first, last))],
+            'mobile': [f"+1-555-{i // 10000 % 1000:03d}-{i % 10000:04d}" for i in range(n_panelists)],
+            'node_id': [node_ids[n] for n in panelist_node],
+            'city_id': [self.city_ids[node_city[n]] for n in panelist_node],
+            'created_by': [None] * n_panelists,
+            'updated_by': [None] * n_panelists,
+            'address_line1': [f"{100 + i % 900} Main St" for i in range(n_panelists)],
+            'address_line2': [''] * n_panelists,
+            'postal_code': [''] * n_panelists,
+            'address_city': [self.city_names[node_city[n]] for n in panelist_node],
+            'address_country': [''] * n_panelists,
+            'telegram_id': [None] * n_panelists,
+        }
+        
+        rng = self.rng('carriers')
+        n_carriers = args.carriers
+        letters = [chr(ord('A') + i % 26) + ('' if i < 26 else str(i // 26)) for i in range(n_carriers)]
+        self.carrier_ids = random_uuids(rng, n_carriers)
+        self.carrier_names = [f"Carrier {letter}" for letter in letters]
+        tables['carriers'] = {
+            **self.common(n_carriers),
+            'id': self.carrier_ids,
+            'code': [f"CARRIER {letter}" for letter in letters],
+            'name': self.carrier_names,
+            'type': [', '.join(line[1].title() for line in PRODUCT_LINES)] * n_carriers,
+        }
+        
+        rng = self.rng('products')
+        n_products = n_carriers * len(PRODUCT_LINES)
+        self.product_ids = random_uuids(rng, n_products)
+        self.product_carrier = np.repeat(np.arange(n_carriers), len(PRODUCT_LINES))
+        lines = [PRODUCT_LINES[i % len(PRODUCT_LINES)] for i in range(n_products)]
+        self.product_descriptions = [line[1] for line in lines]
+        self.product_codes = [f"CARRIER {letters[c]} {line[0]}" for c, line in zip(self.product_carrier, lines)]
+        self.product_base_days = np.array([line[4] for line in lines])
+        self.product_success = np.array([line[5] for line in lines])
+        tables['products'] = {
+            **self.common(n_products),
+            'id': self.product_ids,
+            'carrier_id': [self.carrier_ids[c] for c in self.product_carrier],
+            'code': self.product_codes,
+            'description': self.product_descriptions,
+            'standard_delivery_hours': [line[2] for line in lines],
+            'time_unit': [line[3] for line in lines],
+        }
+        
+        return tables
+    
+    def route_profile(self, product, origin, destination):
+        """
+        Standard (days), success % and compliance target for each route.
+        
+        Derived from a hash of (seed, product, origin, destination), so the
+        delivery-standards matrix and the shipments agree without the matrix
+        being kept in memory.
+        """
+        n_cities = np.uint64(len(self.city_ids))
+        key = ((product.astype(np.uint64) * n_cities + origin.astype(np.uint64)) * n_cities
+               + destination.astype(np.uint64))
+        key = mix64(key ^ mix64(np.full(key.shape, self.seed, dtype=np.uint64)))
+        u_remote = (key & np.uint64(0xFFFF)).astype(float) / 65536
+        u_target = ((key >> np.uint64(16)) & np.uint64(0xFFFF)).astype(float) / 65536
+        u_problem = ((key >> np.uint64(32)) & np.uint64(0xFFFF)).astype(float) / 65536
+        
+        cross_region = self.city_region[origin] != self.city_region[destination]
+        standard = self.product_base_days[product] + cross_region + (u_remote < REMOTE_SHARE)
+        success = self.product_success[product]
+        target = np.where(u_problem < PROBLEM_SHARE,
+                          success - 10 - 30 * u_target,
+                          success + (u_target - 0.3) * 12)
+        return standard, success, np.clip(target, 20.0, 99.5)
+    
+    def delivery_standards(self):
+        """Yield column chunks of the full product x origin x destination matrix"""
+        rng = self.rng('delivery_standards')
+        n_cities = len(self.city_ids)
+        origins_per_chunk = max(1, CHUNK_ROWS // max(1, n_cities - 1))
+        
+        for product in range(len(self.product_ids)):
+            for first_origin in range(0, n_cities, origins_per_chunk):
+                origins = np.arange(first_origin, min(n_cities, first_origin + origins_per_chunk))
+                origin = np.repeat(origins, n_cities)
+                destination = np.tile(np.arange(n_cities), len(origins))
+                keep = origin != destination
+                origin, destination = origin[keep], destination[keep]
+                products = np.full(len(origin), product)
+                standard, success, _ = self.route_profile(products, origin, destination)
+                n = len(origin)
+                
+                yield {
+                    **self.common(n),
+                    'id': random_uuids(rng, n),
+                    'carrier_id': [self.carrier_ids[self.product_carrier[product]]] * n,
+                    'product_id': [self.product_ids[product]] * n,
+                    'origin_city_id': [self.city_ids[o] for o in origin],
+                    'destination_city_id': [self.city_ids[d] for d in destination],
+                    'standard_time': standard.astype(float).tolist(),
+                    'success_percentage': success.tolist(),
+                    'time_unit': ['days'] * n,
+                    'warning_threshold': [80.0] * n,
+                    'critical_threshold': [60.0] * n,
+                    'threshold_type': ['relative'] * n,
+                }
+    
+    def shipments(self):
+        """Yield column chunks of one_db rows"""
+        rng = self.rng('one_db')
+        args = self.args
+        n_cities = len(self.city_ids)
+        n_products = len(self.product_ids)
+        end = self.start + datetime.timedelta(weeks=args.weeks)
+        business_days = np.arange(np.datetime64(self.start), np.datetime64(end), dtype='datetime64[D]')
+        business_days = business_days[np.is_busday(business_days)]
+        snapshot = {'synthetic': True, 'seed': self.seed}
+        
+        for first in range(0, args.shipments, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, args.shipments - first)
+            
+            product = rng.integers(0, n_products, n)
+            origin = rng.choice(n_cities, n, p=self.city_weights)
+            destination = rng.choice(n_cities, n, p=self.city_weights)
+            same = origin == destination
+            destination[same] = (destination[same] + rng.integers(1, n_cities, same.sum())) % n_cities
+            
+            standard, _, target = self.route_profile(product, origin, destination)
+            
+            # Lognormal transit time calibrated so that P(total days <= standard) = target
+            mu = np.log(standard + 1) - TRANSIT_SIGMA * inverse_normal(target / 100)
+            transit = np.exp(mu + TRANSIT_SIGMA * rng.standard_normal(n)) * 86400
+            transit = np.clip(transit, MIN_TRANSIT_SECONDS, MAX_TRANSIT_DAYS * 86400).astype(np.int64)
+            
+            sent_date = business_days[rng.integers(0, len(business_days), n)]
+            sent_at = sent_date.astype('datetime64[s]') + rng.integers(8 * 3600, 18 * 3600, n).astype('timedelta64[s]')
+            received_at = sent_at + transit.astype('timedelta64[s]')
+            received_date = received_at.astype('datetime64[D]')
+            total_days = transit // 86400
+            business = np.busday_count(sent_date, received_date)
+            on_time = total_days <= standard
+            
+            sent_text = [f"{value}+00:00" for value in np.datetime_as_string(sent_at, unit='s')]
+            received_text = [f"{value}+00:00" for value in np.datetime_as_string(received_at, unit='s')]
+            months = np.datetime_as_string(sent_date, unit='M')
+            
+            yield {
+                'id': random_uuids(rng, n),
+                'account_id': [self.account_id] * n,
+                'allocation_detail_id': random_uuids(rng, n),
+                'tag_id': [f"TAG{first + i + 1:010d}" for i in range(n)],
+                'plan_name': [f"PLAN {self.product_codes[p]} {m}" for p, m in zip(product, months)],
+                'carrier_name': [self.carrier_names[self.product_carrier[p]] for p in product],
+                'product_name': [self.product_descriptions[p] for p in product],
+                'origin_city_name': [self.city_names[o] for o in origin],
+                'destination_city_name': [self.city_names[d] for d in destination],
+                'sent_at': sent_text,
+                'received_at': received_text,
+                'total_transit_days': total_days.tolist(),
+                'business_transit_days': business.tolist(),
+                'on_time_delivery': on_time.tolist(),
+                'created_at': received_text,
+                'source_data_snapshot': [snapshot] * n,
+            }
+
+def write_load_script(output_dir, written, args):
+    """psql script that COPYs every table in foreign key order"""
+    lines = [
+        f"-- Synthetic demo account generated by scripts/generate_demo_account.py (seed {args.seed})",
+        "-- one_db.account_id references auth.users and one_db.allocation_detail_id references",
+        "-- allocation_plan_details, which are not generated; foreign key triggers are skipped",
+        "-- for this session, so run as a role allowed to set session_replication_role.",
+        "",
+        "BEGIN;",
+        "SET LOCAL session_replication_role = replica;",
+        "",
+    ]
+    for table, (file_name, columns) in written.items():
+        lines.append(f"\\copy {table} ({', '.join(columns)}) FROM '{file_name}'")
+    lines += ["", "COMMIT;", ""]
+    
+    with open(os.path.join(output_dir, 'load.sql'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Generate a large synthetic demo account')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (default: 42)')
+    parser.add_argument('--regions', type=int, default=20, help='regions (default: 20)')
+    parser.add_argument('--cities', type=int, default=1000, help='cities (default: 1000)')
+    parser.add_argument('--nodes-per-city', type=int, default=3, help='nodes per city (default: 3)')
+    parser.add_argument('--panelists-per-node', type=int, default=2, help='panelists per node (default: 2)')
+    parser.add_argument('--carriers', type=int, default=3, help=f'carriers, each with {len(PRODUCT_LINES)} '
+                                                                 f'products (default: 3)')
+    parser.add_argument('--shipments', type=int, default=1_000_000, help='one_db rows (default: 1000000)')
+    parser.add_argument('--start', default='2024-01-01', help='first shipment date (default: 2024-01-01)')
+    parser.add_argument('--weeks', type=int, default=104, help='weeks of shipments (default: 104)')
+    parser.add_argument('--format', choices=FORMATS, default='copy', help='output format (default: copy)')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                        help='output directory (default: seed_data/generated)')
+    parser.add_argument('--template', default=SEED_DATA_FILE,
+                        help='seed file whose columns are used as the template')
+    args = parser.parse_args(argv)
+    if args.cities < 2:
+        parser.error('--cities must be at least 2')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    template = load_template(args.template)
+    template['accounts'] = ACCOUNT_COLUMNS
+    template['one_db'] = ONE_DB_COLUMNS
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    writer_class = WRITERS[args.format]
+    generator = DemoAccountGenerator(template, args)
+    
+    n_products = args.carriers * len(PRODUCT_LINES)
+    print(f"Generating account {generator.account_id} (seed {args.seed}) into {args.output_dir}")
+    print(f"   {args.regions} regions, {args.cities} cities, {args.cities * args.nodes_per_city} nodes, "
+          f"{n_products} products, {n_products * args.cities * (args.cities - 1):,} delivery standards, "
+          f"{args.shipments:,} shipments over {args.weeks} weeks")
+    
+    start = time.perf_counter()
+    written = {}
+    
+    def emit(table, chunks):
+        table_start = time.perf_counter()
+        file_name = table + writer_class.suffix
+        columns = template[table]
+        writer = writer_class(os.path.join(args.output_dir, file_name), columns)
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        finally:
+            writer.close()
+        written[table] = (file_name, columns)
+        size = os.path.getsize(os.path.join(args.output_dir, file_name))
+        print(f"  {table:<20} {writer.rows:>12,} rows {size / 1024 / 1024:>10.1f} MB "
+              f"{time.perf_counter() - table_start:>8.1f}s")
+    
+    reference = generator.build_reference()
+    emit('accounts', [reference['accounts']])
+    for table in TEMPLATE_TABLES:
+        if table == 'delivery_standards':
+            emit(table, generator.delivery_standards())
+        else:
+            emit(table, [reference[table]])
+    emit('one_db', generator.shipments())
+    
+    if args.format == 'copy':
+        write_load_script(args.output_dir, written, args)
+    
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'account_id': generator.account_id, 'args': vars(args),
+                   'files': {table: file_name for table, (file_name, _) in written.items()}}, f, indent=2)
+    
+    print(f"✅ Done in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
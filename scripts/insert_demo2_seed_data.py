@@ -2,78 +2,450 @@
 """
 Script to insert DEMO2 seed data into Supabase
 Run this after executing the UP migration
+
+--sync streams the seed file table by table, compares each table's content hash
+with the data_hash stored in demo2_seed_data (migration 20260206_demo2_seed_data_hash)
+and upserts only the changed tables, batched and concurrently over pooled
+keep-alive connections with retries. A plain run (or any other writer) leaves
+data_hash out, and the migration's trigger clears it, so the next --sync
+uploads those tables again.
 """
 
-from supabase import create_client
 import json
 import sys
 import os
+import gzip
+import time
+import random
+import hashlib
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit, quote
+from concurrent.futures import ThreadPoolExecutor
 
 # Configuration
-SUPABASE_URL = "https://sehbnpgzqljrsqimwyuz.supabase.co"
+SUPABASE_URL = os.environ.get('SUPABASE_URL', "https://sehbnpgzqljrsqimwyuz.supabase.co")
 SUPABASE_KEY = os.environ.get('SUPABASE_SERVICE_ROLE_KEY', '')
 
-if not SUPABASE_KEY:
-    print("❌ Error: SUPABASE_SERVICE_ROLE_KEY environment variable not set")
-    print("   Set it with: export SUPABASE_SERVICE_ROLE_KEY='your-key'")
-    sys.exit(1)
-
 # Path to seed data file
 SEED_DATA_FILE = os.path.join(os.path.dirname(__file__), '../seed_data/demo2_seed_data.json')
 
-if not os.path.exists(SEED_DATA_FILE):
-    print(f"❌ Error: Seed data file not found: {SEED_DATA_FILE}")
-    sys.exit(1)
+SEED_TABLE = 'demo2_seed_data'
+
+# --sync: tables are grouped into upsert requests of at most this many JSON bytes
+BATCH_BYTES = 1024 * 1024
+STREAM_CHUNK = 64 * 1024
+
+# Retry rate limits, server errors and dropped connections with exponential backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+def insert_all(seed_file):
+    """Upsert every table of the seed file, one request per table"""
+    from supabase import create_client
+    
+    # Create Supabase client
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    
+    # Read seed data
+    with open(seed_file, 'r') as f:
+        seed_data = json.load(f)
+    
+    print(f"\nLoaded seed data from: {seed_file}")
+    print(f"Tables to insert: {len(seed_data)}\n")
+    
+    # Insert data
+    success_count = 0
+    error_count = 0
+    
+    for table_name, records in seed_data.items():
+        print(f"📦 {table_name}: {len(records)} records", end=" ... ")
+        
+        try:
+            result = supabase.table(SEED_TABLE).upsert({
+                'table_name': table_name,
+                'data': records,
+                'record_count': len(records)
+            }, on_conflict='table_name').execute()
+            
+            if result.data:
+                print("✅ OK")
+                success_count += 1
+            else:
+                print("❌ FAILED")
+                error_count += 1
+        except Exception as e:
+            print(f"❌ ERROR: {str(e)}")
+            error_count += 1
+    
+    return success_count, error_count
+
+def iter_seed_tables(path, chunk_size=STREAM_CHUNK):
+    """
+    Yield (table_name, records) from a {"table": [record, ...], ...} JSON file.
+    
+    The file is read in chunks and decoded one record at a time, so only the
+    table being yielded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+        
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return not eof
+        
+        def peek():
+            """Next non-whitespace character, reading more input as needed"""
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not fill():
+                    raise ValueError(f"{path}: unexpected end of JSON")
+        
+        def expect(char):
+            nonlocal pos
+            if peek() != char:
+                raise ValueError(f"{path}: expected {char!r}, found {buffer[pos]!r}")
+            pos += 1
+        
+        def decode_value():
+            """Decode one JSON value, reading more input until it is complete"""
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+                    continue
+                # A number at the very end of the buffer may continue in the next chunk
+                if end == len(buffer) and not eof and fill():
+                    continue
+                pos = end
+                return value
+        
+        expect('{')
+        if peek() == '}':
+            return
+        while True:
+            table_name = decode_value()
+            expect(':')
+            expect('[')
+            records = []
+            if peek() != ']':
+                while True:
+                    records.append(decode_value())
+                    if peek() == ',':
+                        pos += 1
+                        continue
+                    break
+            expect(']')
+            yield table_name, records
+            if peek() == ',':
+                pos += 1
+                continue
+            expect('}')
+            return
 
-# Create Supabase client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+def canonical_json(records):
+    return json.dumps(records, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
 
-print("=" * 80)
-print("INSERTING DEMO2 SEED DATA INTO SUPABASE")
-print("=" * 80)
+def data_hash(records):
+    return hashlib.sha256(canonical_json(records).encode('utf-8')).hexdigest()
 
-# Read seed data
-with open(SEED_DATA_FILE, 'r') as f:
-    seed_data = json.load(f)
+class RestError(Exception):
+    """A PostgREST request that failed after all retries"""
+    
+    def __init__(self, status, message):
+        super().__init__(f"{status or 'connection'}: {message}")
+        self.status = status
+        self.message = message
 
-print(f"\nLoaded seed data from: {SEED_DATA_FILE}")
-print(f"Tables to insert: {len(seed_data)}\n")
+def retry_delay(attempt, retry_after=None):
+    """Backoff for the given attempt, honouring a Retry-After header when present"""
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = BACKOFF_BASE * 2 ** attempt
+    delay = min(delay, BACKOFF_MAX)
+    return delay + random.uniform(0, delay * 0.1)
 
-# Insert data
-success_count = 0
-error_count = 0
+class RestSession:
+    """
+    Minimal PostgREST client.
+    
+    Each worker thread keeps one keep-alive connection; responses are requested
+    gzip-compressed and retryable failures are retried with backoff.
+    """
+    
+    def __init__(self, url, key, timeout=60):
+        parts = urlsplit(url)
+        self.connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                                 else http.client.HTTPConnection)
+        self.host = parts.netloc
+        self.base_path = parts.path.rstrip('/') + '/rest/v1'
+        self.headers = {
+            'Authorization': f'Bearer {key}',
+            'apikey': key,
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip',
+        }
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.requests = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+    
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.connection_class(self.host, timeout=self.timeout)
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+    
+    def reset(self):
+        """Drop this thread's connection after a network error"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+    
+    def request(self, method, path, body=None, headers=None):
+        """Send a request and return the decoded JSON body (None if empty)"""
+        for attempt in range(MAX_RETRIES + 1):
+            with self.lock:
+                self.requests += 1
+                self.bytes_sent += len(body or b'')
+            try:
+                conn = self.connection()
+                conn.request(method, self.base_path + path, body=body,
+                             headers={**self.headers, **(headers or {})})
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.reset()
+                if attempt == MAX_RETRIES:
+                    raise RestError(None, e)
+                retry_after = None
+            else:
+                with self.lock:
+                    self.bytes_received += len(data)
+                if response.getheader('Content-Encoding') == 'gzip':
+                    data = gzip.decompress(data)
+                if response.status < 300:
+                    return json.loads(data) if data else None
+                if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    raise RestError(response.status, data.decode('utf-8', 'replace'))
+                retry_after = response.getheader('Retry-After')
+            
+            with self.lock:
+                self.retries += 1
+            time.sleep(retry_delay(attempt, retry_after))
+    
+    def select(self, table, columns):
+        return self.request('GET', f"/{quote(table)}?select={quote(columns, safe=',')}")
+    
+    def upsert(self, table, rows, on_conflict):
+        body = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.request('POST', f"/{quote(table)}?on_conflict={quote(on_conflict)}", body=body, headers={
+            'Content-Type': 'application/json',
+            'Prefer': 'resolution=merge-duplicates,return=minimal',
+        })
+    
+    def close(self):
+        for conn in self.connections:
+            conn.close()
 
-for table_name, records in seed_data.items():
-    print(f"📦 {table_name}: {len(records)} records", end=" ... ")
+def fetch_stored_hashes(session):
+    """
+    {table_name: data_hash} of what demo2_seed_data holds.
     
+    Before the data_hash migration has run, the stored data is downloaded and
+    hashed instead, which costs one full read but gives the same answer.
+    Returns (hashes, has_hash_column).
+    """
     try:
-        result = supabase.table('demo2_seed_data').upsert({
-            'table_name': table_name,
-            'data': records,
-            'record_count': len(records)
-        }, on_conflict='table_name').execute()
+        rows = session.select(SEED_TABLE, 'table_name,data_hash')
+        return {row['table_name']: row['data_hash'] for row in rows}, True
+    except RestError as e:
+        if e.status != 400 or '42703' not in e.message:
+            raise
+    
+    print("⚠️  demo2_seed_data.data_hash is missing; hashing stored data instead "
+          "(run migration 20260206_demo2_seed_data_hash.sql)")
+    rows = session.select(SEED_TABLE, 'table_name,data')
+    return {row['table_name']: data_hash(row['data']) for row in rows}, False
+
+def sync_tables(session, seed_file, jobs=4, batch_bytes=BATCH_BYTES, force=False, dry_run=False):
+    """
+    Upsert the tables whose records differ from what is stored.
+    
+    Tables are streamed from the seed file; changed ones are grouped into
+    requests of up to batch_bytes and sent on jobs worker threads, with at most
+    2 * jobs batches in flight. Returns a list of per-table result dicts.
+    """
+    stored, has_hash_column = fetch_stored_hashes(session)
+    results = []
+    in_flight = threading.BoundedSemaphore(max(1, jobs) * 2)
+    
+    def send(batch):
+        started = time.perf_counter()
+        rows = []
+        for result, records in batch:
+            row = {'table_name': result['table'], 'data': records, 'record_count': len(records)}
+            if has_hash_column:
+                row['data_hash'] = result['hash']
+            rows.append(row)
+        try:
+            session.upsert(SEED_TABLE, rows, 'table_name')
+            status = 'uploaded'
+        except RestError as e:
+            print(f"❌ ERROR ({', '.join(result['table'] for result, _ in batch)}): {e}")
+            status = 'failed'
+        finally:
+            in_flight.release()
+        latency = time.perf_counter() - started
+        for result, _ in batch:
+            result['status'] = status
+            result['latency'] = latency
+            result['batch_size'] = len(batch)
+    
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        batch = []
+        batch_size = 0
         
-        if result.data:
-            print("✅ OK")
-            success_count += 1
-        else:
-            print("❌ FAILED")
-            error_count += 1
-    except Exception as e:
-        print(f"❌ ERROR: {str(e)}")
-        error_count += 1
-
-print("\n" + "=" * 80)
-print(f"SUMMARY: {success_count} succeeded, {error_count} failed")
-print("=" * 80)
-
-if error_count == 0:
-    print("\n✅ All seed data inserted successfully!")
-    print("\nNext steps:")
-    print("1. Test the new function: SELECT admin_reset_and_seed_demo2();")
-    print("2. Update frontend to call the new function")
-    print("3. Deploy to Netlify")
-    sys.exit(0)
-else:
-    print("\n⚠️  Some errors occurred. Please check the output above.")
-    sys.exit(1)
+        def flush():
+            nonlocal batch, batch_size
+            if batch:
+                in_flight.acquire()
+                executor.submit(send, batch)
+            batch = []
+            batch_size = 0
+        
+        for table_name, records in iter_seed_tables(seed_file):
+            encoded = canonical_json(records)
+            result = {
+                'table': table_name,
+                'records': len(records),
+                'bytes': len(encoded.encode('utf-8')),
+                'hash': hashlib.sha256(encoded.encode('utf-8')).hexdigest(),
+                'status': 'unchanged',
+                'latency': 0.0,
+            }
+            results.append(result)
+            
+            if not force and stored.get(table_name) == result['hash']:
+                continue
+            if dry_run:
+                result['status'] = 'changed'
+                continue
+            
+            if batch and batch_size + result['bytes'] > batch_bytes:
+                flush()
+            batch.append((result, records))
+            batch_size += result['bytes']
+        
+        flush()
+    
+    return results
+
+def print_report(results, session, elapsed):
+    print(f"{'Table':<22} {'Records':>8} {'Bytes':>10} {'Status':<10} {'Latency':>9}")
+    for result in results:
+        latency = f"{result['latency'] * 1000:.0f} ms" if result['status'] in ('uploaded', 'failed') else '-'
+        shared = f" (batch of {result['batch_size']})" if result.get('batch_size', 1) > 1 else ''
+        print(f"{result['table']:<22} {result['records']:>8} {result['bytes']:>10,} "
+              f"{result['status']:<10} {latency:>9}{shared}")
+    
+    uploaded = sum(1 for result in results if result['status'] == 'uploaded')
+    failed = sum(1 for result in results if result['status'] == 'failed')
+    unchanged = sum(1 for result in results if result['status'] == 'unchanged')
+    print(f"\nSUMMARY: {uploaded} uploaded, {unchanged} unchanged, {failed} failed")
+    print(f"   {session.requests} requests ({session.retries} retries), "
+          f"{session.bytes_sent:,} bytes sent, {session.bytes_received:,} bytes received in {elapsed:.2f}s")
+    return failed
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Insert DEMO2 seed data into Supabase')
+    parser.add_argument('--seed-file', default=SEED_DATA_FILE,
+                        help='seed data JSON file (default: seed_data/demo2_seed_data.json)')
+    parser.add_argument('--sync', action='store_true',
+                        help='only upload tables whose content hash changed, batched and concurrently')
+    parser.add_argument('--jobs', '-j', type=int, default=4,
+                        help='concurrent upsert requests for --sync (default: 4)')
+    parser.add_argument('--batch-bytes', type=int, default=BATCH_BYTES,
+                        help=f'max JSON bytes per --sync upsert request (default: {BATCH_BYTES})')
+    parser.add_argument('--force', action='store_true',
+                        help='with --sync, upload every table even if its hash matches')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='with --sync, only report which tables changed')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    if not SUPABASE_KEY:
+        print("❌ Error: SUPABASE_SERVICE_ROLE_KEY environment variable not set")
+        print("   Set it with: export SUPABASE_SERVICE_ROLE_KEY='your-key'")
+        sys.exit(1)
+    
+    if not os.path.exists(args.seed_file):
+        print(f"❌ Error: Seed data file not found: {args.seed_file}")
+        sys.exit(1)
+    
+    print("=" * 80)
+    print(("SYNCING" if args.sync else "INSERTING") + " DEMO2 SEED DATA INTO SUPABASE")
+    print("=" * 80)
+    
+    if args.sync:
+        print(f"\nStreaming seed data from: {args.seed_file}\n")
+        session = RestSession(SUPABASE_URL, SUPABASE_KEY)
+        start = time.perf_counter()
+        try:
+            results = sync_tables(session, args.seed_file, args.jobs, args.batch_bytes,
+                                  args.force, args.dry_run)
+        finally:
+            session.close()
+        error_count = print_report(results, session, time.perf_counter() - start)
+        sys.exit(1 if error_count else 0)
+    
+    success_count, error_count = insert_all(args.seed_file)
+    
+    print("\n" + "=" * 80)
+    print(f"SUMMARY: {success_count} succeeded, {error_count} failed")
+    print("=" * 80)
+    
+    if error_count == 0:
+        print("\n✅ All seed data inserted successfully!")
+        print("\nNext steps:")
+        print("1. Test the new function: SELECT admin_reset_and_seed_demo2();")
+        print("2. Update frontend to call the new function")
+        print("3. Deploy to Netlify")
+        sys.exit(0)
+    else:
+        print("\n⚠️  Some errors occurred. Please check the output above.")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Offline node-load balancing
+Replays rpc_balance_node_load_by_period (migration 022, aliquot v6) for the
+cities of an allocation_plan_details extract. The node x week load matrix lives
+in NumPy arrays, so each rebalancing iteration is a few array scans instead of
+three GROUP BY queries over the shipments, with the RPC's rules:
+
+- cells are (node, week) pairs of the city; a cell's load only counts shipments
+  scheduled inside the period
+- the most loaded cell above target + 1 hands its oldest shipments round-robin to
+  the cells below target - 1, in ISO week and node code order, each receiving
+  min(ceil(excess / cells left), floor(deficit), floor(excess))
+- a moved shipment keeps its weekday in the target week
+- at most --max-iterations (50, as the RPC) source cells per city
+
+The output directory gets results.json (the RPC's JSON result per city) and
+moves.copy; with --apply also apply.sql, which performs the moves as the RPC does
+with p_apply_changes, and the node_balancing_history rows of migration 020. Ties
+the SQL leaves to the planner (equal loads or dates) are broken by node code,
+week and shipment id, and node codes sort bytewise. --benchmark runs a
+row-by-row port of the PL/pgSQL next to the solver on growing synthetic cities.
+
+Usage:
+    psql "$DATABASE_URL" -c "\\copy (SELECT id, origin_node_id, fecha_programada FROM allocation_plan_details) TO 'apd.csv' CSV HEADER"
+    psql "$DATABASE_URL" -c "\\copy (SELECT id, auto_id, city_id, account_id FROM nodes) TO 'nodes.csv' CSV HEADER"
+    python3 scripts/node_load_balancing.py --shipments apd.csv --nodes nodes.csv \\
+        --start 2025-01-01 --end 2025-12-31 --apply
+    cd node_balancing && psql "$DATABASE_URL" -f apply.sql
+    python3 scripts/node_load_balancing.py --benchmark
+"""
+
+import os
+import json
+import math
+import time
+import bisect
+import argparse
+import datetime
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from fractions import Fraction
+
+import numpy as np
+
+from weekly_aggregation import read_extract
+
+OUTPUT_DIR = 'node_balancing'
+MAX_ITERATIONS = 50
+# rpc_balance_node_load_by_period defaults
+REFERENCE_LOAD = 63
+DEVIATION_PERCENT = 20
+
+SHIPMENT_FIELDS = ['id', 'origin_node_id', 'fecha_programada']
+NODE_FIELDS = ['id', 'auto_id', 'city_id', 'account_id']
+MOVE_COLUMNS = ['id', 'origin_node_id', 'fecha_programada']
+HISTORY_COLUMNS = ['account_id', 'city_id', 'month', 'year', 'strategy', 'shipments_moved', 'movements',
+                   'stddev_before', 'stddev_after', 'improvement_percentage', 'performed_by', 'notes']
+
+# (node, ISO week number) pairs are coded as node * KEY_WEEKS + week number
+KEY_WEEKS = 64
+
+BENCHMARK_NODES = [10, 30, 100, 300, 1000, 3000]
+BENCHMARK_REFERENCE_MAX_NODES = 300
+BENCHMARK_LOAD = 4
+
+def to_decimal(value):
+    if isinstance(value, Fraction):
+        return Decimal(value.numerator) / Decimal(value.denominator)
+    return Decimal(value)
+
+def pg_round(value, places=2):
+    """ROUND(numeric, places): half away from zero"""
+    return float(to_decimal(value).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP))
+
+def stddev(loads):
+    """COALESCE(STDDEV(load), 0): sample standard deviation of integer loads, as a Decimal"""
+    loads = np.asarray(loads, dtype=np.int64)
+    n = len(loads)
+    if n < 2:
+        return Decimal(0)
+    total = int(loads.sum())
+    squares = int((loads * loads).sum())
+    with localcontext() as context:
+        context.prec = 40
+        return to_decimal(Fraction(n * squares - total * total, n * (n - 1))).sqrt()
+
+def iso_week(day):
+    return datetime.date.fromordinal(day).isocalendar()[1]
+
+def rpc_result(total, cells, nodes_count, before, after, matrix_before, matrix_after, movements, moved, apply):
+    """The JSONB rpc_balance_node_load_by_period returns"""
+    if total == 0 or cells == 0:
+        return {'success': True, 'message': 'No shipments found in the specified period', 'movements_count': 0,
+                'stddev_before': 0, 'stddev_after': 0, 'improvement_percentage': 0, 'movements': []}
+    
+    stddev_before = stddev(before)
+    stddev_after = stddev(after)
+    improvement = ((stddev_before - stddev_after) / stddev_before * 100) if stddev_before > 0 else Decimal(0)
+    max_acceptable_load = REFERENCE_LOAD * (1 + Fraction(DEVIATION_PERCENT, 100))
+    avg_load_per_node = Fraction(total, nodes_count) if nodes_count else None
+    nodes_needed = 0
+    if avg_load_per_node is not None and avg_load_per_node > max_acceptable_load:
+        nodes_needed = math.ceil(Fraction(total) / max_acceptable_load) - nodes_count
+    
+    if not moved:
+        message = 'Load is already well balanced'
+    elif apply:
+        message = f'Successfully balanced {moved} shipments'
+    else:
+        message = f'Preview: would balance {moved} shipments'
+    return {
+        'success': True,
+        'message': message,
+        'movements_count': moved,
+        'stddev_before': pg_round(stddev_before),
+        'stddev_after': pg_round(stddev_after),
+        'improvement_percentage': pg_round(improvement),
+        'target_avg': pg_round(Fraction(total, cells)),
+        'total_cells': cells,
+        'movements': movements,
+        'matrix_before': matrix_before,
+        'matrix_after': matrix_after,
+        'nodes_count': nodes_count,
+        'avg_load_per_node': pg_round(avg_load_per_node) if avg_load_per_node is not None else None,
+        'max_acceptable_load': pg_round(max_acceptable_load),
+        'nodes_needed': nodes_needed,
+        'reference_load': REFERENCE_LOAD,
+        'deviation_percent': DEVIATION_PERCENT,
+    }
+
+def movement(from_node, to_node, from_week, to_week, count):
+    return {
+        'from_node_id': from_node[0], 'from_node_code': from_node[1], 'from_week': from_week,
+        'to_node_id': to_node[0], 'to_node_code': to_node[1], 'to_week': to_week,
+        'count': count,
+    }
+
+class CityMatrix:
+    """
+    One city's node x week load matrix for a period, with the shipments behind it.
+    
+    Days are proleptic ordinals (datetime.date.toordinal). Nodes are sorted by
+    (code, id) and cells are numbered node * weeks + week, so the first maximum of
+    the load array is the tie-break the solver uses.
+    """
+    
+    def __init__(self, nodes, shipment_ids, shipment_nodes, shipment_days, start, end):
+        self.nodes = sorted(nodes, key=lambda node: (node[1], node[0]))
+        self.start = start
+        self.end = end
+        first_monday = start - datetime.date.fromordinal(start).weekday()
+        self.week_count = (end - datetime.date.fromordinal(end).weekday() - first_monday) // 7 + 1
+        self.week_starts = first_monday + 7 * np.arange(self.week_count)
+        self.week_nums = np.array([iso_week(day) for day in self.week_starts.tolist()], dtype=np.int64)
+        self.cell_count = len(self.nodes) * self.week_count
+        
+        node_index = {node_id: position for position, (node_id, _) in enumerate(self.nodes)}
+        node = np.array([node_index.get(node_id, -1) for node_id in shipment_nodes], dtype=np.int64)
+        days = np.asarray(shipment_days, dtype=np.int64)
+        keep = (node >= 0) & (days >= first_monday) & (days < first_monday + 7 * self.week_count)
+        self.ids = np.asarray(shipment_ids, dtype=object)[keep]
+        self.days = days[keep]
+        self.cells = node[keep] * self.week_count + (self.days - first_monday) // 7
+        self.load = np.bincount(self.cells[self.in_period(self.days)], minlength=self.cell_count)
+        
+        # Shipments of each cell by (fecha_programada, id), turned into lists when a cell is touched
+        self.order = np.lexsort((self.ids.astype(str), self.days, self.cells))
+        self.cell_starts = np.searchsorted(self.cells[self.order], np.arange(self.cell_count + 1))
+        self.queues = {}
+        
+        # Receiving order: ISO week number, node code, then week
+        cell_node, cell_week = np.divmod(np.arange(self.cell_count), self.week_count)
+        self.cell_node = cell_node
+        self.cell_week = cell_week
+        self.cell_week_num = self.week_nums[cell_week]
+        self.cell_key = cell_node * KEY_WEEKS + self.cell_week_num
+        self.fill_order = np.lexsort((cell_week, cell_node, self.cell_week_num))
+    
+    def in_period(self, days):
+        return (days >= self.start) & (days <= self.end)
+    
+    def queue(self, cell):
+        """[(day, id, shipment index)] of a cell, oldest first"""
+        if cell not in self.queues:
+            rows = self.order[self.cell_starts[cell]:self.cell_starts[cell + 1]]
+            self.queues[cell] = list(zip(self.days[rows].tolist(), self.ids[rows].tolist(), rows.tolist()))
+        return self.queues[cell]
+    
+    def matrix(self, load, merge_week_nums=False):
+        """matrix_before (one entry per cell) or matrix_after (grouped by node code and week number)"""
+        if merge_week_nums:
+            keys, inverse = np.unique(self.cell_key, return_inverse=True)
+            loads = np.bincount(inverse, weights=load, minlength=len(keys)).astype(np.int64)
+            nodes, week_nums = np.divmod(keys, KEY_WEEKS)
+        else:
+            order = np.lexsort((self.cell_week, self.cell_week_num, self.cell_node))
+            nodes, week_nums, loads = self.cell_node[order], self.cell_week_num[order], load[order]
+        codes = [code for _, code in self.nodes]
+        return [{'node_code': codes[node], 'week_num': week_num, 'load_count': count}
+                for node, week_num, count in zip(nodes.tolist(), week_nums.tolist(), loads.tolist())]
+    
+    def solve(self, max_iterations=MAX_ITERATIONS, apply=False):
+        """(RPC result, {shipment id: (node id, new day)}) after rebalancing"""
+        total, cells = int(self.load.sum()), self.cell_count
+        if total == 0 or cells == 0:
+            return rpc_result(total, cells, len(self.nodes), [], [], [], [], [], 0, apply), {}
+        
+        target = Fraction(total, cells)
+        before = self.load.copy()
+        load = self.load.copy()
+        movements = []
+        moves = {}
+        moved_total = 0
+        
+        for _ in range(max_iterations):
+            # load > target + 1 and load < target - 1, in integers
+            overloaded = load * cells > total + cells
+            if not overloaded.any():
+                break
+            source = int(np.argmax(np.where(overloaded, load, -1)))
+            source_node, source_week = divmod(source, self.week_count)
+            source_week_num = self.week_nums[source_week]
+            underloaded = load * cells < total - cells
+            underloaded &= ~((self.cell_node == source_node) & (self.cell_week_num == source_week_num))
+            receivers = self.fill_order[underloaded[self.fill_order]]
+            if not len(receivers):
+                break
+            
+            source_load = int(load[source])
+            # Receivers still unprocessed per (node, week number), which is how the RPC marks them
+            pending = np.bincount(self.cell_key[receivers], minlength=len(self.nodes) * KEY_WEEKS)
+            remaining = len(receivers)
+            deltas = []
+            
+            for position in range(len(receivers)):
+                receiver = int(receivers[position])
+                excess = source_load - target
+                shares = [math.floor(target - int(load[receiver])), math.floor(excess)]
+                if remaining:
+                    shares.append(math.ceil(excess / remaining))
+                count = min(shares)
+                if count <= 0:
+                    break
+                
+                queue = self.queue(source)
+                picked, queue[:count] = queue[:count], []
+                if picked:
+                    receiver_node, receiver_week = divmod(receiver, self.week_count)
+                    shift = int(self.week_starts[receiver_week] - self.week_starts[source_week])
+                    target_queue = self.queue(receiver)
+                    for day, shipment_id, row in picked:
+                        bisect.insort(target_queue, (day + shift, shipment_id, row))
+                        moves[shipment_id] = (self.nodes[receiver_node][0], day + shift)
+                        deltas.append((day, day + shift, receiver))
+                    movements.append(movement(self.nodes[source_node], self.nodes[receiver_node],
+                                              int(source_week_num), int(self.week_nums[receiver_week]), len(picked)))
+                    moved_total += len(picked)
+                    source_load -= len(picked)
+                    key = self.cell_key[receiver]
+                    remaining -= int(pending[key])
+                    pending[key] = 0
+                
+                if source_load - target <= 1:
+                    break
+            
+            for old_day, new_day, receiver in deltas:
+                load[source] -= int(self.start <= old_day <= self.end)
+                load[receiver] += int(self.start <= new_day <= self.end)
+        
+        result = rpc_result(total, cells, len(self.nodes), before, load, self.matrix(before),
+                            self.matrix(load, merge_week_nums=True), movements, moved_total, apply)
+        return result, moves
+
+def reference_balance(nodes, shipments, start, end, max_iterations=MAX_ITERATIONS, apply=False):
+    """
+    Row-by-row port of the PL/pgSQL, for the benchmark: every query rescans the
+    shipments, as the RPC's GROUP BYs over allocation_plan_details do.
+    
+    shipments is a list of [id, node id, day]; they are moved in place.
+    """
+    nodes = sorted(nodes, key=lambda node: (node[1], node[0]))
+    first_monday = start - datetime.date.fromordinal(start).weekday()
+    weeks = [first_monday + 7 * i for i in range((end - datetime.date.fromordinal(end).weekday()
+                                                  - first_monday) // 7 + 1)]
+    
+    def cell_matrix():
+        # One hash aggregate over the shipments, as the planner would run the GROUP BY
+        loads = {}
+        for _, node_id, day in shipments:
+            if start <= day <= end:
+                key = (node_id, first_monday + (day - first_monday) // 7 * 7)
+                loads[key] = loads.get(key, 0) + 1
+        return [{'node': node, 'week_start': week_start, 'week_num': iso_week(week_start),
+                 'load_count': loads.get((node[0], week_start), 0)}
+                for node in nodes for week_start in weeks]
+    
+    cells = cell_matrix()
+    total = sum(cell['load_count'] for cell in cells)
+    before = [cell['load_count'] for cell in cells]
+    matrix_before = [{'node_code': cell['node'][1], 'week_num': cell['week_num'], 'load_count': cell['load_count']}
+                     for cell in sorted(cells, key=lambda cell: (cell['node'][1], cell['node'][0],
+                                                                 cell['week_num'], cell['week_start']))]
+    if total == 0 or not cells:
+        return rpc_result(total, len(cells), len(nodes), [], [], [], [], [], 0, apply)
+    target = Fraction(total, len(cells))
+    movements = []
+    moved_total = 0
+    
+    for _ in range(max_iterations):
+        overloaded = [cell for cell in cell_matrix() if cell['load_count'] > target + 1]
+        if not overloaded:
+            break
+        source = min(overloaded, key=lambda cell: (-cell['load_count'], cell['node'][1], cell['node'][0],
+                                                   cell['week_start']))
+        excess = source['load_count'] - target
+        if excess <= 1:
+            break
+        
+        temp_underloaded_cells = [dict(cell, deficit=target - cell['load_count'], processed=False)
+                                  for cell in cell_matrix()
+                                  if cell['load_count'] < target - 1
+                                  and not (cell['node'] == source['node'] and cell['week_num'] == source['week_num'])]
+        if not temp_underloaded_cells:
+            break
+        
+        for receiver in sorted(temp_underloaded_cells, key=lambda cell: (cell['week_num'], cell['node'][1],
+                                                                         cell['node'][0], cell['week_start'])):
+            unprocessed = sum(1 for cell in temp_underloaded_cells if not cell['processed'])
+            shares = [math.floor(receiver['deficit']), math.floor(source['load_count'] - target)]
+            if unprocessed:
+                shares.append(math.ceil(excess / unprocessed))
+            count = min(shares)
+            if count <= 0:
+                break
+            
+            to_move = sorted((shipment for shipment in shipments if shipment[1] == source['node'][0]
+                              and source['week_start'] <= shipment[2] <= source['week_start'] + 6),
+                             key=lambda shipment: (shipment[2], shipment[0]))[:count]
+            if to_move:
+                for shipment in to_move:
+                    shipment[1] = receiver['node'][0]
+                    shipment[2] = receiver['week_start'] + (shipment[2] - source['week_start'])
+                movements.append(movement(source['node'], receiver['node'], source['week_num'],
+                                          receiver['week_num'], len(to_move)))
+                moved_total += len(to_move)
+                source['load_count'] -= len(to_move)
+                excess = source['load_count'] - target
+                for cell in temp_underloaded_cells:
+                    if cell['node'] == receiver['node'] and cell['week_num'] == receiver['week_num']:
+                        cell['processed'] = True
+            
+            if excess <= 1:
+                break
+    
+    after = cell_matrix()
+    matrix_after = {}
+    for cell in after:
+        key = (cell['node'][1], cell['week_num'])
+        matrix_after[key] = matrix_after.get(key, 0) + cell['load_count']
+    matrix_after = [{'node_code': code, 'week_num': week_num, 'load_count': load}
+                    for (code, week_num), load in sorted(matrix_after.items())]
+    return rpc_result(total, len(cells), len(nodes), before, [cell['load_count'] for cell in after],
+                      matrix_before, matrix_after, movements, moved_total, apply)
+
+def synthetic_city(node_count, start, end, seed=42):
+    """Nodes and shipments of a city where a tenth of the nodes carry triple load"""
+    rng = np.random.default_rng(seed)
+    nodes = [(f'node-{i:05d}', f'N{i:05d}') for i in range(node_count)]
+    days = end - start + 1
+    weight = np.where(rng.random(node_count) < 0.1, 3.0, 1.0)
+    count = int(node_count * days / 7 * BENCHMARK_LOAD)
+    node = rng.choice(node_count, count, p=weight / weight.sum())
+    day = start + rng.integers(0, days, count)
+    return nodes, [f'apd-{i:08d}' for i in range(count)], [nodes[i][0] for i in node.tolist()], day
+
+def run_benchmark(max_iterations):
+    start = datetime.date(2025, 1, 1).toordinal()
+    end = datetime.date(2025, 12, 31).toordinal()
+    print(f"Synthetic cities over {datetime.date.fromordinal(start)}..{datetime.date.fromordinal(end)} "
+          f"(53 weeks), {BENCHMARK_LOAD} shipments per node-week on average")
+    print(f"{'Nodes':>6} {'Cells':>8} {'Shipments':>10} {'Moved':>7} {'Row-by-row':>11} {'NumPy':>9} "
+          f"{'Speed-up':>9}  Result")
+    mismatches = 0
+    for node_count in BENCHMARK_NODES:
+        nodes, ids, shipment_nodes, days = synthetic_city(node_count, start, end)
+        began = time.perf_counter()
+        matrix = CityMatrix(nodes, ids, shipment_nodes, days, start, end)
+        result, _ = matrix.solve(max_iterations)
+        solver_seconds = time.perf_counter() - began
+        
+        if node_count <= BENCHMARK_REFERENCE_MAX_NODES:
+            shipments = [[shipment_id, node_id, day] for shipment_id, node_id, day
+                         in zip(ids, shipment_nodes, days.tolist())]
+            began = time.perf_counter()
+            expected = reference_balance(nodes, shipments, start, end, max_iterations)
+            reference_seconds = time.perf_counter() - began
+            same = expected == result
+            mismatches += not same
+            timing = f"{reference_seconds:10.2f}s {solver_seconds:8.3f}s {reference_seconds / solver_seconds:8.0f}x"
+            verdict = '✅ identical' if same else '❌ different'
+        else:
+            timing = f"{'-':>11} {solver_seconds:8.3f}s {'-':>9}"
+            verdict = f"stddev {result['stddev_before']} -> {result['stddev_after']}"
+        print(f"{node_count:>6,} {matrix.cell_count:>8,} {len(ids):>10,} {result['movements_count']:>7,} "
+              f"{timing}  {verdict}")
+    return mismatches
+
+def write_outputs(results, moves, histories, output_dir, apply):
+    """results.json, moves.copy and, with apply, node_balancing_history.copy and apply.sql"""
+    from generate_demo_account import CopyWriter
+    
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'results.json'), 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    
+    writer = CopyWriter(os.path.join(output_dir, 'moves.copy'), MOVE_COLUMNS)
+    try:
+        writer.write({'id': list(moves), 'origin_node_id': [node_id for node_id, _ in moves.values()],
+                      'fecha_programada': [datetime.date.fromordinal(day).isoformat() for _, day in moves.values()]})
+    finally:
+        writer.close()
+    if not apply:
+        return
+    
+    writer = CopyWriter(os.path.join(output_dir, 'node_balancing_history.copy'), HISTORY_COLUMNS)
+    try:
+        writer.write({column: [history[column] for history in histories] for column in HISTORY_COLUMNS})
+    finally:
+        writer.close()
+    
+    lines = [
+        "-- Node-load rebalancing computed offline by scripts/node_load_balancing.py",
+        "-- Same UPDATE as rpc_balance_node_load_by_period with p_apply_changes",
+        "",
+        "BEGIN;",
+        "",
+        "CREATE TEMP TABLE balancing_moves (id UUID PRIMARY KEY, origin_node_id UUID, fecha_programada DATE) "
+        "ON COMMIT DROP;",
+        "\\copy balancing_moves FROM 'moves.copy'",
+        "",
+        "UPDATE allocation_plan_details apd",
+        "SET",
+        "  origin_node_id = m.origin_node_id,",
+        "  fecha_programada = m.fecha_programada,",
+        "  reassignment_reason = 'rebalancing',",
+        "  reassigned_at = NOW(),",
+        "  updated_at = NOW()",
+        "FROM balancing_moves m",
+        "WHERE apd.id = m.id;",
+        "",
+        f"\\copy node_balancing_history ({', '.join(HISTORY_COLUMNS)}) FROM 'node_balancing_history.copy'",
+        "",
+        "COMMIT;",
+        "",
+    ]
+    with open(os.path.join(output_dir, 'apply.sql'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Rebalance node load per city offline, as '
+                                                 'rpc_balance_node_load_by_period does')
+    parser.add_argument('--shipments', help='allocation_plan_details extract with id, origin_node_id, fecha_programada')
+    parser.add_argument('--nodes', help='nodes extract with id, auto_id, city_id, account_id')
+    parser.add_argument('--start', help='first day of the period (YYYY-MM-DD)')
+    parser.add_argument('--end', help='last day of the period (YYYY-MM-DD)')
+    parser.add_argument('--city', action='append', help='city id to balance (repeatable; default: every city)')
+    parser.add_argument('--max-iterations', type=int, default=MAX_ITERATIONS,
+                        help=f'source cells rebalanced per city (default: {MAX_ITERATIONS}, as the RPC)')
+    parser.add_argument('--apply', action='store_true',
+                        help='also write apply.sql and the node_balancing_history rows')
+    parser.add_argument('--performed-by', help='user id recorded in node_balancing_history.performed_by')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f'output directory (default: {OUTPUT_DIR})')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='compare with the row-by-row algorithm on synthetic cities instead')
+    args = parser.parse_args(argv)
+    if not args.benchmark and not (args.shipments and args.nodes and args.start and args.end):
+        parser.error('--shipments, --nodes, --start and --end are required unless --benchmark is given')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.benchmark:
+        raise SystemExit(1 if run_benchmark(args.max_iterations) else 0)
+    
+    start = datetime.date.fromisoformat(args.start)
+    end = datetime.date.fromisoformat(args.end)
+    began = time.perf_counter()
+    nodes = read_extract(args.nodes, NODE_FIELDS)
+    shipments = read_extract(args.shipments, SHIPMENT_FIELDS)
+    days = np.array(shipments['fecha_programada'], dtype='datetime64[D]').astype(np.int64) \
+        + datetime.date(1970, 1, 1).toordinal()
+    
+    cities = {}
+    for node_id, code, city_id, account_id in zip(*(nodes[field] for field in NODE_FIELDS)):
+        if not args.city or city_id in args.city:
+            cities.setdefault(city_id, {'account_id': account_id, 'nodes': []})['nodes'].append((node_id, code))
+    
+    # Shipments grouped by the city of their origin node
+    city_index = {city_id: position for position, city_id in enumerate(cities)}
+    node_city = {node_id: city_index[city_id] for city_id, city in cities.items() for node_id, _ in city['nodes']}
+    shipment_city = np.array([node_city.get(node_id, -1) for node_id in shipments['origin_node_id']], dtype=np.int64)
+    order = np.argsort(shipment_city, kind='stable')
+    bounds = np.searchsorted(shipment_city[order], np.arange(len(cities) + 1))
+    ids = np.array(shipments['id'], dtype=object)
+    origin_nodes = np.array(shipments['origin_node_id'], dtype=object)
+    
+    results = {}
+    moves = {}
+    histories = []
+    for position, (city_id, city) in enumerate(cities.items()):
+        rows = order[bounds[position]:bounds[position + 1]]
+        matrix = CityMatrix(city['nodes'], ids[rows], origin_nodes[rows], days[rows],
+                            start.toordinal(), end.toordinal())
+        result, city_moves = matrix.solve(args.max_iterations, args.apply)
+        results[city_id] = result
+        moves.update(city_moves)
+        if args.apply and result['movements_count']:
+            histories.append({
+                'account_id': city['account_id'], 'city_id': city_id, 'month': start.month, 'year': start.year,
+                'strategy': 'matrix_balance', 'shipments_moved': result['movements_count'],
+                'movements': result['movements'], 'stddev_before': result['stddev_before'],
+                'stddev_after': result['stddev_after'], 'improvement_percentage': result['improvement_percentage'],
+                'performed_by': args.performed_by,
+                'notes': f"rpc_balance_node_load_by_period {start}..{end}, offline solver",
+            })
+        print(f"  {city_id}: {len(city['nodes']):,} nodes, {result['movements_count']:,} shipments moved, "
+              f"stddev {result['stddev_before']} -> {result['stddev_after']}")
+    
+    write_outputs(results, moves, histories, args.output_dir, args.apply)
+    print(f"✅ {len(cities):,} cities, {len(moves):,} shipments moved in {time.perf_counter() - began:.1f}s; "
+          f"written to {args.output_dir}"
+          + (f" (apply with: cd {args.output_dir} && psql \"$DATABASE_URL\" -f apply.sql)" if args.apply else ''))
+
+if __name__ == '__main__':
+    main()
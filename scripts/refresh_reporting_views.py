@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Incremental refresh of the materialized reporting views through PostgREST
+Reads the accounts with unconsumed one_db changes
+(reporting_refresh_pending, migration 20260211_materialized_reporting_views.sql)
+and calls refresh_reporting_account for each, which consumes those changes and
+recomputes only the (account, week) and (account, locality) slices they touched,
+in the same transaction.
+
+Accounts are refreshed oldest change first, in batches of --batch-size with at
+most --concurrency refreshes in flight, so a burst of loads never holds more
+than that many database connections. Every account is refreshed up to the last
+change seen when its batch was read; later changes wait for the next pass. Each
+batch reports the refresh latency (request round trip and time spent in the
+database) and the lag of the slices it made current. With --watch the refresher
+keeps polling; with --full it rebuilds every slice of the given accounts (after
+changes to cities or products, which are not tracked).
+
+Usage:
+    SUPABASE_URL=https://<project>.supabase.co SUPABASE_SERVICE_ROLE_KEY=... \\
+        python3 scripts/refresh_reporting_views.py --watch 60
+    python3 scripts/refresh_reporting_views.py --full --account <account_id>
+"""
+
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from insert_demo2_seed_data import SUPABASE_URL, SUPABASE_KEY, RestError, RestSession
+
+BATCH_SIZE = 50
+CONCURRENCY = 4
+PAGE_SIZE = 1000
+
+def fetch_pending(session, accounts=None, limit=None):
+    """Pending refreshes, oldest change first"""
+    filters = f"&account_id=in.({','.join(accounts)})" if accounts else ''
+    limit = f"&limit={limit}" if limit else ''
+    return session.request('GET', f"/reporting_refresh_pending?select=account_id,last_change_id,through_change_id,"
+                                  f"changes,oldest_change_at{filters}&order=oldest_change_at{limit}")
+
+def fetch_accounts(session, page_size=PAGE_SIZE):
+    """Every account id, for --full without --account"""
+    accounts = []
+    while True:
+        after = f"&id=gt.{accounts[-1]}" if accounts else ''
+        page = session.request('GET', f"/accounts?select=id&order=id&limit={page_size}{after}")
+        accounts.extend(account['id'] for account in page)
+        if len(page) < page_size:
+            return accounts
+
+def refresh_account(session, account_id, through_change_id=None, full=False):
+    """Run refresh_reporting_account; returns its result plus the request round trip"""
+    body = json.dumps({'p_account_id': account_id, 'p_through_change_id': through_change_id,
+                       'p_full': full}).encode('utf-8')
+    started = time.perf_counter()
+    try:
+        result = session.request('POST', '/rpc/refresh_reporting_account', body,
+                                 {'Content-Type': 'application/json'})
+        result['error'] = None
+    except RestError as e:
+        result = {'account_id': account_id, 'rows': 0, 'duration_ms': None, 'lag_seconds': None,
+                  'error': f"{e.status}: {e.message}"}
+    result['round_trip_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(fraction * len(ordered) + 0.5) - 1))]
+
+def print_batch(number, results, elapsed):
+    round_trips = [result['round_trip_ms'] for result in results]
+    durations = [result['duration_ms'] for result in results if result['duration_ms'] is not None]
+    lags = [float(result['lag_seconds']) for result in results if result.get('lag_seconds') is not None]
+    failed = sum(1 for result in results if result['error'])
+    line = (f"  batch {number}: {len(results)} accounts, {sum(result['rows'] for result in results):,} rows "
+            f"in {elapsed:.1f}s; round trip p50 {percentile(round_trips, 0.5):,.0f} ms, "
+            f"p95 {percentile(round_trips, 0.95):,.0f} ms")
+    if durations:
+        line += f"; in database p50 {percentile(durations, 0.5):,} ms, max {max(durations):,} ms"
+    if lags:
+        line += f"; lag max {max(lags):,.1f}s"
+    print(line + (f"; {failed} failed" if failed else ''), flush=True)
+
+def refresh_units(session, units, args):
+    """Refresh (account_id, through_change_id) units in batches; returns every result"""
+    results = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for first in range(0, len(units), args.batch_size):
+            batch = units[first:first + args.batch_size]
+            started = time.perf_counter()
+            batch_results = list(executor.map(
+                lambda unit: refresh_account(session, unit[0], unit[1], args.full), batch))
+            for result in batch_results:
+                if result['error']:
+                    print(f"  ❌ {result['account_id']}: {result['error']}", flush=True)
+            print_batch(first // args.batch_size + 1, batch_results, time.perf_counter() - started)
+            results.extend(batch_results)
+    return results
+
+def refresh_pass(session, args):
+    """One pass over the pending accounts (or every requested account with --full)"""
+    if args.full:
+        accounts = args.account or fetch_accounts(session)
+        units = [(account_id, None) for account_id in accounts]
+        print(f"Full refresh of {len(units):,} accounts")
+    else:
+        pending = fetch_pending(session, args.account, args.max_accounts)
+        units = [(row['account_id'], row['through_change_id']) for row in pending]
+        if not units:
+            return []
+        print(f"{len(units):,} accounts with {sum(row['changes'] for row in pending):,} pending changes, "
+              f"oldest at {pending[0]['oldest_change_at']}")
+    return refresh_units(session, units, args)
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Refresh the materialized reporting views for the accounts '
+                                                 'whose one_db rows changed')
+    parser.add_argument('--account', action='append',
+                        help='account id to refresh (repeatable; default: every pending account)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'accounts per batch (default: {BATCH_SIZE})')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY,
+                        help=f'refreshes in flight, i.e. database connections used (default: {CONCURRENCY})')
+    parser.add_argument('--max-accounts', type=int, help='accounts per pass, oldest change first (default: all)')
+    parser.add_argument('--full', action='store_true',
+                        help='recompute every slice of the accounts (default: only the changed slices)')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='keep refreshing, polling for changes every SECONDS')
+    args = parser.parse_args(argv)
+    if args.full and args.watch:
+        parser.error('--full runs once; it cannot be combined with --watch')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not SUPABASE_KEY:
+        print("❌ Error: SUPABASE_SERVICE_ROLE_KEY environment variable not set")
+        sys.exit(1)
+    
+    session = RestSession(SUPABASE_URL, SUPABASE_KEY)
+    failed = 0
+    try:
+        while True:
+            started = time.perf_counter()
+            results = refresh_pass(session, args)
+            failed = sum(1 for result in results if result['error'])
+            if results:
+                print(f"{'⚠️ ' if failed else '✅'} {len(results) - failed:,} accounts refreshed, {failed:,} failed, "
+                      f"{sum(result['rows'] for result in results):,} rows in {time.perf_counter() - started:.1f}s "
+                      f"({session.requests:,} requests, {session.retries:,} retries so far)", flush=True)
+            elif not args.watch:
+                print("✅ Reporting views are up to date")
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted; the accounts already refreshed stay refreshed")
+        raise SystemExit(130)
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
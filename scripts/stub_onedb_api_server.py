@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the onedb-api edge function
+Used to exercise export_onedb.py without an API key for a real project
+
+Serves GET /functions/v1/onedb-api (and /api/onedb/records) like
+supabase/functions/onedb-api: Bearer API key, start_date/end_date filters on
+sent, records newest first, offset pagination with an exact total or cursor
+pagination (pagination=cursor, then cursor=<next_cursor>), and the per-key limit
+of --rate-limit requests per --window seconds answered with 429. Records come
+from --load (NDJSON; sent is derived from sent_at when missing) or are
+synthetic (--records). --error-rate answers with 500 to exercise retries.
+
+Usage:
+    python3 scripts/stub_onedb_api_server.py --port 8771 --records 50000 --window 6
+    ONEDB_API_URL=http://127.0.0.1:8771/functions/v1/onedb-api ONEDB_API_KEY=stub \\
+        python3 scripts/export_onedb.py --start-date 2024-01-01 --end-date 2024-12-31 --output onedb.ndjson
+"""
+
+import json
+import time
+import base64
+import random
+import argparse
+import datetime
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENDPOINTS = ('/functions/v1/onedb-api', '/api/onedb/records')
+MAX_LIMIT = 1000
+CARRIERS = ['Carrier A', 'Carrier B', 'Carrier C']
+PRODUCTS = ['Express', 'Standard', 'Economy']
+CITIES = ['Madrid', 'Barcelona', 'Valencia', 'Sevilla', 'Bilbao', 'Zaragoza']
+
+class Stats:
+    """Request counters shared by the handler threads"""
+    lock = threading.Lock()
+    statuses = {}
+    rows = 0
+
+class Records:
+    """Records sorted by (sent, id) descending, with the ascending sent keys for bisecting"""
+    rows = []
+    keys = []
+
+def encode_cursor(sent, record_id):
+    """Same token as encodeCursor in the edge function: base64url JSON, no padding"""
+    raw = json.dumps([sent, record_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_cursor(token):
+    try:
+        sent, record_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        return None
+    return (sent, record_id) if isinstance(sent, str) and isinstance(record_id, str) else None
+
+def synthetic_records(count, seed, account_id='00000000-0000-4000-8000-000000000001'):
+    rng = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    records = []
+    for _ in range(count):
+        sent_at = start + datetime.timedelta(seconds=rng.randrange(2 * 365 * 86400))
+        transit = rng.randrange(3600, 8 * 86400)
+        origin, destination = rng.sample(CITIES, 2)
+        records.append({
+            'id': '%08x-%04x-4%03x-%04x-%012x' % (rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(12),
+                                                 0x8000 | rng.getrandbits(14), rng.getrandbits(48)),
+            'account_id': account_id,
+            'sent': sent_at.date().isoformat(),
+            'sent_at': sent_at.isoformat(),
+            'received_at': (sent_at + datetime.timedelta(seconds=transit)).isoformat(),
+            'tag_id': f"TAG{rng.randrange(10 ** 8):08d}",
+            'carrier': rng.choice(CARRIERS),
+            'product': rng.choice(PRODUCTS),
+            'origin_city': origin,
+            'destination_city': destination,
+            'total_transit_days': transit // 86400,
+            'on_time_delivery': rng.random() < 0.85,
+            'source_data_snapshot': {'synthetic': True},
+        })
+    return records
+
+def load_records(path):
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                record.setdefault('sent', (record.get('sent_at') or '')[:10])
+                records.append(record)
+    return records
+
+class OneDbApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        options = self.server.options
+        time.sleep(max(0.0, options.latency))
+        parts = urlsplit(self.path)
+        if parts.path.rstrip('/') not in ENDPOINTS:
+            return self.send_json(404, {'success': False, 'error': 'Not found'})
+        
+        auth = self.headers.get('Authorization', '')
+        if not auth.startswith('Bearer '):
+            return self.send_json(401, {'success': False, 'error': 'Missing or invalid Authorization header. '
+                                                                   'Use: Authorization: Bearer <api_key>'})
+        if auth[len('Bearer '):].strip() != options.api_key:
+            return self.send_json(401, {'success': False, 'error': 'Invalid or inactive API key'})
+        
+        # Requests counted in the window are the ones the function logs in api_usage_log
+        now = time.time()
+        log = self.server.usage_log
+        with Stats.lock:
+            while log and log[0] <= now - options.window:
+                log.popleft()
+            remaining = max(0, options.rate_limit - len(log))
+        reset_at = datetime.datetime.fromtimestamp(now + options.window, datetime.timezone.utc).isoformat()
+        if not remaining:
+            return self.send_json(429, {'success': False,
+                                        'error': f'Rate limit exceeded. Maximum {options.rate_limit} requests per minute.',
+                                        'rate_limit': {'limit': options.rate_limit, 'remaining': 0,
+                                                       'reset_at': reset_at}})
+        
+        params = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        start_date, end_date = params.get('start_date'), params.get('end_date')
+        if not start_date or not end_date:
+            return self.send_json(400, {'success': False, 'error': 'Missing required parameters: start_date and '
+                                                                   'end_date (format: YYYY-MM-DD)'})
+        try:
+            datetime.date.fromisoformat(start_date)
+            datetime.date.fromisoformat(end_date)
+        except ValueError:
+            return self.send_json(400, {'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD'})
+        limit = min(int(params.get('limit') or 100), MAX_LIMIT)
+        offset = int(params.get('offset') or 0)
+        use_cursor = 'cursor' in params or params.get('pagination') == 'cursor'
+        cursor = None
+        if params.get('cursor'):
+            cursor = decode_cursor(params['cursor'])
+            if cursor is None:
+                return self.send_json(400, {'success': False, 'error': 'Invalid cursor. Pass next_cursor from '
+                                                                       'the previous page unchanged'})
+        
+        with Stats.lock:
+            log.append(now)
+            remaining -= 1
+        if random.random() < options.error_rate:
+            return self.send_json(500, {'success': False, 'error': 'Internal server error'})
+        
+        # Rows of the date range: a contiguous run of the (sent, id) descending list
+        keys = Records.keys
+        first = len(keys) - bisect_right(keys, end_date)
+        last = len(keys) - bisect_left(keys, start_date)
+        if use_cursor:
+            position = first
+            if cursor:
+                position = max(first, len(keys) - bisect_left(keys, cursor[0]))
+                while position > first and (Records.rows[position - 1]['sent'], Records.rows[position - 1]['id']) \
+                        < cursor:
+                    position -= 1
+            page = Records.rows[position:min(last, position + limit + 1)]
+            has_more = len(page) > limit
+            page = page[:limit]
+            pagination = {'mode': 'cursor', 'limit': limit, 'has_more': has_more,
+                          'next_cursor': encode_cursor(page[-1]['sent'], page[-1]['id']) if has_more else None}
+        else:
+            page = Records.rows[first + offset:min(last, first + offset + limit)]
+            total = last - first
+            pagination = {'total': total, 'limit': limit, 'offset': offset, 'has_more': total > offset + limit}
+        
+        with Stats.lock:
+            Stats.rows += len(page)
+        self.send_json(200, {'success': True, 'data': page, 'pagination': pagination,
+                             'meta': {'response_time_ms': 0,
+                                      'rate_limit': {'limit': options.rate_limit, 'remaining': remaining,
+                                                     'reset_at': reset_at}}})
+    
+    def send_json(self, status, payload):
+        with Stats.lock:
+            Stats.statuses[status] = Stats.statuses.get(status, 0) + 1
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Stub onedb-api edge function')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8771)
+    parser.add_argument('--api-key', default='stub', help='accepted API key (default: stub)')
+    parser.add_argument('--load', help='NDJSON file of records (default: synthetic records)')
+    parser.add_argument('--records', type=int, default=20_000, help='synthetic records (default: 20000)')
+    parser.add_argument('--seed', type=int, default=42, help='seed of the synthetic records (default: 42)')
+    parser.add_argument('--rate-limit', type=int, default=10, help='requests per window (default: 10)')
+    parser.add_argument('--window', type=float, default=60.0,
+                        help='rate-limit window in seconds (default: 60, as the function)')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response (default: 0.05)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of counted requests answered with 500 (default: 0)')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    records = load_records(options.load) if options.load else synthetic_records(options.records, options.seed)
+    Records.rows = sorted(records, key=lambda record: (record['sent'], record['id']), reverse=True)
+    Records.keys = [record['sent'] for record in reversed(Records.rows)]
+    
+    server = ThreadingHTTPServer((options.host, options.port), OneDbApiHandler)
+    server.options = options
+    server.usage_log = deque()
+    
+    print(f"Stub onedb-api on http://{options.host}:{options.port}{ENDPOINTS[0]}")
+    print(f"   {len(records):,} records, {options.rate_limit} requests per {options.window:g}s, "
+          f"error rate {options.error_rate:.0%}")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        statuses = ', '.join(f"{status}: {count}" for status, count in sorted(Stats.statuses.items()))
+        print(f"\nServed {statuses or 'no requests'}, {Stats.rows:,} rows")
+
+if __name__ == '__main__':
+    main()
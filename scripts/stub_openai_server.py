@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat-completions endpoint
+Used to exercise translate_*.py without API costs and to measure scheduling speedups
+
+Prompts carrying a JSON array of {"id", "text"} items get a JSON reply of
+{"translations": [{"id", "text": "[xx] text"}]}, where xx is the target language
+named in the prompt; older numbered-line prompts ("N. text") get "N. [xx] text".
+--drop-rate and --garble-rate remove or corrupt individual items to exercise
+partial retries.
+
+Usage:
+    python3 scripts/stub_openai_server.py --port 8765 --latency 0.5 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python3 translate_all.py --async
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LANG_CODES = {
+    'Spanish': 'es',
+    'French': 'fr',
+    'Arabic': 'ar',
+}
+
+NUMBERED_LINE = re.compile(r'^(\d+)\. (.*)$', re.MULTILINE)
+
+class Stats:
+    """Request counters shared by the handler threads"""
+    lock = threading.Lock()
+    requests = 0
+    errors = 0
+
+def translate_prompt(prompt, options):
+    """Build the fake reply for a translation prompt"""
+    lang = next((code for name, code in LANG_CODES.items() if name in prompt), 'xx')
+    
+    start = prompt.find('\n[')
+    if start == -1:
+        return '\n'.join(f"{num}. [{lang}] {text}" for num, text in NUMBERED_LINE.findall(prompt))
+    
+    translations = []
+    for item in json.loads(prompt[start + 1:]):
+        if random.random() < options.drop_rate:
+            continue
+        if random.random() < options.garble_rate:
+            translations.append({'id': item['id'], 'text': ''})
+            continue
+        translations.append({'id': item['id'], 'text': f"[{lang}] {item['text']}"})
+    
+    return json.dumps({'translations': translations}, ensure_ascii=False)
+
+class ChatCompletionsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        
+        with Stats.lock:
+            Stats.requests += 1
+        
+        options = self.server.options
+        time.sleep(max(0.0, options.latency + random.uniform(-options.jitter, options.jitter)))
+        
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self.send_json(404, {'error': {'message': 'Not found'}})
+        
+        if random.random() < options.error_rate:
+            with Stats.lock:
+                Stats.errors += 1
+            status = random.choice([429, 503])
+            return self.send_json(status, {'error': {'message': 'Injected failure', 'type': 'stub'}},
+                                  {'Retry-After': str(options.retry_after)})
+        
+        prompt = body['messages'][-1]['content']
+        content = translate_prompt(prompt, options)
+        self.send_json(200, {
+            'id': f'chatcmpl-stub-{Stats.requests}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': len(prompt) // 4,
+                'completion_tokens': len(content) // 4,
+                'total_tokens': (len(prompt) + len(content)) // 4,
+            },
+        })
+    
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Stub OpenAI chat-completions server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help='seconds added to every response (default: 0.5)')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                        help='random +/- seconds around --latency (default: 0.1)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with 429/503 (default: 0)')
+    parser.add_argument('--retry-after', type=float, default=1.0,
+                        help='Retry-After seconds sent with injected errors (default: 1)')
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help='fraction of JSON items left out of replies (default: 0)')
+    parser.add_argument('--garble-rate', type=float, default=0.0,
+                        help='fraction of JSON items returned with an empty text (default: 0)')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    server = ThreadingHTTPServer((options.host, options.port), ChatCompletionsHandler)
+    server.options = options
+    
+    print(f"Stub chat-completions server on http://{options.host}:{options.port}/v1")
+    print(f"   latency {options.latency}s ±{options.jitter}s, error rate {options.error_rate:.0%}")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nServed {Stats.requests} requests ({Stats.errors} injected errors)")
+
+if __name__ == '__main__':
+    main()
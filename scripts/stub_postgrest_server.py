@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Supabase PostgREST endpoint
+Used to exercise scripts/insert_demo2_seed_data.py --sync and
+scripts/backfill_weekly_aggregation.py without a database
+
+Tables live in memory. GET /rest/v1/{table}?select=a,b returns the selected columns
+(an unknown column is a 400 with code 42703, like Postgres), filtered by
+col=eq./neq./gt./gte./lt./lte./in.(...) and paged with order, limit and offset.
+POST with ?on_conflict=a,b and Prefer: resolution=merge-duplicates upserts a row or
+an array of rows; DELETE removes the filtered rows. Responses are gzip-compressed
+when the client accepts it. --error-rate answers with 503 and a Retry-After header;
+--without-column drops a column to emulate a database where a migration has not
+run yet; --load preloads every {table}.ndjson of a directory.
+
+Usage:
+    python3 scripts/stub_postgrest_server.py --port 8775 --latency 0.1
+    SUPABASE_URL=http://127.0.0.1:8775 SUPABASE_SERVICE_ROLE_KEY=stub \\
+        python3 scripts/insert_demo2_seed_data.py --sync
+"""
+
+import os
+import gzip
+import json
+import time
+import random
+import argparse
+import datetime
+import itertools
+import threading
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REST_PREFIX = '/rest/v1/'
+QUERY_OPTIONS = {'select', 'on_conflict', 'order', 'limit', 'offset', 'columns'}
+
+# Columns every stub table accepts; demo2_seed_data mirrors its migrations
+TABLE_COLUMNS = {
+    'demo2_seed_data': ['id', 'table_name', 'data', 'record_count', 'data_hash', 'created_at', 'updated_at'],
+}
+
+class Stats:
+    """Request counters shared by the handler threads"""
+    lock = threading.Lock()
+    requests = {}
+    errors = 0
+    bytes_in = 0
+    bytes_out = 0
+
+class Database:
+    lock = threading.Lock()
+    tables = {}
+    row_ids = itertools.count(1)
+
+def comparable(value):
+    """Timestamps and dates compare as instants, numbers as numbers, the rest as text"""
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    text = str(value)
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.datetime.fromisoformat(text.replace('Z', '+00:00'))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        return moment.timestamp()
+    except ValueError:
+        return text
+
+def row_filters(query):
+    """Predicates for the col=op.value parameters of a request"""
+    filters = []
+    for column, expressions in query.items():
+        if column in QUERY_OPTIONS:
+            continue
+        for expression in expressions:
+            op, _, operand = expression.partition('.')
+            if op == 'in':
+                allowed = {value.strip('"') for value in operand.strip('()').split(',')}
+                filters.append(lambda row, c=column, a=allowed: str(row.get(c)) in a)
+            elif op == 'is':
+                filters.append(lambda row, c=column: row.get(c) is None)
+            else:
+                compare = {'eq': lambda a, b: a == b, 'neq': lambda a, b: a != b,
+                           'gt': lambda a, b: a > b, 'gte': lambda a, b: a >= b,
+                           'lt': lambda a, b: a < b, 'lte': lambda a, b: a <= b}[op]
+                target = comparable(operand)
+                filters.append(lambda row, c=column, f=compare, t=target:
+                               row.get(c) is not None and type(comparable(row.get(c))) is type(t)
+                               and f(comparable(row.get(c)), t))
+    return filters
+
+class PostgrestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def handle_request(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        
+        with Stats.lock:
+            Stats.requests[self.command] = Stats.requests.get(self.command, 0) + 1
+            Stats.bytes_in += len(body)
+        
+        options = self.server.options
+        time.sleep(max(0.0, options.latency + random.uniform(-options.jitter, options.jitter)
+                       + len(body) / 1024 / 1024 * options.per_mb))
+        
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self.send_json(401, {'message': 'No API key found in request'})
+        
+        url = urlsplit(self.path)
+        if not url.path.startswith(REST_PREFIX):
+            return self.send_json(404, {'message': 'Not found'})
+        
+        if random.random() < options.error_rate:
+            with Stats.lock:
+                Stats.errors += 1
+            return self.send_json(503, {'message': 'Injected failure'}, {'Retry-After': str(options.retry_after)})
+        
+        table = unquote(url.path[len(REST_PREFIX):])
+        query = parse_qs(url.query)
+        columns = [column for column in TABLE_COLUMNS.get(table, []) if column not in options.without_column]
+        
+        if self.command == 'GET':
+            selected = query.get('select', ['*'])[0].split(',')
+            if selected != ['*']:
+                for column in selected:
+                    if columns and column not in columns:
+                        return self.send_json(400, {'code': '42703', 'details': None, 'hint': None,
+                                                    'message': f'column {table}.{column} does not exist'})
+            filters = row_filters(query)
+            with Database.lock:
+                rows = [row for row in Database.tables.get(table, {}).values()
+                        if all(matches(row) for matches in filters)]
+            for order in reversed(query.get('order', [''])[0].split(',')):
+                if order:
+                    column, _, direction = order.partition('.')
+                    rows.sort(key=lambda row: str(row.get(column)), reverse=direction.startswith('desc'))
+            offset = int(query.get('offset', ['0'])[0])
+            limit = int(query['limit'][0]) if 'limit' in query else None
+            rows = rows[offset:offset + limit if limit is not None else None]
+            if selected != ['*']:
+                rows = [{column: row.get(column) for column in selected} for row in rows]
+            return self.send_json(200, rows)
+        
+        if self.command == 'POST':
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                return self.send_json(400, {'code': 'PGRST102', 'message': 'Empty or invalid json'})
+            rows = payload if isinstance(payload, list) else [payload]
+            conflict = query.get('on_conflict', ['id'])[0].split(',')
+            merge = 'resolution=merge-duplicates' in self.headers.get('Prefer', '')
+            
+            for row in rows:
+                unknown = [column for column in row if columns and column not in columns]
+                if unknown:
+                    return self.send_json(400, {'code': 'PGRST204',
+                                                'message': f"Could not find the '{unknown[0]}' column of "
+                                                           f"'{table}' in the schema cache"})
+            
+            with Database.lock:
+                stored = Database.tables.setdefault(table, {})
+                for row in rows:
+                    key = tuple(row.get(column) for column in conflict)
+                    if all(value is None for value in key):
+                        key = ('row', next(Database.row_ids))
+                    if key in stored and not merge:
+                        return self.send_json(409, {'code': '23505',
+                                                    'message': 'duplicate key value violates unique constraint'})
+                    stored[key] = {**stored.get(key, {}), **row}
+            
+            if 'return=minimal' in self.headers.get('Prefer', ''):
+                return self.send_bytes(201, b'', 'application/json')
+            return self.send_json(201, rows)
+        
+        if self.command == 'DELETE':
+            filters = row_filters(query)
+            with Database.lock:
+                stored = Database.tables.get(table, {})
+                for key in [key for key, row in stored.items() if all(matches(row) for matches in filters)]:
+                    del stored[key]
+            return self.send_bytes(204, b'', 'application/json')
+        
+        self.send_json(405, {'message': 'Method not allowed'})
+    
+    do_GET = do_POST = do_DELETE = handle_request
+    
+    def send_json(self, status, payload, headers=None):
+        self.send_bytes(status, json.dumps(payload).encode('utf-8'), 'application/json', headers)
+    
+    def send_bytes(self, status, data, content_type, headers=None):
+        headers = dict(headers or {})
+        if len(data) > 1024 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            data = gzip.compress(data)
+            headers['Content-Encoding'] = 'gzip'
+        with Stats.lock:
+            Stats.bytes_out += len(data)
+        
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Stub Supabase PostgREST server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8775)
+    parser.add_argument('--latency', type=float, default=0.1,
+                        help='seconds added to every response (default: 0.1)')
+    parser.add_argument('--jitter', type=float, default=0.02,
+                        help='random +/- seconds around --latency (default: 0.02)')
+    parser.add_argument('--per-mb', type=float, default=0.5,
+                        help='extra seconds per MB of request body (default: 0.5)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with 503 (default: 0)')
+    parser.add_argument('--retry-after', type=float, default=0.5,
+                        help='Retry-After seconds sent with injected errors (default: 0.5)')
+    parser.add_argument('--without-column', action='append', default=[],
+                        help='hide a column, as before the migration that adds it')
+    parser.add_argument('--load', metavar='DIR',
+                        help='preload tables from DIR/{table}.ndjson (e.g. generate_demo_account.py --format ndjson)')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    server = ThreadingHTTPServer((options.host, options.port), PostgrestHandler)
+    server.options = options
+    
+    if options.load:
+        for file_name in sorted(os.listdir(options.load)):
+            table, extension = os.path.splitext(file_name)
+            if extension != '.ndjson':
+                continue
+            with open(os.path.join(options.load, file_name), encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            Database.tables[table] = {(row.get('id', next(Database.row_ids)),): row for row in rows}
+            print(f"   loaded {len(rows):,} {table} rows")
+    
+    print(f"Stub PostgREST server on http://{options.host}:{options.port}")
+    print(f"   latency {options.latency}s ±{options.jitter}s, error rate {options.error_rate:.0%}")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        requests = ', '.join(f"{method} {count}" for method, count in sorted(Stats.requests.items()))
+        print(f"\nServed {requests or 'no requests'} ({Stats.errors} injected errors), "
+              f"{Stats.bytes_in:,} bytes in, {Stats.bytes_out:,} bytes out")
+
+if __name__ == '__main__':
+    main()
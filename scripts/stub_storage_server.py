@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Supabase Storage object API
+Used to exercise upload_to_supabase.py --sync without touching a real project
+
+Objects are kept in memory. GET/POST/PUT/DELETE on /storage/v1/object/{bucket}/{name}
+behave like Storage (POST needs x-upsert: true to overwrite; a missing object is a
+400 with statusCode "404" in the body). --error-rate answers with 503 and a
+Retry-After header to exercise retries.
+
+Usage:
+    python3 scripts/stub_storage_server.py --port 8770 --latency 0.2 --error-rate 0.1
+    SUPABASE_URL=http://127.0.0.1:8770 SUPABASE_ANON_KEY=stub python3 upload_to_supabase.py --sync
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OBJECT_PREFIX = '/storage/v1/object/'
+
+class Stats:
+    """Request counters shared by the handler threads"""
+    lock = threading.Lock()
+    requests = {}
+    errors = 0
+    connections = set()
+
+class ObjectStore:
+    lock = threading.Lock()
+    objects = {}
+
+class StorageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def handle_request(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        
+        with Stats.lock:
+            Stats.requests[self.command] = Stats.requests.get(self.command, 0) + 1
+            Stats.connections.add(self.client_address)
+        
+        options = self.server.options
+        time.sleep(max(0.0, options.latency + random.uniform(-options.jitter, options.jitter)))
+        
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self.send_json(400, {'statusCode': '403', 'error': 'Unauthorized',
+                                        'message': 'Missing bearer token'})
+        
+        path = self.path.split('?', 1)[0]
+        if not path.startswith(OBJECT_PREFIX):
+            return self.send_json(404, {'statusCode': '404', 'error': 'not_found', 'message': 'Not found'})
+        
+        if random.random() < options.error_rate:
+            with Stats.lock:
+                Stats.errors += 1
+            return self.send_json(503, {'statusCode': '503', 'error': 'Injected failure'},
+                                  {'Retry-After': str(options.retry_after)})
+        
+        key = unquote(path[len(OBJECT_PREFIX):])
+        
+        with ObjectStore.lock:
+            exists = key in ObjectStore.objects
+            if self.command == 'GET':
+                if not exists:
+                    return self.send_json(400, {'statusCode': '404', 'error': 'not_found',
+                                                'message': 'Object not found'})
+                content_type, data = ObjectStore.objects[key]
+                return self.send_bytes(200, data, content_type)
+            
+            if self.command == 'DELETE':
+                ObjectStore.objects.pop(key, None)
+                return self.send_json(200, {'message': 'Successfully deleted'})
+            
+            upsert = self.headers.get('x-upsert', '').lower() == 'true'
+            if self.command == 'POST' and exists and not upsert:
+                return self.send_json(400, {'statusCode': '409', 'error': 'Duplicate',
+                                            'message': 'The resource already exists'})
+            if self.command == 'PUT' and not exists:
+                return self.send_json(400, {'statusCode': '404', 'error': 'not_found',
+                                            'message': 'Object not found'})
+            
+            ObjectStore.objects[key] = (self.headers.get('Content-Type', 'application/octet-stream'), body)
+        
+        self.send_json(200, {'Key': key})
+    
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+    
+    def send_json(self, status, payload, headers=None):
+        self.send_bytes(status, json.dumps(payload).encode('utf-8'), 'application/json', headers)
+    
+    def send_bytes(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Stub Supabase Storage server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8770)
+    parser.add_argument('--latency', type=float, default=0.2,
+                        help='seconds added to every response (default: 0.2)')
+    parser.add_argument('--jitter', type=float, default=0.05,
+                        help='random +/- seconds around --latency (default: 0.05)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with 503 (default: 0)')
+    parser.add_argument('--retry-after', type=float, default=0.5,
+                        help='Retry-After seconds sent with injected errors (default: 0.5)')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    server = ThreadingHTTPServer((options.host, options.port), StorageHandler)
+    server.options = options
+    
+    print(f"Stub Storage server on http://{options.host}:{options.port}")
+    print(f"   latency {options.latency}s ±{options.jitter}s, error rate {options.error_rate:.0%}")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        requests = ', '.join(f"{method} {count}" for method, count in sorted(Stats.requests.items()))
+        print(f"\nServed {requests or 'no requests'} over {len(Stats.connections)} connections "
+              f"({Stats.errors} injected errors)")
+
+if __name__ == '__main__':
+    main()
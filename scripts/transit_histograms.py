@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Mergeable business-day histograms for the E2E DB
+weekly_routes.business_days_histogram holds, for each route week, how many
+shipments took 0, 1, 2, ... business days. Business days are small integers, so
+the histogram is an exact sketch: summing histograms across routes and weeks
+gives the same avg/min/max and p50-p95 (interpolated like the edge function's
+percentile()) as re-scanning the shipments, in time proportional to the number
+of routes.
+
+Usage:
+    psql "$DATABASE_URL" -c "\\copy weekly_routes TO 'weekly_routes.csv' CSV HEADER"
+    python3 scripts/transit_histograms.py --routes weekly_routes.csv --by carrier_name --period month
+"""
+
+import sys
+import csv
+import argparse
+import datetime
+
+import numpy as np
+
+HISTOGRAM_COLUMN = 'business_days_histogram'
+PERIODS = ('week', 'month', 'quarter', 'year', 'all')
+PERCENTILES = [('business_days_p50', 0.50), ('business_days_p75', 0.75), ('business_days_p85', 0.85),
+               ('business_days_p90', 0.90), ('business_days_p95', 0.95)]
+SUMMARY_COLUMNS = ['total_routes', 'total_shipments', 'avg_business_days', 'min_business_days',
+                   'max_business_days', *[name for name, _ in PERCENTILES]]
+
+def route_histograms(days, starts, counts):
+    """
+    Histogram of each route's business days.
+    
+    days holds every route's values contiguously and sorted, route i being
+    days[starts[i]:starts[i] + counts[i]]; each histogram runs from 0 to the
+    route's maximum.
+    """
+    route = np.repeat(np.arange(len(starts)), counts)
+    width = days[starts + counts - 1] + 1
+    offsets = np.concatenate([[0], np.cumsum(width)])
+    flat = np.bincount(offsets[route] + days, minlength=offsets[-1])
+    return [flat[offsets[i]:offsets[i + 1]] for i in range(len(starts))]
+
+def format_histogram(counts):
+    """Postgres array literal for a histogram"""
+    return '{' + ','.join(map(str, counts)) + '}'
+
+def parse_histogram(value):
+    """Counts from a Postgres array literal, a JSON array or a list"""
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.strip('{}[] ')
+        return [int(count) for count in value.split(',')] if value else []
+    return [int(count) for count in value]
+
+def histogram_matrix(histograms):
+    """Stack histograms into a zero-padded (len(histograms), width) matrix"""
+    parsed = [parse_histogram(histogram) for histogram in histograms]
+    width = max((len(counts) for counts in parsed), default=0)
+    matrix = np.zeros((len(parsed), max(width, 1)), dtype=np.int64)
+    for row, counts in enumerate(parsed):
+        matrix[row, :len(counts)] = counts
+    return matrix
+
+def merge(matrix, groups):
+    """Sum the histogram rows of each group; groups are dense ids from 0"""
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]) if len(order) else order
+    if not len(starts):
+        return np.zeros((0, matrix.shape[1]), dtype=np.int64)
+    return np.add.reduceat(matrix[order], starts, axis=0)
+
+def summarize(matrix):
+    """
+    {column: array} of SUMMARY_COLUMNS (except total_routes) for every histogram row.
+    
+    Percentiles interpolate between sorted values at index (n - 1) * p, as the
+    weekly-aggregation edge function does; rows without shipments give NaN.
+    """
+    days = np.arange(matrix.shape[1])
+    cumulative = np.cumsum(matrix, axis=1)
+    total = cumulative[:, -1]
+    nonzero = matrix > 0
+    empty = total == 0
+    
+    def value_at(position):
+        # Business days of the shipment at each sorted position
+        return (cumulative <= position[:, None]).sum(axis=1)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary = {
+            'total_shipments': total,
+            'avg_business_days': np.where(empty, np.nan, (matrix * days).sum(axis=1) / total),
+            'min_business_days': np.where(empty, np.nan, nonzero.argmax(axis=1)),
+            'max_business_days': np.where(empty, np.nan, matrix.shape[1] - 1 - nonzero[:, ::-1].argmax(axis=1)),
+        }
+        for name, p in PERCENTILES:
+            index = (np.maximum(total, 1) - 1) * p
+            lower = np.floor(index)
+            weight = index - lower
+            low_value = value_at(lower)
+            high_value = value_at(np.ceil(index))
+            value = np.where(weight == 0, low_value, low_value * (1 - weight) + high_value * weight)
+            summary[name] = np.where(empty, np.nan, value)
+    return summary
+
+def period_start(week_start, period):
+    """First day of the reporting period containing a week_start_date"""
+    day = datetime.date.fromisoformat(week_start)
+    if period == 'week':
+        return day.isoformat()
+    if period == 'month':
+        return day.replace(day=1).isoformat()
+    if period == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1).isoformat()
+    if period == 'year':
+        return day.replace(month=1, day=1).isoformat()
+    return None
+
+def rollup(routes, by, period='all'):
+    """
+    Merge weekly_routes histograms by the columns in by and the reporting period.
+    
+    routes is {column: list} with account_id, week_start_date, the by columns and
+    business_days_histogram; returns {column: list} with one row per group.
+    """
+    periods = [period_start(week, period) for week in routes['week_start_date']]
+    keys = list(zip(routes['account_id'], periods, *(routes[column] for column in by)))
+    index = {}
+    groups = np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.int64, count=len(keys))
+    
+    matrix = histogram_matrix(routes[HISTOGRAM_COLUMN])
+    summary = summarize(merge(matrix, groups))
+    result = {column: [key[position] for key in index]
+              for position, column in enumerate(['account_id', 'period_start', *by])}
+    result['total_routes'] = np.bincount(groups, minlength=len(index)).tolist()
+    for column in SUMMARY_COLUMNS[1:]:
+        result[column] = summary[column].tolist()
+    return result
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Merge weekly_routes business-day histograms')
+    parser.add_argument('--routes', required=True, help='weekly_routes extract (.csv, .ndjson or .copy)')
+    parser.add_argument('--by', default='carrier_name',
+                        help='comma-separated weekly_routes columns to group by (default: carrier_name)')
+    parser.add_argument('--period', choices=PERIODS, default='month', help='reporting period (default: month)')
+    parser.add_argument('--output', help='CSV file to write (default: stdout)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    from weekly_aggregation import read_extract
+    
+    args = parse_args(argv)
+    by = [column for column in args.by.split(',') if column]
+    routes = read_extract(args.routes, ['account_id', 'week_start_date', *by, HISTOGRAM_COLUMN])
+    result = rollup(routes, by, args.period)
+    
+    columns = list(result)
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        writer.writerows(zip(*(result[column] for column in columns)))
+    finally:
+        if args.output:
+            output.close()
+            print(f"✅ {len(result['account_id']):,} groups from {len(routes['account_id']):,} route weeks "
+                  f"written to {args.output}")
+
+if __name__ == '__main__':
+    main()
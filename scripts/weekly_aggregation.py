@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+"""
+Offline weekly aggregation for historical backfill
+Reads a one_db extract once and computes the E2E DB tables (weekly_routes,
+weekly_carriers, weekly_products, weekly_cities, weekly_regions) for every
+account and week in it with one sort-based group-by, using the same rules as
+supabase/functions/weekly-aggregation/index.ts:
+
+- a week starts on Monday and takes shipments with week_start <= sent_at <= week_end,
+  both compared as dates at midnight UTC, as the edge function's PostgREST filter does
+- compliance % = on-time / total * 100; 'critical' when <= 75, 'warning' when < 80
+- business-day percentiles interpolate linearly at index (n - 1) * p
+- rollups weight avg_business_days by shipments; regions skip cities without a region
+
+The output is COPY text plus a load.sql that replaces the computed account weeks
+in one transaction. --compare checks the output against a dump of the tables
+written by the edge function for the same shipments.
+
+Usage:
+    psql "$DATABASE_URL" -c "\\copy one_db TO 'one_db.copy'"
+    psql "$DATABASE_URL" -c "\\copy cities TO 'cities.copy'"
+    psql "$DATABASE_URL" -c "\\copy regions TO 'regions.copy'"
+    python3 scripts/weekly_aggregation.py --shipments one_db.copy --cities cities.copy --regions regions.copy
+    cd e2e_backfill && psql "$DATABASE_URL" -f load.sql
+
+    # Check against the edge function's output for the committed fixture
+    # (node scripts/fixtures/weekly_aggregation/edge_reference.mjs regenerates reference/)
+    python3 scripts/weekly_aggregation.py --shipments scripts/fixtures/weekly_aggregation/one_db.ndjson \\
+        --cities scripts/fixtures/weekly_aggregation/cities.ndjson \\
+        --regions scripts/fixtures/weekly_aggregation/regions.ndjson \\
+        --output-dir /tmp/e2e_fixture --compare scripts/fixtures/weekly_aggregation/reference
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+import datetime
+
+import numpy as np
+
+from transit_histograms import HISTOGRAM_COLUMN, format_histogram, parse_histogram, route_histograms
+
+OUTPUT_DIR = 'e2e_backfill'
+ETL_VERSION = '1.0-offline'
+
+# Rows converted and written per chunk
+WRITE_CHUNK = 100_000
+
+# Thresholds hardcoded in aggregateByRoute
+WARNING_THRESHOLD = 80
+CRITICAL_THRESHOLD = 75
+PERCENTILES = [('business_days_p50', 0.50), ('business_days_p75', 0.75), ('business_days_p85', 0.85),
+               ('business_days_p90', 0.90), ('business_days_p95', 0.95)]
+
+# Days from week_start to week_end: 6 as in the setup_etl_cron.sql backfill (Mon-Sun),
+# 5 as in getLastCompleteWeek for the weekly cron run (Mon-Sat)
+WEEK_END_DAYS = {'sunday': 6, 'saturday': 5}
+
+DAY_US = 86_400_000_000
+WEEK_US = 7 * DAY_US
+MONDAY_US = 4 * DAY_US  # 1970-01-05, the first Monday after the epoch
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+ROUTE_COLUMNS = [
+    'account_id', 'week_start_date', 'week_end_date', 'week_number', 'year',
+    'carrier_name', 'product_name', 'origin_city_name', 'origin_region_name',
+    'destination_city_name', 'destination_region_name',
+    'total_shipments', 'compliant_shipments', 'warning_shipments', 'critical_shipments',
+    'compliance_percentage', 'avg_business_days', 'min_business_days', 'max_business_days',
+    *[name for name, _ in PERCENTILES], HISTOGRAM_COLUMN,
+    'warning_threshold', 'critical_threshold', 'route_status',
+]
+ROLLUP_METRICS = ['total_routes', 'total_shipments', 'compliant_shipments', 'compliant_routes',
+                  'warning_routes', 'critical_routes', 'compliance_percentage', 'avg_business_days']
+TABLE_COLUMNS = {
+    'weekly_routes': ROUTE_COLUMNS,
+    'weekly_carriers': ['account_id', 'week_start_date', 'week_end_date', 'carrier_name', *ROLLUP_METRICS],
+    'weekly_products': ['account_id', 'week_start_date', 'week_end_date', 'product_name', *ROLLUP_METRICS],
+    'weekly_cities': ['account_id', 'week_start_date', 'week_end_date', 'city_name', 'region_name',
+                      'direction', *ROLLUP_METRICS],
+    'weekly_regions': ['account_id', 'week_start_date', 'week_end_date', 'region_name', 'direction',
+                       'total_cities', *ROLLUP_METRICS],
+}
+ETL_LOG_COLUMNS = ['week_start_date', 'week_end_date', 'execution_end', 'status', 'records_processed',
+                   'routes_created', 'etl_version']
+
+# Conflict keys of the edge function's upserts, used to match rows in --compare
+TABLE_KEYS = {
+    'weekly_routes': ['account_id', 'week_start_date', 'carrier_name', 'product_name',
+                      'origin_city_name', 'destination_city_name'],
+    'weekly_carriers': ['account_id', 'week_start_date', 'carrier_name'],
+    'weekly_products': ['account_id', 'week_start_date', 'product_name'],
+    'weekly_cities': ['account_id', 'week_start_date', 'city_name', 'direction'],
+    'weekly_regions': ['account_id', 'week_start_date', 'region_name', 'direction'],
+}
+
+# Decimal places of the DECIMAL columns in create_e2e_db.sql
+COLUMN_SCALE = {'compliance_percentage': 2, 'warning_threshold': 2, 'critical_threshold': 2}
+DAYS_SCALE = 3
+
+SHIPMENT_FIELDS = ['account_id', 'carrier_name', 'product_name', 'origin_city_name', 'destination_city_name',
+                   'sent_at', 'business_transit_days', 'on_time_delivery']
+
+def copy_unescape(value):
+    """Decode one COPY text field"""
+    if value == '\\N':
+        return None
+    if '\\' not in value:
+        return value
+    out = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            char = next(chars, '')
+            char = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v'}.get(char, char)
+        out.append(char)
+    return ''.join(out)
+
+def default_columns(path):
+    """Table column order for a headerless COPY extract named after its table"""
+    from generate_demo_account import ONE_DB_COLUMNS, load_template
+    table = os.path.basename(path).split('.')[0]
+    if table == 'one_db':
+        return ONE_DB_COLUMNS
+    if table in TABLE_COLUMNS:
+        return TABLE_COLUMNS[table]
+    columns = load_template().get(table)
+    if not columns:
+        raise SystemExit(f"❌ Unknown column order for {path}; pass --columns or use a CSV with a header")
+    return columns
+
+def read_extract(path, fields, columns=None):
+    """
+    {field: list of values} from an extract.
+    
+    .csv files need a header row (psql \\copy ... CSV HEADER), .ndjson/.jsonl hold
+    one object per line, anything else is COPY text in table column order.
+    """
+    data = {field: [] for field in fields}
+    extension = os.path.splitext(path)[1].lower()
+    
+    with open(path, encoding='utf-8', newline='') as f:
+        if extension in ('.ndjson', '.jsonl'):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    for field in fields:
+                        data[field].append(record.get(field))
+            return data
+        
+        if extension == '.csv':
+            reader = csv.reader(f)
+            columns = next(reader)
+            rows = reader
+            decode = lambda value: value if value != '' else None
+        else:
+            columns = columns or default_columns(path)
+            rows = (line.rstrip('\n').split('\t') for line in f)
+            decode = copy_unescape
+        
+        missing = [field for field in fields if field not in columns]
+        if missing:
+            raise SystemExit(f"❌ {path} has no column {', '.join(missing)}")
+        indexes = [(data[field].append, columns.index(field)) for field in fields]
+        for row in rows:
+            for append, index in indexes:
+                append(decode(row[index]))
+    return data
+
+def parse_bool(value):
+    return value is True or value in ('t', 'true', 'TRUE', 'True', '1')
+
+def to_micros(text):
+    """Microseconds since the epoch for a timestamptz text (naive means UTC)"""
+    timestamp = datetime.datetime.fromisoformat(text)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return (timestamp - EPOCH) // datetime.timedelta(microseconds=1)
+
+def parse_timestamps(texts):
+    """to_micros for a list of texts; UTC timestamps, the usual case, are parsed by NumPy in one go"""
+    stripped = [text[:-6] if text.endswith('+00:00') else text[:-3] if text.endswith('+00') else text.rstrip('Z')
+                for text in texts]
+    if not any('+' in text or text.find('-', 10) != -1 for text in stripped):
+        try:
+            return np.array(stripped, dtype='datetime64[us]').astype(np.int64)
+        except ValueError:
+            pass
+    return np.fromiter((to_micros(text) for text in texts), dtype=np.int64, count=len(texts))
+
+def load_region_lookup(cities_path, regions_path):
+    """{(account_id, city name): region name or None}, as fetchCityRegionMaps builds per account"""
+    regions = read_extract(regions_path, ['id', 'account_id', 'name'])
+    region_names = {(account, region_id): name
+                    for region_id, account, name in zip(regions['id'], regions['account_id'], regions['name'])}
+    cities = read_extract(cities_path, ['account_id', 'name', 'region_id'])
+    return {(account, name): region_names.get((account, region_id)) or None
+            for account, name, region_id in zip(cities['account_id'], cities['name'], cities['region_id'])}
+
+def factorize(values):
+    """(distinct values in first-seen order, integer code per value)"""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64,
+                        count=len(values))
+    uniques = np.empty(len(index), dtype=object)
+    uniques[:] = list(index)
+    return uniques, codes
+
+def group_rows(*keys):
+    """Group id per row for the combined integer keys, plus the first row of each group"""
+    order = np.lexsort(keys[::-1])
+    boundary = np.zeros(len(order), dtype=bool)
+    boundary[:1] = True
+    for key in keys:
+        sorted_key = key[order]
+        boundary[1:] |= sorted_key[1:] != sorted_key[:-1]
+    group_sorted = np.cumsum(boundary) - 1
+    groups = np.empty(len(order), dtype=np.int64)
+    groups[order] = group_sorted
+    return groups, order[boundary]
+
+def week_fields(week_start_us, week_end_days):
+    """week_start_date, week_end_date, ISO week_number and calendar year for each week"""
+    starts = (np.asarray(week_start_us) // DAY_US).astype('datetime64[D]').astype(object)
+    week_start = [day.isoformat() for day in starts]
+    week_end = [(day + datetime.timedelta(days=week_end_days)).isoformat() for day in starts]
+    return week_start, week_end, [day.isocalendar()[1] for day in starts], [day.year for day in starts]
+
+def region_codes(accounts, account, cities, city, region_lookup, region_index):
+    """Region code (-1 for none) of each (account, city) code pair"""
+    pair = account * len(cities) + city
+    pairs, inverse = np.unique(pair, return_inverse=True)
+    names = [region_lookup.get((accounts[p // len(cities)], cities[p % len(cities)])) for p in pairs.tolist()]
+    # region_index starts as {None: -1}, so new regions are numbered from 0
+    codes = np.array([region_index.setdefault(name, len(region_index) - 1) for name in names], dtype=np.int64)
+    return codes[inverse]
+
+def aggregate_routes(shipments, region_lookup, week_end_days=WEEK_END_DAYS['sunday'], since=None, until=None):
+    """
+    weekly_routes rows for every account week in the shipments, as {column: array}.
+    
+    Dimension columns also come as integer codes (*_code) for the rollups.
+    since/until are optional week_start dates (inclusive) limiting the weeks computed.
+    """
+    sent_us = parse_timestamps(shipments['sent_at'])
+    week = (sent_us - MONDAY_US) // WEEK_US
+    week_start_us = MONDAY_US + week * WEEK_US
+    keep = sent_us <= week_start_us + week_end_days * DAY_US
+    if since:
+        keep &= week_start_us >= to_micros(since)
+    if until:
+        keep &= week_start_us <= to_micros(until)
+    rows = np.flatnonzero(keep)
+    
+    def column(name):
+        values = shipments[name]
+        return [values[i] for i in rows.tolist()]
+    
+    accounts, account = factorize(column('account_id'))
+    carriers, carrier = factorize(column('carrier_name'))
+    products, product = factorize(column('product_name'))
+    cities, city = factorize(column('origin_city_name') + column('destination_city_name'))
+    origin, destination = city[:len(rows)], city[len(rows):]
+    week = week[rows]
+    # null business days count as 0 and null on-time as late, as the edge function's arithmetic does
+    business_days = column('business_transit_days')
+    missing = np.array([value in (None, '') for value in business_days], dtype=bool)
+    business = np.array([0 if empty else int(value) for value, empty in zip(business_days, missing)], dtype=np.int64)
+    on_time = np.array([parse_bool(value) for value in column('on_time_delivery')], dtype=bool)
+    
+    # One sort puts every route's shipments together, ordered by business days for the percentiles
+    order = np.lexsort((business, destination, origin, product, carrier, week, account))
+    keys = [key[order] for key in (account, week, carrier, product, origin, destination)]
+    business = business[order]
+    missing = missing[order]
+    on_time = on_time[order]
+    boundary = np.zeros(len(order), dtype=bool)
+    boundary[:1] = True
+    for key in keys:
+        boundary[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(boundary)
+    total = np.diff(np.append(starts, len(order)))
+    route_account, route_week, route_carrier, route_product, route_origin, route_destination = \
+        [key[starts] for key in keys]
+    
+    compliant = np.add.reduceat(on_time.astype(np.int64), starts) if len(starts) else np.zeros(0, np.int64)
+    business_sum = np.add.reduceat(business, starts) if len(starts) else np.zeros(0, np.int64)
+    compliance = compliant / total * 100
+    critical = compliance <= CRITICAL_THRESHOLD
+    warning = ~critical & (compliance < WARNING_THRESHOLD)
+    late = total - compliant
+    
+    region_index = {None: -1}
+    origin_region = region_codes(accounts, route_account, cities, route_origin, region_lookup, region_index)
+    destination_region = region_codes(accounts, route_account, cities, route_destination, region_lookup,
+                                      region_index)
+    # Code -1 picks the trailing None
+    regions = np.empty(len(region_index), dtype=object)
+    regions[:-1] = [name for name in region_index if name is not None]
+    
+    routes = {
+        'account_code': route_account,
+        'carrier_code': route_carrier,
+        'product_code': route_product,
+        'origin_code': route_origin,
+        'destination_code': route_destination,
+        'origin_region_code': origin_region,
+        'destination_region_code': destination_region,
+        'account_id': accounts[route_account],
+        'week_us': MONDAY_US + route_week * WEEK_US,
+        'carrier_name': carriers[route_carrier],
+        'product_name': products[route_product],
+        'origin_city_name': cities[route_origin],
+        'origin_region_name': regions[origin_region],
+        'destination_city_name': cities[route_destination],
+        'destination_region_name': regions[destination_region],
+        'total_shipments': total,
+        'compliant_shipments': compliant,
+        'warning_shipments': np.where(warning, late, 0),
+        'critical_shipments': np.where(critical, late, 0),
+        'compliance_percentage': compliance,
+        'avg_business_days': business_sum / total,
+        'min_business_days': business[starts],
+        'max_business_days': business[starts + total - 1],
+        HISTOGRAM_COLUMN: np.array([format_histogram(counts.tolist())
+                                    for counts in route_histograms(business, starts, total)], dtype=object),
+        'warning_threshold': np.full(len(starts), WARNING_THRESHOLD),
+        'critical_threshold': np.full(len(starts), CRITICAL_THRESHOLD),
+        'status_code': np.where(critical, 2, np.where(warning, 1, 0)),
+    }
+    routes['route_status'] = np.array(['compliant', 'warning', 'critical'], dtype=object)[routes['status_code']]
+    for name, p in PERCENTILES:
+        index = (total - 1) * p
+        lower = np.floor(index).astype(np.int64)
+        upper = np.ceil(index).astype(np.int64)
+        weight = index - lower
+        low_value = business[starts + lower]
+        high_value = business[starts + upper]
+        values = np.where(lower == upper, low_value, low_value * (1 - weight) + high_value * weight)
+        # percentile() hands back an uninterpolated null as null
+        null = (lower == upper) & missing[starts + lower]
+        routes[name] = np.where(null, None, values.astype(object)) if null.any() else values
+    return routes, len(rows)
+
+def rollup(routes, dimensions, keep=None):
+    """
+    Rollup rows of routes grouped by account, week and the dimension code arrays.
+    
+    Returns the rows, the group of each selected route, the selected route indexes
+    (all when keep is None) and the first route of every group.
+    """
+    index = np.arange(len(routes['total_shipments'])) if keep is None else np.flatnonzero(keep)
+    groups, first = group_rows(routes['account_code'][index], routes['week_us'][index],
+                               *(codes[index] for codes in dimensions))
+    first_route = index[first]
+    count = len(first)
+    
+    def total(values):
+        return np.bincount(groups, weights=values[index], minlength=count)
+    
+    shipments = total(routes['total_shipments']).astype(np.int64)
+    compliant = total(routes['compliant_shipments']).astype(np.int64)
+    status = routes['status_code'][index]
+    
+    rows = {
+        'account_id': routes['account_id'][first_route],
+        'week_us': routes['week_us'][first_route],
+        'total_routes': np.bincount(groups, minlength=count),
+        'total_shipments': shipments,
+        'compliant_shipments': compliant,
+        'compliant_routes': np.bincount(groups[status == 0], minlength=count),
+        'warning_routes': np.bincount(groups[status == 1], minlength=count),
+        'critical_routes': np.bincount(groups[status == 2], minlength=count),
+        'compliance_percentage': compliant / shipments * 100,
+        'avg_business_days': total(routes['avg_business_days'] * routes['total_shipments']) / shipments,
+    }
+    return rows, groups, index, first_route
+
+def concat(*parts):
+    """Stack rollup row dicts that share their columns"""
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+def aggregate_all(routes):
+    """{table: rows} for weekly_routes and the four rollups"""
+    tables = {'weekly_routes': routes}
+    
+    for table, name, code in (('weekly_carriers', 'carrier_name', 'carrier_code'),
+                              ('weekly_products', 'product_name', 'product_code')):
+        rows, _, _, first_route = rollup(routes, [routes[code]])
+        rows[name] = routes[name][first_route]
+        tables[table] = rows
+    
+    city_parts = []
+    region_parts = []
+    for direction, side in (('inbound', 'destination'), ('outbound', 'origin')):
+        rows, _, _, first_route = rollup(routes, [routes[f'{side}_code']])
+        rows['city_name'] = routes[f'{side}_city_name'][first_route]
+        rows['region_name'] = routes[f'{side}_region_name'][first_route]
+        rows['direction'] = np.full(len(first_route), direction, dtype=object)
+        city_parts.append(rows)
+        
+        region = routes[f'{side}_region_code']
+        rows, groups, index, first_route = rollup(routes, [region], keep=region >= 0)
+        rows['region_name'] = routes[f'{side}_region_name'][first_route]
+        rows['direction'] = np.full(len(first_route), direction, dtype=object)
+        _, first_city = group_rows(groups, routes[f'{side}_code'][index])
+        rows['total_cities'] = np.bincount(groups[first_city], minlength=len(first_route))
+        region_parts.append(rows)
+    
+    tables['weekly_cities'] = concat(*city_parts)
+    tables['weekly_regions'] = concat(*region_parts)
+    return tables
+
+def table_chunks(rows, columns, week_end_days, chunk_rows=WRITE_CHUNK):
+    """Yield {column: list} chunks ready for a writer, with the week columns filled in"""
+    count = len(rows['week_us'])
+    for start in range(0, count, chunk_rows):
+        part = slice(start, start + chunk_rows)
+        week_start, week_end, week_number, year = week_fields(rows['week_us'][part], week_end_days)
+        derived = {'week_start_date': week_start, 'week_end_date': week_end,
+                   'week_number': week_number, 'year': year}
+        yield {column: derived[column] if column in derived else rows[column][part].tolist()
+               for column in columns}
+
+def write_load_script(output_dir, files):
+    """psql script replacing the computed account weeks in one transaction"""
+    lines = [
+        "-- Weekly aggregates computed offline by scripts/weekly_aggregation.py",
+        "-- Replaces every account week listed in weeks.copy in the E2E DB tables",
+        "",
+        "BEGIN;",
+        "",
+        "CREATE TEMP TABLE backfill_weeks (account_id UUID, week_start_date DATE) ON COMMIT DROP;",
+        "\\copy backfill_weeks FROM 'weeks.copy'",
+        "",
+    ]
+    for table in TABLE_COLUMNS:
+        lines.append(f"DELETE FROM {table} t USING backfill_weeks w "
+                     f"WHERE t.account_id = w.account_id AND t.week_start_date = w.week_start_date;")
+    lines.append("")
+    for table, (file_name, columns) in files.items():
+        lines.append(f"\\copy {table} ({', '.join(columns)}) FROM '{file_name}'")
+    lines += ["", "COMMIT;", ""]
+    
+    with open(os.path.join(output_dir, 'load.sql'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+def write_tables(tables, output_dir, week_end_days, records_per_week):
+    """COPY files for every table, weeks.copy, etl_log.copy and load.sql"""
+    from generate_demo_account import CopyWriter
+    
+    os.makedirs(output_dir, exist_ok=True)
+    files = {}
+    
+    def emit(table, columns, chunks):
+        file_name = f"{table}.copy"
+        writer = CopyWriter(os.path.join(output_dir, file_name), columns)
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        finally:
+            writer.close()
+        files[table] = (file_name, columns)
+        print(f"  {table:<18} {writer.rows:>10,} rows")
+    
+    for table, columns in TABLE_COLUMNS.items():
+        emit(table, columns, table_chunks(tables[table], columns, week_end_days))
+    
+    routes = tables['weekly_routes']
+    pairs = sorted(set(zip(routes['account_id'].tolist(), routes['week_us'].tolist())))
+    week_start, _, _, _ = week_fields(np.array([week_us for _, week_us in pairs], dtype=np.int64), week_end_days)
+    with open(os.path.join(output_dir, 'weeks.copy'), 'w', encoding='utf-8', newline='\n') as f:
+        f.writelines(f"{account}\t{start}\n" for (account, _), start in zip(pairs, week_start))
+    
+    weeks = np.array(sorted(records_per_week), dtype=np.int64)
+    routes_per_week = {week_us: count for week_us, count in
+                       zip(*np.unique(routes['week_us'], return_counts=True))}
+    week_start, week_end, _, _ = week_fields(weeks, week_end_days)
+    finished = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+    emit('etl_log', ETL_LOG_COLUMNS, [{
+        'week_start_date': week_start,
+        'week_end_date': week_end,
+        'execution_end': [finished] * len(weeks),
+        'status': ['success'] * len(weeks),
+        'records_processed': [records_per_week[week_us] for week_us in weeks.tolist()],
+        'routes_created': [int(routes_per_week.get(week_us, 0)) for week_us in weeks.tolist()],
+        'etl_version': [ETL_VERSION] * len(weeks),
+    }])
+    
+    write_load_script(output_dir, files)
+
+def normalize(value, column):
+    """Comparable form of a value, rounded to the column's DECIMAL scale"""
+    if value is None or value == '':
+        return None
+    if column == HISTOGRAM_COLUMN:
+        return tuple(parse_histogram(value))
+    if column in ('route_status', 'direction') or column.endswith(('_name', '_id', '_date')):
+        return str(value)
+    scale = COLUMN_SCALE.get(column, DAYS_SCALE if 'business_days' in column else 0)
+    return round(float(value), scale)
+
+def compare_tables(output_dir, reference_dir):
+    """Compare the written tables with reference dumps; returns the number of differences"""
+    differences = 0
+    for table, columns in TABLE_COLUMNS.items():
+        reference_path = next((os.path.join(reference_dir, f"{table}{extension}")
+                               for extension in ('.ndjson', '.jsonl', '.csv', '.copy')
+                               if os.path.exists(os.path.join(reference_dir, f"{table}{extension}"))), None)
+        if not reference_path:
+            print(f"  {table:<18} ⚠️  no reference dump")
+            continue
+        
+        def indexed(path):
+            data = read_extract(path, columns, columns)
+            rows = {}
+            for values in zip(*(data[column] for column in columns)):
+                row = {column: normalize(value, column) for column, value in zip(columns, values)}
+                rows[tuple(row[key] for key in TABLE_KEYS[table])] = row
+            return rows
+        
+        expected = indexed(reference_path)
+        actual = indexed(os.path.join(output_dir, f"{table}.copy"))
+        mismatched = [key for key in expected.keys() & actual.keys() if expected[key] != actual[key]]
+        missing = expected.keys() - actual.keys()
+        extra = actual.keys() - expected.keys()
+        differences += len(mismatched) + len(missing) + len(extra)
+        
+        if mismatched or missing or extra:
+            print(f"  {table:<18} ❌ {len(mismatched)} different, {len(missing)} missing, {len(extra)} extra "
+                  f"of {len(expected)} rows")
+            for key in mismatched[:3]:
+                diff = {column: (expected[key][column], actual[key][column]) for column in columns
+                        if expected[key][column] != actual[key][column]}
+                print(f"     {key}: {diff}")
+        else:
+            print(f"  {table:<18} ✅ {len(expected)} rows match")
+    return differences
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Compute the E2E DB weekly tables offline from a one_db extract')
+    parser.add_argument('--shipments', required=True, help='one_db extract (.copy, .csv or .ndjson)')
+    parser.add_argument('--cities', required=True, help='cities extract (.copy, .csv or .ndjson)')
+    parser.add_argument('--regions', required=True, help='regions extract (.copy, .csv or .ndjson)')
+    parser.add_argument('--columns', help='comma-separated column order of a headerless one_db COPY extract')
+    parser.add_argument('--week-end', choices=WEEK_END_DAYS, default='sunday',
+                        help='last day of each week: sunday as the setup_etl_cron.sql backfill, '
+                             'saturday as the weekly cron run (default: sunday)')
+    parser.add_argument('--since', help='first week_start_date to compute (YYYY-MM-DD)')
+    parser.add_argument('--until', help='last week_start_date to compute (YYYY-MM-DD)')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f'output directory (default: {OUTPUT_DIR})')
+    parser.add_argument('--compare', metavar='DIR',
+                        help='dumps of the weekly_* tables written by the edge function to compare with')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    week_end_days = WEEK_END_DAYS[args.week_end]
+    start = time.perf_counter()
+    
+    columns = args.columns.split(',') if args.columns else None
+    shipments = read_extract(args.shipments, SHIPMENT_FIELDS, columns)
+    region_lookup = load_region_lookup(args.cities, args.regions)
+    loaded = time.perf_counter()
+    print(f"Read {len(shipments['sent_at']):,} shipments and {len(region_lookup):,} cities "
+          f"in {loaded - start:.1f}s")
+    
+    routes, processed = aggregate_routes(shipments, region_lookup, week_end_days, args.since, args.until)
+    del shipments
+    tables = aggregate_all(routes)
+    weeks, counts = np.unique(np.repeat(routes['week_us'], routes['total_shipments']), return_counts=True)
+    print(f"Aggregated {processed:,} shipments into {len(routes['total_shipments']):,} routes "
+          f"over {len(weeks)} weeks in {time.perf_counter() - loaded:.1f}s")
+    
+    write_tables(tables, args.output_dir, week_end_days, dict(zip(weeks.tolist(), counts.tolist())))
+    print(f"✅ Wrote {args.output_dir} in {time.perf_counter() - start:.1f}s "
+          f"(load with: cd {args.output_dir} && psql \"$DATABASE_URL\" -f load.sql)")
+    
+    if args.compare:
+        print(f"\nComparing with {args.compare}")
+        if compare_tables(args.output_dir, args.compare):
+            raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
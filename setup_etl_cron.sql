@@ -43,6 +43,10 @@ SELECT * FROM cron.job WHERE jobname = 'weekly-aggregation-etl';
 -- IMPORTANTE: Reemplaza 'YOUR_PROJECT_ID' y 'YOUR_SERVICE_ROLE_KEY'
 -- con tus valores reales antes de ejecutar
 
+-- ALTERNATIVA: scripts/weekly_aggregation.py calcula todas las semanas y cuentas
+-- de una vez a partir de un \copy de one_db, cities y regions, y genera un
+-- load.sql que las carga con COPY (ver E2E_DB_IMPLEMENTATION_GUIDE.md, Opción C)
+
 DO $$
 DECLARE
   start_date DATE := '2024-01-01'; -- Fecha de inicio del backfill
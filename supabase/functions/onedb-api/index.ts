@@ -12,6 +12,12 @@ interface RateLimitCheck {
   resetAt: Date
 }
 
+// Keyset position: the last record of the previous page in (sent, id) order
+interface Cursor {
+  sent: string
+  id: string
+}
+
 serve(async (req) => {
   // Handle CORS preflight requests
   if (req.method === 'OPTIONS') {
@@ -89,6 +95,9 @@ serve(async (req) => {
     const endDate = url.searchParams.get('end_date')
     const limit = Math.min(parseInt(url.searchParams.get('limit') || '100'), 1000)
     const offset = parseInt(url.searchParams.get('offset') || '0')
+    // Cursor pagination: pagination=cursor for the first page, then cursor=<next_cursor>
+    const cursorParam = url.searchParams.get('cursor')
+    const useCursor = cursorParam !== null || url.searchParams.get('pagination') === 'cursor'
 
     // Validate date parameters
     if (!startDate || !endDate) {
@@ -119,6 +128,23 @@ serve(async (req) => {
       )
     }
 
+    let cursor: Cursor | null = null
+    if (cursorParam) {
+      cursor = decodeCursor(cursorParam)
+      if (!cursor) {
+        return new Response(
+          JSON.stringify({ 
+            success: false, 
+            error: 'Invalid cursor. Pass next_cursor from the previous page unchanged' 
+          }),
+          { 
+            status: 400, 
+            headers: { ...corsHeaders, 'Content-Type': 'application/json' } 
+          }
+        )
+      }
+    }
+
     // Log API usage
     const requestStartTime = Date.now()
     await logApiUsage(supabaseClient, apiKeyData.id, '/api/onedb/records', req)
@@ -126,12 +152,24 @@ serve(async (req) => {
     // Query ONE DB data
     let query = supabaseClient
       .from('onedb')
-      .select('*', { count: 'exact' })
+      .select('*', { count: useCursor ? undefined : 'exact' })
       .eq('account_id', apiKeyData.account_id)
       .gte('sent', startDate)
       .lte('sent', endDate)
       .order('sent', { ascending: false })
-      .range(offset, offset + limit - 1)
+
+    if (useCursor) {
+      // Keyset page: the rows after the cursor in (sent, id) descending order, plus
+      // one to tell whether there is a next page; no count and no offset to skip
+      if (cursor) {
+        query = query.or(`sent.lt."${cursor.sent}",and(sent.eq."${cursor.sent}",id.lt.${cursor.id})`)
+      }
+      query = query
+        .order('id', { ascending: false })
+        .limit(limit + 1)
+    } else {
+      query = query.range(offset, offset + limit - 1)
+    }
 
     const { data, error, count } = await query
 
@@ -160,17 +198,30 @@ serve(async (req) => {
 
     const responseTime = Date.now() - requestStartTime
 
+    const rows = data || []
+    const hasMore = useCursor ? rows.length > limit : (count || 0) > offset + limit
+    const page = useCursor ? rows.slice(0, limit) : rows
+    const last = page[page.length - 1]
+    const pagination = useCursor
+      ? {
+          mode: 'cursor',
+          limit,
+          has_more: hasMore,
+          next_cursor: hasMore && last ? encodeCursor({ sent: String(last.sent), id: String(last.id) }) : null
+        }
+      : {
+          total: count || 0,
+          limit,
+          offset,
+          has_more: hasMore
+        }
+
     // Return successful response
     return new Response(
       JSON.stringify({
         success: true,
-        data: data || [],
-        pagination: {
-          total: count || 0,
-          limit,
-          offset,
-          has_more: (count || 0) > offset + limit
-        },
+        data: page,
+        pagination,
         meta: {
           response_time_ms: responseTime,
           rate_limit: {
@@ -246,3 +297,23 @@ async function logApiUsage(
     // Don't fail the request if logging fails
   }
 }
+
+function encodeCursor(cursor: Cursor): string {
+  return btoa(JSON.stringify([cursor.sent, cursor.id]))
+    .replace(/\+/g, '-')
+    .replace(/\//g, '_')
+    .replace(/=+$/, '')
+}
+
+function decodeCursor(token: string): Cursor | null {
+  try {
+    const base64 = token.replace(/-/g, '+').replace(/_/g, '/')
+    const [sent, id] = JSON.parse(atob(base64 + '='.repeat((4 - base64.length % 4) % 4)))
+    // Both values end up inside a PostgREST filter: accept dates/timestamps and UUIDs only
+    if (typeof sent !== 'string' || !/^[0-9T:.+\- Z]+$/.test(sent)) return null
+    if (typeof id !== 'string' || !/^[0-9a-fA-F-]{36}$/.test(id)) return null
+    return { sent, id }
+  } catch {
+    return null
+  }
+}
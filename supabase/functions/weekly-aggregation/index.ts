@@ -217,6 +217,9 @@ async function processAccount(
     const p90 = percentile(sorted, 0.90)
     const p95 = percentile(sorted, 0.95)
     
+    // Histograma de días hábiles (se puede sumar entre rutas y semanas)
+    const business_days_histogram = histogram(stats.business_days)
+    
     // Determinar status
     let route_status = 'compliant'
     if (compliance_percentage <= stats.critical_threshold) {
@@ -250,6 +253,7 @@ async function processAccount(
       business_days_p85: p85,
       business_days_p90: p90,
       business_days_p95: p95,
+      business_days_histogram,
       warning_threshold: stats.warning_threshold,
       critical_threshold: stats.critical_threshold,
       route_status,
@@ -678,3 +682,14 @@ function percentile(sortedArray: number[], p: number): number {
 
   return sortedArray[lower] * (1 - weight) + sortedArray[upper] * weight
 }
+
+// counts[d] = número de envíos con d días hábiles (null cuenta como 0)
+function histogram(values: number[]): number[] {
+  let max = 0
+  for (const value of values) max = Math.max(max, value ?? 0)
+
+  const counts: number[] = new Array(max + 1).fill(0)
+  for (const value of values) counts[value ?? 0]++
+
+  return counts
+}
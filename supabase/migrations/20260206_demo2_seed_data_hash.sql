@@ -0,0 +1,30 @@
+-- Content hash of each demo2_seed_data row
+-- scripts/insert_demo2_seed_data.py --sync compares it with the hash of the local
+-- seed file and only uploads tables whose records changed
+
+ALTER TABLE demo2_seed_data
+  ADD COLUMN IF NOT EXISTS data_hash TEXT;
+
+COMMENT ON COLUMN demo2_seed_data.data_hash IS
+  'SHA-256 of the canonical JSON of data, written by insert_demo2_seed_data.py --sync; NULL when data was changed by any other writer';
+
+-- Any other writer (a plain insert_demo2_seed_data.py run, the dashboard, SQL)
+-- changes data without data_hash; clearing the hash makes the next --sync upload
+-- the table instead of trusting a hash of older data
+CREATE OR REPLACE FUNCTION clear_demo2_seed_data_hash()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.data IS DISTINCT FROM OLD.data AND NEW.data_hash IS NOT DISTINCT FROM OLD.data_hash THEN
+    NEW.data_hash := NULL;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_clear_demo2_seed_data_hash ON demo2_seed_data;
+CREATE TRIGGER trigger_clear_demo2_seed_data_hash
+  BEFORE UPDATE ON demo2_seed_data
+  FOR EACH ROW
+  EXECUTE FUNCTION clear_demo2_seed_data_hash();
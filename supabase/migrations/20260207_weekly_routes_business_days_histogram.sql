@@ -0,0 +1,81 @@
+-- Business-day histogram per weekly route
+-- business_days_histogram[d + 1] = shipments of the route week that took d business
+-- days. Histograms add up across routes and weeks, so carrier/region rollups and
+-- monthly or quarterly percentiles can be computed from weekly_routes without
+-- going back to one_db. Written by the weekly-aggregation edge function and by
+-- scripts/weekly_aggregation.py; scripts/transit_histograms.py merges them offline.
+
+ALTER TABLE public.weekly_routes
+  ADD COLUMN IF NOT EXISTS business_days_histogram INTEGER[];
+
+COMMENT ON COLUMN public.weekly_routes.business_days_histogram IS
+  'Shipments per business-day count (element 1 = 0 days); merge with business_days_histogram_sum()';
+
+-- Element-wise sum of two histograms of any length
+CREATE OR REPLACE FUNCTION business_days_histogram_add(p_total INTEGER[], p_histogram INTEGER[])
+RETURNS INTEGER[]
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN p_histogram IS NULL THEN p_total
+    WHEN p_total IS NULL THEN p_histogram
+    ELSE ARRAY(
+      SELECT COALESCE(p_total[i], 0) + COALESCE(p_histogram[i], 0)
+      FROM generate_series(1, GREATEST(cardinality(p_total), cardinality(p_histogram))) AS i
+      ORDER BY i
+    )
+  END
+$$;
+
+DROP AGGREGATE IF EXISTS business_days_histogram_sum(INTEGER[]);
+CREATE AGGREGATE business_days_histogram_sum(INTEGER[]) (
+  SFUNC = business_days_histogram_add,
+  STYPE = INTEGER[]
+);
+
+-- Percentile of a histogram, interpolated like percentile() in the edge function
+CREATE OR REPLACE FUNCTION business_days_histogram_percentile(p_histogram INTEGER[], p_percentile DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+  v_total BIGINT := 0;
+  v_index DOUBLE PRECISION;
+  v_lower BIGINT;
+  v_upper BIGINT;
+  v_low_value INTEGER;
+  v_high_value INTEGER;
+  v_seen BIGINT := 0;
+BEGIN
+  SELECT COALESCE(SUM(count), 0) INTO v_total FROM unnest(p_histogram) AS count;
+  IF v_total = 0 THEN
+    RETURN NULL;
+  END IF;
+
+  v_index := (v_total - 1) * p_percentile;
+  v_lower := FLOOR(v_index);
+  v_upper := CEIL(v_index);
+
+  -- Walk the buckets until both sorted positions are covered
+  FOR i IN 1..cardinality(p_histogram) LOOP
+    v_seen := v_seen + COALESCE(p_histogram[i], 0);
+    IF v_low_value IS NULL AND v_seen > v_lower THEN
+      v_low_value := i - 1;
+    END IF;
+    IF v_seen > v_upper THEN
+      v_high_value := i - 1;
+      EXIT;
+    END IF;
+  END LOOP;
+
+  IF v_lower = v_upper THEN
+    RETURN v_low_value;
+  END IF;
+  RETURN v_low_value * (1 - (v_index - v_lower)) + v_high_value * (v_index - v_lower);
+END;
+$$;
+
+COMMENT ON FUNCTION business_days_histogram_percentile IS
+  'Percentile (0-1) of a business_days_histogram, e.g. over business_days_histogram_sum() of a carrier-month';
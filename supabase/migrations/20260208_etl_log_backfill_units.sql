@@ -0,0 +1,22 @@
+-- Per-account backfill progress in etl_log
+-- scripts/backfill_weekly_aggregation.py splits a backfill into (account, week)
+-- units and logs each one under a run label, so an interrupted or partly failed
+-- run resumes where it stopped. Rows written by the weekly cron leave both
+-- columns NULL and never collide with the unique key (NULLs are distinct).
+
+ALTER TABLE public.etl_log
+  ADD COLUMN IF NOT EXISTS account_id UUID,
+  ADD COLUMN IF NOT EXISTS backfill_run TEXT;
+
+COMMENT ON COLUMN public.etl_log.account_id IS
+  'Account of a backfill unit; NULL for the weekly cron, which covers every account';
+COMMENT ON COLUMN public.etl_log.backfill_run IS
+  'Run label of scripts/backfill_weekly_aggregation.py; units with status success are skipped on resume';
+
+ALTER TABLE public.etl_log
+  DROP CONSTRAINT IF EXISTS etl_log_backfill_unit_key;
+ALTER TABLE public.etl_log
+  ADD CONSTRAINT etl_log_backfill_unit_key UNIQUE (backfill_run, account_id, week_start_date);
+
+-- Each unit reads one account week of one_db
+CREATE INDEX IF NOT EXISTS idx_one_db_account_sent_at ON one_db(account_id, sent_at);
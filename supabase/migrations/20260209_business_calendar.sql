@@ -0,0 +1,203 @@
+-- Business calendar: per-account business-day ordinals with holidays
+-- business_ordinal of a date = business days (Mon-Fri, not a holiday of the
+-- account) strictly before it, counted from 1900-01-01. The business days between
+-- two dates are then one subtraction of two indexed lookups, instead of the
+-- day-by-day WHILE loop calculate_business_days (017) ran for every shipment in
+-- the one_db transfer trigger (018) and reprocess (019).
+-- scripts/business_calendar.py computes the same ordinals vectorized for bulk
+-- recalculations; scripts/benchmark_business_days.sql compares both SQL versions.
+
+-- Holidays per account; weekend dates are accepted and ignored
+CREATE TABLE IF NOT EXISTS account_holidays (
+  account_id UUID NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+  holiday_date DATE NOT NULL,
+  name TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (account_id, holiday_date)
+);
+
+ALTER TABLE account_holidays ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS account_holidays_select_policy ON account_holidays;
+CREATE POLICY account_holidays_select_policy ON account_holidays
+  FOR SELECT USING (account_id = current_user_account_id());
+
+DROP POLICY IF EXISTS account_holidays_insert_policy ON account_holidays;
+CREATE POLICY account_holidays_insert_policy ON account_holidays
+  FOR INSERT WITH CHECK (account_id = current_user_account_id());
+
+DROP POLICY IF EXISTS account_holidays_update_policy ON account_holidays;
+CREATE POLICY account_holidays_update_policy ON account_holidays
+  FOR UPDATE USING (account_id = current_user_account_id());
+
+DROP POLICY IF EXISTS account_holidays_delete_policy ON account_holidays;
+CREATE POLICY account_holidays_delete_policy ON account_holidays
+  FOR DELETE USING (account_id = current_user_account_id());
+
+-- Precomputed ordinals, one row per account and calendar day
+CREATE TABLE IF NOT EXISTS business_calendar (
+  account_id UUID NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+  calendar_date DATE NOT NULL,
+  is_business_day BOOLEAN NOT NULL,
+  business_ordinal INTEGER NOT NULL,
+  PRIMARY KEY (account_id, calendar_date)
+);
+
+ALTER TABLE business_calendar ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS business_calendar_select_policy ON business_calendar;
+CREATE POLICY business_calendar_select_policy ON business_calendar
+  FOR SELECT USING (account_id = current_user_account_id());
+
+-- Mon-Fri days before p_date since 1900-01-01 (a Monday), without holidays
+CREATE OR REPLACE FUNCTION weekday_ordinal(p_date DATE)
+RETURNS INTEGER
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT ((p_date - DATE '1900-01-01') / 7) * 5 + LEAST((p_date - DATE '1900-01-01') % 7, 5)
+$$;
+
+-- Ordinal computed from account_holidays, for dates outside the precomputed range
+CREATE OR REPLACE FUNCTION business_day_ordinal_uncached(p_account_id UUID, p_date DATE)
+RETURNS INTEGER
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT weekday_ordinal(p_date) - (
+    SELECT COUNT(*)::INTEGER
+    FROM account_holidays h
+    WHERE h.account_id = p_account_id
+      AND h.holiday_date < p_date
+      AND EXTRACT(ISODOW FROM h.holiday_date) < 6
+  )
+$$;
+
+CREATE OR REPLACE FUNCTION business_day_ordinal(p_account_id UUID, p_date DATE)
+RETURNS INTEGER
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT COALESCE(
+    (SELECT c.business_ordinal FROM business_calendar c
+     WHERE c.account_id = p_account_id AND c.calendar_date = p_date),
+    business_day_ordinal_uncached(p_account_id, p_date)
+  )
+$$;
+
+-- Rebuild an account's calendar rows for [p_from, p_to]
+CREATE OR REPLACE FUNCTION refresh_business_calendar(
+  p_account_id UUID,
+  p_from DATE DEFAULT '2020-01-01',
+  p_to DATE DEFAULT '2035-12-31'
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_base INTEGER := business_day_ordinal_uncached(p_account_id, p_from);
+  v_rows INTEGER;
+BEGIN
+  DELETE FROM business_calendar
+  WHERE account_id = p_account_id AND calendar_date BETWEEN p_from AND p_to;
+
+  INSERT INTO business_calendar (account_id, calendar_date, is_business_day, business_ordinal)
+  SELECT
+    p_account_id,
+    d.calendar_date,
+    d.is_business_day,
+    v_base + (SUM(d.is_business_day::INTEGER) OVER (ORDER BY d.calendar_date)
+              - d.is_business_day::INTEGER)::INTEGER
+  FROM (
+    SELECT
+      day::DATE AS calendar_date,
+      EXTRACT(ISODOW FROM day) < 6 AND h.holiday_date IS NULL AS is_business_day
+    FROM generate_series(p_from, p_to, INTERVAL '1 day') AS day
+    LEFT JOIN account_holidays h ON h.account_id = p_account_id AND h.holiday_date = day::DATE
+  ) d;
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$;
+
+-- Only the holiday trigger and the service role rebuild calendars
+REVOKE EXECUTE ON FUNCTION refresh_business_calendar(UUID, DATE, DATE) FROM PUBLIC, anon, authenticated;
+
+-- Keep the calendar in step with holiday changes: once per statement, each
+-- affected account is rebuilt from its earliest changed holiday on (the ordinals
+-- before it do not move)
+CREATE OR REPLACE FUNCTION refresh_business_calendar_on_holiday()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM refresh_business_calendar(account_id, GREATEST(MIN(holiday_date), DATE '2020-01-01'))
+    FROM new_rows
+    GROUP BY account_id;
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM refresh_business_calendar(account_id, GREATEST(MIN(holiday_date), DATE '2020-01-01'))
+    FROM old_rows
+    GROUP BY account_id;
+  ELSE
+    PERFORM refresh_business_calendar(account_id, GREATEST(MIN(holiday_date), DATE '2020-01-01'))
+    FROM (
+      SELECT account_id, holiday_date FROM new_rows
+      UNION ALL
+      SELECT account_id, holiday_date FROM old_rows
+    ) changed
+    GROUP BY account_id;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow a single event per trigger
+DROP TRIGGER IF EXISTS trigger_refresh_business_calendar ON account_holidays;
+DROP TRIGGER IF EXISTS trigger_refresh_business_calendar_insert ON account_holidays;
+CREATE TRIGGER trigger_refresh_business_calendar_insert
+  AFTER INSERT ON account_holidays
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION refresh_business_calendar_on_holiday();
+
+DROP TRIGGER IF EXISTS trigger_refresh_business_calendar_update ON account_holidays;
+CREATE TRIGGER trigger_refresh_business_calendar_update
+  AFTER UPDATE ON account_holidays
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION refresh_business_calendar_on_holiday();
+
+DROP TRIGGER IF EXISTS trigger_refresh_business_calendar_delete ON account_holidays;
+CREATE TRIGGER trigger_refresh_business_calendar_delete
+  AFTER DELETE ON account_holidays
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION refresh_business_calendar_on_holiday();
+
+-- Same signature and result as migration 017 (holidays now count), as a lookup
+CREATE OR REPLACE FUNCTION calculate_business_days(
+  p_start_date TIMESTAMPTZ,
+  p_end_date TIMESTAMPTZ,
+  p_account_id UUID DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT GREATEST(
+    business_day_ordinal(p_account_id, p_end_date::DATE) - business_day_ordinal(p_account_id, p_start_date::DATE),
+    0
+  )
+$$;
+
+COMMENT ON FUNCTION calculate_business_days IS
+  'Business days (Mon-Fri, excluding account_holidays) from the start date up to the day before the end date';
+
+-- Calendars for the existing accounts
+SELECT refresh_business_calendar(id) FROM accounts;
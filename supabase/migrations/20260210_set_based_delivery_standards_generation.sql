@@ -0,0 +1,85 @@
+-- Set-based delivery standards generation
+-- generate_delivery_standards (008) walked carriers -> products -> origins ->
+-- destinations in four nested FOREACH loops, one INSERT in its own
+-- BEGIN ... EXCEPTION subtransaction per cell. With 500 cities and 15 products
+-- that is 3.7M statements and subtransactions, which stalls onboarding.
+-- Same signature, selection rules and result; the cells are now one
+-- INSERT ... SELECT over the unnested arrays with ON CONFLICT DO NOTHING, so
+-- skipped_count is the candidate cells minus the rows inserted.
+-- scripts/generate_delivery_standards.py builds the same matrix offline as a COPY
+-- file; scripts/benchmark_delivery_standards.sql compares both SQL versions.
+
+CREATE OR REPLACE FUNCTION generate_delivery_standards(
+  p_carrier_ids UUID[] DEFAULT NULL,
+  p_product_ids UUID[] DEFAULT NULL,
+  p_origin_city_ids UUID[] DEFAULT NULL,
+  p_destination_city_ids UUID[] DEFAULT NULL
+)
+RETURNS TABLE(
+  inserted_count INTEGER,
+  skipped_count INTEGER
+) AS $$
+DECLARE
+  v_account_id UUID;
+  v_carriers UUID[];
+  v_origin_cities UUID[];
+  v_destination_cities UUID[];
+  v_inserted INTEGER;
+  v_candidates INTEGER;
+BEGIN
+  -- Get current user's account_id
+  v_account_id := current_user_account_id();
+
+  -- If no carriers specified, get ALL carriers for the account
+  IF p_carrier_ids IS NULL OR array_length(p_carrier_ids, 1) IS NULL THEN
+    SELECT ARRAY_AGG(id) INTO v_carriers
+    FROM carriers
+    WHERE account_id = v_account_id AND status = 'active';
+  ELSE
+    v_carriers := p_carrier_ids;
+  END IF;
+
+  -- If no origin cities specified, get ALL cities for the account
+  IF p_origin_city_ids IS NULL OR array_length(p_origin_city_ids, 1) IS NULL THEN
+    SELECT ARRAY_AGG(id) INTO v_origin_cities
+    FROM cities
+    WHERE account_id = v_account_id AND status = 'active';
+  ELSE
+    v_origin_cities := p_origin_city_ids;
+  END IF;
+
+  -- If no destination cities specified, get ALL cities for the account
+  IF p_destination_city_ids IS NULL OR array_length(p_destination_city_ids, 1) IS NULL THEN
+    SELECT ARRAY_AGG(id) INTO v_destination_cities
+    FROM cities
+    WHERE account_id = v_account_id AND status = 'active';
+  ELSE
+    v_destination_cities := p_destination_city_ids;
+  END IF;
+
+  -- Every (carrier, own active product, origin, destination) cell the loops
+  -- visited, repeated array entries included
+  WITH cells AS (
+    SELECT c.carrier_id, p.id AS product_id, o.city_id AS origin_city_id, d.city_id AS destination_city_id
+    FROM unnest(v_carriers) AS c(carrier_id)
+    JOIN products p
+      ON p.carrier_id = c.carrier_id
+     AND p.status = 'active'
+     AND (p_product_ids IS NULL OR array_length(p_product_ids, 1) IS NULL OR p.id = ANY(p_product_ids))
+    CROSS JOIN unnest(v_origin_cities) AS o(city_id)
+    CROSS JOIN unnest(v_destination_cities) AS d(city_id)
+    WHERE o.city_id <> d.city_id
+  ),
+  inserted AS (
+    INSERT INTO delivery_standards (carrier_id, product_id, origin_city_id, destination_city_id)
+    SELECT carrier_id, product_id, origin_city_id, destination_city_id
+    FROM cells
+    ON CONFLICT ON CONSTRAINT delivery_standards_unique DO NOTHING
+    RETURNING 1
+  )
+  SELECT (SELECT COUNT(*) FROM inserted), (SELECT COUNT(*) FROM cells)
+  INTO v_inserted, v_candidates;
+
+  RETURN QUERY SELECT v_inserted, v_candidates - v_inserted;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
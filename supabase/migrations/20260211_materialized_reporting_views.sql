@@ -0,0 +1,475 @@
+-- Materialized reporting views with watermark-driven incremental refresh
+-- The v_reporting_* views of migration 021 aggregate all of one_db on every
+-- dashboard request. Their rows are now kept in tables hash-partitioned by
+-- account_id and indexed for the dashboard filters, so a read is an index lookup
+-- in one partition.
+--
+-- Statement-level triggers on one_db log the (account, week, destination
+-- locality) slices each INSERT, UPDATE or DELETE touches in reporting_changes.
+-- refresh_reporting_account() consumes an account's changes above its watermark
+-- (reporting_refresh_state.last_change_id) and recomputes only those slices:
+--   reporting_general_performance, reporting_individual_tracking: changed weeks
+--   reporting_by_locality: changed destination localities
+--   reporting_compliance_by_classification: the account (its rows mix every week
+--   and city, and there are a handful of them)
+-- scripts/refresh_reporting_views.py runs it per pending account in batches.
+-- Weeks are truncated in UTC in the trigger and the refresh alike.
+-- Changes to cities or products (city_type, region_name, standard_delivery_hours)
+-- are not tracked: refresh the accounts concerned with p_full.
+
+-- ============================================
+-- MATERIALIZED TABLES
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS reporting_general_performance (
+  account_id UUID NOT NULL,
+  period_week TIMESTAMPTZ NOT NULL,
+  period_month TIMESTAMPTZ NOT NULL,
+  period_quarter TIMESTAMPTZ NOT NULL,
+  carrier_name TEXT NOT NULL,
+  product_name TEXT NOT NULL,
+  total_shipments BIGINT NOT NULL,
+  compliance_percentage NUMERIC,
+  avg_business_days NUMERIC,
+  avg_total_days NUMERIC,
+  PRIMARY KEY (account_id, period_week, period_month, period_quarter, carrier_name, product_name)
+) PARTITION BY HASH (account_id);
+
+CREATE TABLE IF NOT EXISTS reporting_compliance_by_classification (
+  account_id UUID NOT NULL,
+  route_classification TEXT NOT NULL,
+  total_shipments BIGINT NOT NULL,
+  compliance_percentage NUMERIC,
+  avg_business_days NUMERIC,
+  max_business_days INTEGER,
+  most_common_route TEXT,
+  PRIMARY KEY (account_id, route_classification)
+) PARTITION BY HASH (account_id);
+
+CREATE TABLE IF NOT EXISTS reporting_by_locality (
+  account_id UUID NOT NULL,
+  locality TEXT NOT NULL,
+  region_name TEXT,
+  city_classification TEXT NOT NULL,
+  total_shipments BIGINT NOT NULL,
+  compliance_percentage NUMERIC,
+  avg_business_days NUMERIC,
+  max_business_days INTEGER
+) PARTITION BY HASH (account_id);
+
+CREATE TABLE IF NOT EXISTS reporting_individual_tracking (
+  account_id UUID NOT NULL,
+  one_db_id UUID NOT NULL,
+  tag_id TEXT NOT NULL,
+  plan_name TEXT NOT NULL,
+  carrier_name TEXT NOT NULL,
+  product_name TEXT NOT NULL,
+  origin_city_name TEXT NOT NULL,
+  destination_city_name TEXT NOT NULL,
+  sent_at TIMESTAMPTZ NOT NULL,
+  received_at TIMESTAMPTZ NOT NULL,
+  actual_business_days INTEGER,
+  actual_total_days INTEGER,
+  standard_delivery_days NUMERIC,
+  on_time_delivery BOOLEAN,
+  source_data_snapshot JSONB
+) PARTITION BY HASH (account_id);
+
+-- Eight partitions per table. The policies below only apply when the parent is
+-- queried, so the partitions themselves (which PostgREST exposes by name) get RLS
+-- without policies and no client grants: only the parent tables are readable
+DO $$
+DECLARE
+  v_table TEXT;
+  v_partition TEXT;
+  v_remainder INTEGER;
+BEGIN
+  FOREACH v_table IN ARRAY ARRAY['reporting_general_performance', 'reporting_compliance_by_classification',
+                                 'reporting_by_locality', 'reporting_individual_tracking']
+  LOOP
+    FOR v_remainder IN 0..7 LOOP
+      v_partition := v_table || '_p' || v_remainder;
+      EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES WITH (MODULUS 8, REMAINDER %s)',
+                     v_partition, v_table, v_remainder);
+      EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', v_partition);
+      EXECUTE format('REVOKE ALL ON %I FROM anon, authenticated', v_partition);
+    END LOOP;
+  END LOOP;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_reporting_general_performance_week
+  ON reporting_general_performance(account_id, period_week DESC);
+CREATE INDEX IF NOT EXISTS idx_reporting_general_performance_month
+  ON reporting_general_performance(account_id, period_month DESC);
+CREATE INDEX IF NOT EXISTS idx_reporting_by_locality_locality
+  ON reporting_by_locality(account_id, locality);
+CREATE INDEX IF NOT EXISTS idx_reporting_individual_tracking_sent_at
+  ON reporting_individual_tracking(account_id, sent_at DESC);
+CREATE INDEX IF NOT EXISTS idx_reporting_individual_tracking_tag
+  ON reporting_individual_tracking(account_id, tag_id);
+
+-- Locality slices read one_db by destination
+CREATE INDEX IF NOT EXISTS idx_one_db_account_destination ON one_db(account_id, destination_city_name);
+
+ALTER TABLE reporting_general_performance ENABLE ROW LEVEL SECURITY;
+ALTER TABLE reporting_compliance_by_classification ENABLE ROW LEVEL SECURITY;
+ALTER TABLE reporting_by_locality ENABLE ROW LEVEL SECURITY;
+ALTER TABLE reporting_individual_tracking ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS reporting_general_performance_select_policy ON reporting_general_performance;
+CREATE POLICY reporting_general_performance_select_policy ON reporting_general_performance
+  FOR SELECT USING (account_id = current_user_account_id());
+
+DROP POLICY IF EXISTS reporting_compliance_by_classification_select_policy ON reporting_compliance_by_classification;
+CREATE POLICY reporting_compliance_by_classification_select_policy ON reporting_compliance_by_classification
+  FOR SELECT USING (account_id = current_user_account_id());
+
+DROP POLICY IF EXISTS reporting_by_locality_select_policy ON reporting_by_locality;
+CREATE POLICY reporting_by_locality_select_policy ON reporting_by_locality
+  FOR SELECT USING (account_id = current_user_account_id());
+
+DROP POLICY IF EXISTS reporting_individual_tracking_select_policy ON reporting_individual_tracking;
+CREATE POLICY reporting_individual_tracking_select_policy ON reporting_individual_tracking
+  FOR SELECT USING (account_id = current_user_account_id());
+
+GRANT SELECT ON reporting_general_performance TO authenticated;
+GRANT SELECT ON reporting_compliance_by_classification TO authenticated;
+GRANT SELECT ON reporting_by_locality TO authenticated;
+GRANT SELECT ON reporting_individual_tracking TO authenticated;
+
+-- ============================================
+-- CHANGE LOG AND WATERMARKS
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS reporting_changes (
+  change_id BIGSERIAL PRIMARY KEY,
+  account_id UUID NOT NULL,
+  period_week TIMESTAMPTZ NOT NULL,
+  locality TEXT,
+  changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_reporting_changes_account ON reporting_changes(account_id, change_id);
+
+CREATE TABLE IF NOT EXISTS reporting_refresh_state (
+  account_id UUID PRIMARY KEY,
+  last_change_id BIGINT NOT NULL DEFAULT 0,
+  refreshed_at TIMESTAMPTZ,
+  duration_ms INTEGER,
+  lag_seconds NUMERIC
+);
+
+COMMENT ON COLUMN reporting_refresh_state.last_change_id IS
+  'Highest change_id consumed by a refresh. Only informative: change_ids are allocated in insert order, '
+  'not commit order, so a refresh consumes every committed reporting_changes row of the account';
+COMMENT ON COLUMN reporting_refresh_state.lag_seconds IS
+  'Age of the oldest change applied by the last refresh when it finished';
+
+-- Pending refresh work per account, for the refresher: reporting_changes holds
+-- only the changes not yet consumed by a refresh
+CREATE OR REPLACE VIEW reporting_refresh_pending AS
+SELECT
+  c.account_id,
+  COALESCE(MAX(s.last_change_id), 0) AS last_change_id,
+  MAX(c.change_id) AS through_change_id,
+  COUNT(*) AS changes,
+  MIN(c.changed_at) AS oldest_change_at
+FROM reporting_changes c
+LEFT JOIN reporting_refresh_state s ON s.account_id = c.account_id
+GROUP BY c.account_id;
+
+-- Service role only
+ALTER TABLE reporting_changes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE reporting_refresh_state ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON reporting_changes, reporting_refresh_state, reporting_refresh_pending FROM anon, authenticated;
+
+CREATE OR REPLACE FUNCTION log_reporting_changes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET TimeZone = 'UTC'
+AS $$
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO reporting_changes (account_id, period_week, locality)
+    SELECT DISTINCT account_id, DATE_TRUNC('week', sent_at), destination_city_name
+    FROM new_rows;
+  END IF;
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    INSERT INTO reporting_changes (account_id, period_week, locality)
+    SELECT DISTINCT account_id, DATE_TRUNC('week', sent_at), destination_city_name
+    FROM old_rows;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow a single event per trigger
+DROP TRIGGER IF EXISTS trigger_reporting_changes_insert ON one_db;
+CREATE TRIGGER trigger_reporting_changes_insert
+  AFTER INSERT ON one_db
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION log_reporting_changes();
+
+DROP TRIGGER IF EXISTS trigger_reporting_changes_update ON one_db;
+CREATE TRIGGER trigger_reporting_changes_update
+  AFTER UPDATE ON one_db
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION log_reporting_changes();
+
+DROP TRIGGER IF EXISTS trigger_reporting_changes_delete ON one_db;
+CREATE TRIGGER trigger_reporting_changes_delete
+  AFTER DELETE ON one_db
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION log_reporting_changes();
+
+-- ============================================
+-- INCREMENTAL REFRESH
+-- ============================================
+
+-- Consume the pending changes of an account, up to p_through_change_id (default:
+-- all of them), and recompute the slices they touched; p_full recomputes every slice.
+-- The changes are deleted rather than filtered by a change_id range: a change that
+-- commits after a higher change_id was consumed is still picked up by the next refresh
+CREATE OR REPLACE FUNCTION refresh_reporting_account(
+  p_account_id UUID,
+  p_through_change_id BIGINT DEFAULT NULL,
+  p_full BOOLEAN DEFAULT FALSE
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET TimeZone = 'UTC'
+AS $$
+DECLARE
+  v_started TIMESTAMPTZ := clock_timestamp();
+  v_from BIGINT;
+  v_through BIGINT;
+  v_changes INTEGER;
+  v_weeks TIMESTAMPTZ[];
+  v_localities TEXT[];
+  v_oldest TIMESTAMPTZ;
+  v_rows INTEGER;
+  v_total INTEGER := 0;
+  v_duration_ms INTEGER;
+BEGIN
+  INSERT INTO reporting_refresh_state (account_id) VALUES (p_account_id) ON CONFLICT DO NOTHING;
+  -- Serializes refreshes of the same account
+  SELECT last_change_id INTO v_from
+  FROM reporting_refresh_state
+  WHERE account_id = p_account_id
+  FOR UPDATE;
+
+  -- Rolled back with the rest of the refresh if it fails
+  WITH consumed AS (
+    DELETE FROM reporting_changes
+    WHERE account_id = p_account_id
+      AND (p_through_change_id IS NULL OR change_id <= p_through_change_id)
+    RETURNING change_id, period_week, locality, changed_at
+  )
+  SELECT
+    ARRAY_AGG(DISTINCT period_week),
+    ARRAY_AGG(DISTINCT locality) FILTER (WHERE locality IS NOT NULL),
+    MIN(changed_at),
+    MAX(change_id),
+    COUNT(*)
+  INTO v_weeks, v_localities, v_oldest, v_through, v_changes
+  FROM consumed;
+
+  v_through := GREATEST(v_from, COALESCE(v_through, v_from));
+
+  IF p_full THEN
+    -- Every slice with data or with stale rows
+    SELECT ARRAY_AGG(DISTINCT week) INTO v_weeks
+    FROM (
+      SELECT DATE_TRUNC('week', sent_at) AS week FROM one_db WHERE account_id = p_account_id
+      UNION
+      SELECT period_week FROM reporting_general_performance WHERE account_id = p_account_id
+      UNION
+      SELECT DATE_TRUNC('week', sent_at) FROM reporting_individual_tracking WHERE account_id = p_account_id
+    ) w;
+    SELECT ARRAY_AGG(DISTINCT locality) INTO v_localities
+    FROM (
+      SELECT destination_city_name AS locality FROM one_db WHERE account_id = p_account_id
+      UNION
+      SELECT locality FROM reporting_by_locality WHERE account_id = p_account_id
+    ) l;
+  END IF;
+
+  IF v_weeks IS NOT NULL OR p_full THEN
+    -- General performance: the changed weeks
+    DELETE FROM reporting_general_performance
+    WHERE account_id = p_account_id AND period_week = ANY(v_weeks);
+
+    INSERT INTO reporting_general_performance
+    SELECT
+      o.account_id,
+      DATE_TRUNC('week', o.sent_at),
+      DATE_TRUNC('month', o.sent_at),
+      DATE_TRUNC('quarter', o.sent_at),
+      o.carrier_name,
+      o.product_name,
+      COUNT(*),
+      ROUND(
+        (SUM(CASE WHEN o.on_time_delivery THEN 1 ELSE 0 END)::numeric / COUNT(*)::numeric * 100),
+        2
+      ),
+      ROUND(AVG(o.business_transit_days), 2),
+      ROUND(AVG(o.total_transit_days), 2)
+    FROM unnest(v_weeks) AS w(week_start)
+    JOIN one_db o
+      ON o.account_id = p_account_id
+     AND o.sent_at >= w.week_start
+     AND o.sent_at < w.week_start + INTERVAL '1 week'
+    WHERE o.received_at IS NOT NULL
+      AND o.business_transit_days IS NOT NULL
+    GROUP BY
+      o.account_id,
+      DATE_TRUNC('week', o.sent_at),
+      DATE_TRUNC('month', o.sent_at),
+      DATE_TRUNC('quarter', o.sent_at),
+      o.carrier_name,
+      o.product_name;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_total := v_total + v_rows;
+
+    -- Individual tracking: the shipments of the changed weeks
+    DELETE FROM reporting_individual_tracking t
+    USING unnest(v_weeks) AS w(week_start)
+    WHERE t.account_id = p_account_id
+      AND t.sent_at >= w.week_start
+      AND t.sent_at < w.week_start + INTERVAL '1 week';
+
+    INSERT INTO reporting_individual_tracking
+    SELECT
+      o.account_id,
+      o.id,
+      o.tag_id,
+      o.plan_name,
+      o.carrier_name,
+      o.product_name,
+      o.origin_city_name,
+      o.destination_city_name,
+      o.sent_at,
+      o.received_at,
+      o.business_transit_days,
+      o.total_transit_days,
+      p.standard_delivery_hours / 24,
+      o.on_time_delivery,
+      o.source_data_snapshot
+    FROM unnest(v_weeks) AS w(week_start)
+    JOIN one_db o
+      ON o.account_id = p_account_id
+     AND o.sent_at >= w.week_start
+     AND o.sent_at < w.week_start + INTERVAL '1 week'
+    LEFT JOIN products p ON o.product_name = p.name
+    WHERE o.received_at IS NOT NULL;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_total := v_total + v_rows;
+
+    -- By locality: the changed destinations
+    DELETE FROM reporting_by_locality
+    WHERE account_id = p_account_id AND locality = ANY(v_localities);
+
+    INSERT INTO reporting_by_locality
+    SELECT
+      o.account_id,
+      o.destination_city_name,
+      c.region_name,
+      COALESCE(c.city_type, 'minor'),
+      COUNT(*),
+      ROUND(
+        (SUM(CASE WHEN o.on_time_delivery THEN 1 ELSE 0 END)::numeric / COUNT(*)::numeric * 100),
+        2
+      ),
+      ROUND(AVG(o.business_transit_days), 2),
+      MAX(o.business_transit_days)
+    FROM one_db o
+    LEFT JOIN cities c ON o.destination_city_name = c.name
+    WHERE o.account_id = p_account_id
+      AND o.destination_city_name = ANY(v_localities)
+      AND o.received_at IS NOT NULL
+    GROUP BY
+      o.account_id,
+      o.destination_city_name,
+      c.region_name,
+      c.city_type;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_total := v_total + v_rows;
+
+    -- Compliance by classification: the whole account
+    DELETE FROM reporting_compliance_by_classification WHERE account_id = p_account_id;
+
+    INSERT INTO reporting_compliance_by_classification
+    SELECT
+      account_id,
+      route_classification,
+      COUNT(*),
+      ROUND(
+        (SUM(CASE WHEN on_time_delivery THEN 1 ELSE 0 END)::numeric / COUNT(*)::numeric * 100),
+        2
+      ),
+      ROUND(AVG(business_transit_days), 2),
+      MAX(business_transit_days),
+      MODE() WITHIN GROUP (ORDER BY origin_city_name || ' - ' || destination_city_name)
+    FROM (
+      SELECT
+        o.account_id,
+        CONCAT(
+          COALESCE(UPPER(SUBSTRING(oc.city_type, 1, 1)), 'M'),
+          COALESCE(UPPER(SUBSTRING(dc.city_type, 1, 1)), 'M')
+        ) AS route_classification,
+        o.origin_city_name,
+        o.destination_city_name,
+        o.on_time_delivery,
+        o.business_transit_days
+      FROM one_db o
+      LEFT JOIN cities oc ON o.origin_city_name = oc.name
+      LEFT JOIN cities dc ON o.destination_city_name = dc.name
+      WHERE o.account_id = p_account_id
+        AND o.received_at IS NOT NULL
+    ) route_data
+    GROUP BY account_id, route_classification;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_total := v_total + v_rows;
+  END IF;
+
+  v_duration_ms := (EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000)::INTEGER;
+
+  UPDATE reporting_refresh_state
+  SET
+    last_change_id = v_through,
+    refreshed_at = clock_timestamp(),
+    duration_ms = v_duration_ms,
+    lag_seconds = ROUND(EXTRACT(EPOCH FROM clock_timestamp() - v_oldest)::numeric, 3)
+  WHERE account_id = p_account_id;
+
+  RETURN jsonb_build_object(
+    'account_id', p_account_id,
+    'from_change_id', v_from,
+    'through_change_id', v_through,
+    'changes', v_changes,
+    'weeks', COALESCE(array_length(v_weeks, 1), 0),
+    'localities', COALESCE(array_length(v_localities, 1), 0),
+    'rows', v_total,
+    'duration_ms', v_duration_ms,
+    'lag_seconds', ROUND(EXTRACT(EPOCH FROM clock_timestamp() - v_oldest)::numeric, 3)
+  );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION refresh_reporting_account(UUID, BIGINT, BOOLEAN) FROM PUBLIC, anon, authenticated;
+
+COMMENT ON FUNCTION refresh_reporting_account IS
+  'Consumes the pending reporting_changes of an account and recomputes the reporting_* slices they touched';
+
+-- Initial contents
+SELECT refresh_reporting_account(account_id, NULL, TRUE) FROM (SELECT DISTINCT account_id FROM one_db) a;
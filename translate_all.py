@@ -4,119 +4,466 @@ Translate all strings in translations_template.csv to ES, FR, and AR
 using OpenAI API for high-quality translations
 """
 
-import csv
 import os
-from openai import OpenAI
+import time
+import random
+import asyncio
+import argparse
+from openai import OpenAI, AsyncOpenAI, APIStatusError, APIConnectionError
+from translation_memory import TranslationMemory, prompt_fingerprint
+from translation_batching import (DEFAULT_TOKEN_BUDGET, RESPONSE_INSTRUCTIONS, estimate_tokens,
+                                  format_items, pack_batches, translate_items, translate_items_async)
+from translation_journal import TranslationJournal, run_fingerprint
+from translation_catalogue import LOCALE_FILES, TranslationCatalogue
 
 # Initialize OpenAI client (API key from environment)
 client = OpenAI()
 
-def translate_batch(texts, target_lang, source_lang='en'):
-    """Translate a batch of texts to target language"""
+MODEL = "gpt-4.1-mini"
+
+# Translations already paid for are reused across runs and scripts
+memory = TranslationMemory()
+
+LANG_NAMES = {
+    'es': 'Spanish',
+    'fr': 'French',
+    'ar': 'Arabic'
+}
+
+# Completed batches are journaled here so an interrupted run can --resume
+JOURNAL_FILE = '.translate_all.journal.jsonl'
+
+# Async mode: retry rate limits and server errors with exponential backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+def build_prompts(target_lang):
+    """Return (system_prompt, prompt header) for a target language"""
     
-    lang_names = {
-        'es': 'Spanish',
-        'fr': 'French',
-        'ar': 'Arabic'
-    }
+    lang_name = LANG_NAMES[target_lang]
+    system_prompt = f"You are a professional translator specializing in software localization. Translate English to {lang_name} maintaining technical accuracy and UI conventions."
     
     # Create prompt for batch translation
-    prompt = f"""Translate the following English texts to {lang_names[target_lang]}.
+    prompt = f"""Translate the following English texts to {lang_name}.
 Maintain technical terminology and context.
-For UI elements, use standard {lang_names[target_lang]} conventions.
-Return ONLY the translations, one per line, in the same order.
+For UI elements, use standard {lang_name} conventions.
+{RESPONSE_INSTRUCTIONS}
 
 Texts to translate:
 """
-    
-    for i, text in enumerate(texts, 1):
-        prompt += f"{i}. {text}\n"
+
+    return system_prompt, prompt
+
+def request_translations(items, system_prompt, prompt):
+    """Send one batch of {id: text} items to the model and return the raw reply"""
     
     try:
         response = client.chat.completions.create(
-            model="gpt-4.1-mini",
+            model=MODEL,
             messages=[
-                {"role": "system", "content": f"You are a professional translator specializing in software localization. Translate English to {lang_names[target_lang]} maintaining technical accuracy and UI conventions."},
-                {"role": "user", "content": prompt}
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt + format_items(items)}
             ],
-            temperature=0.3
+            temperature=0.3,
+            response_format={"type": "json_object"}
         )
         
-        # Parse response
-        translations = response.choices[0].message.content.strip().split('\n')
-        
-        # Clean up translations (remove numbering if present)
-        cleaned = []
-        for trans in translations:
-            # Remove leading numbers like "1. ", "2. ", etc.
-            trans = trans.strip()
-            if trans and trans[0].isdigit() and '. ' in trans:
-                trans = trans.split('. ', 1)[1]
-            cleaned.append(trans)
-        
-        return cleaned
+        return response.choices[0].message.content
     
     except Exception as e:
         print(f"Error translating batch: {e}")
-        return [''] * len(texts)
+        return None
 
-def main():
-    input_file = 'translations_template.csv'
-    output_file = 'translations_complete_all.csv'
+def translate_batch(texts, target_lang, source_lang='en'):
+    """Translate a batch of texts to target language, reusing translation memory"""
     
-    print(f"Reading {input_file}...")
+    system_prompt, prompt = build_prompts(target_lang)
+    prompt_version = prompt_fingerprint(system_prompt, prompt)
+    known = memory.lookup(texts, target_lang, MODEL, prompt_version)
+    pending = [text for text in dict.fromkeys(texts) if text not in known]
     
-    # Read input CSV
-    rows = []
-    with open(input_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            rows.append(row)
+    if pending:
+        translations = translate_items(
+            lambda items: request_translations(items, system_prompt, prompt), pending)
+        memory.store(zip(pending, translations), target_lang, MODEL, prompt_version)
+        known.update(zip(pending, translations))
     
-    print(f"Found {len(rows)} strings to translate")
+    return [known.get(text, '') for text in texts]
+
+class TokenBucket:
+    """Async token bucket refilled continuously at rate_per_minute"""
+    
+    def __init__(self, rate_per_minute):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+def retry_delay(attempt, error=None):
+    """Backoff for the given attempt, honouring a Retry-After header when present"""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = BACKOFF_BASE * 2 ** attempt
+    delay = min(delay, BACKOFF_MAX)
+    return delay + random.uniform(0, delay * 0.1)
+
+async def request_translations_async(async_client, limits, items, system_prompt, prompt):
+    """Async request_translations with rate limiting and retries"""
+    
+    user_prompt = prompt + format_items(items)
+    # Budget for the prompt plus a reply of roughly the same size
+    tokens = estimate_tokens(system_prompt + user_prompt) * 2
+    requests_bucket, tokens_bucket = limits
+    
+    for attempt in range(MAX_RETRIES + 1):
+        await requests_bucket.acquire()
+        await tokens_bucket.acquire(tokens)
+        
+        try:
+            response = await async_client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.3,
+                response_format={"type": "json_object"}
+            )
+            return response.choices[0].message.content
+        
+        except APIStatusError as e:
+            if e.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                print(f"Error translating batch: {e}")
+                return None
+            delay = retry_delay(attempt, e)
+        
+        except APIConnectionError as e:
+            if attempt == MAX_RETRIES:
+                print(f"Error translating batch: {e}")
+                return None
+            delay = retry_delay(attempt)
+        
+        except Exception as e:
+            print(f"Error translating batch: {e}")
+            return None
+        
+        await asyncio.sleep(delay)
+
+async def translate_batch_async(async_client, limits, texts, target_lang):
+    """Async translate_batch: memory first, then only the misses upstream"""
+    
+    system_prompt, prompt = build_prompts(target_lang)
+    prompt_version = prompt_fingerprint(system_prompt, prompt)
+    known = memory.lookup(texts, target_lang, MODEL, prompt_version)
+    pending = [text for text in dict.fromkeys(texts) if text not in known]
     
-    # Translate in batches of 20 for efficiency
-    batch_size = 20
-    total_batches = (len(rows) + batch_size - 1) // batch_size
+    if pending:
+        async def send(items):
+            return await request_translations_async(async_client, limits, items, system_prompt, prompt)
+        
+        translations = await translate_items_async(send, pending)
+        memory.store(zip(pending, translations), target_lang, MODEL, prompt_version)
+        known.update(zip(pending, translations))
+    
+    return [known.get(text, '') for text in texts]
+
+def normalize_source(text):
+    """Normalization used to detect identical source strings"""
+    return ' '.join(text.split())
+
+def dedupe_sources(rows):
+    """
+    Collapse rows to unique normalized English strings.
+    
+    Returns (units, groups): units is one {'en': text} dict per unique string in
+    first-seen order, groups[i] lists the indexes of the rows sharing units[i].
+    """
+    index = {}
+    units = []
+    groups = []
+    
+    for row_idx, row in enumerate(rows):
+        text = normalize_source(row['en'])
+        if text not in index:
+            index[text] = len(units)
+            units.append({'en': text})
+            groups.append([])
+        groups[index[text]].append(row_idx)
+    
+    return units, groups
+
+def fan_out(rows, units, groups, languages):
+    """Copy each unique string's translations back to every row that shares it"""
+    for unit, row_indexes in zip(units, groups):
+        for row_idx in row_indexes:
+            for lang in languages:
+                rows[row_idx][lang] = unit.get(lang, '')
+
+def merge_delta(catalogue, rows, delta, languages):
+    """
+    Write translated delta rows into the catalogue and the locale files.
     
-    for lang in ['es', 'fr', 'ar']:
+    New and changed keys overwrite every language; missing keys only fill empty
+    values. The English text of a new or changed key is only written once all
+    its translations succeeded, so a partial run is picked up again next time.
+    Returns {lang: rows rewritten or added}.
+    """
+    refresh = delta['new'] | delta['changed']
+    keys = [row['key'] for row in rows]
+    current = {lang: catalogue.lookup(keys, lang) for lang in languages}
+    updates = {lang: {} for lang in ['en'] + languages}
+    
+    for row in rows:
+        key = row['key']
+        for lang in languages:
+            if row.get(lang) and (key in refresh or not current[lang].get(key)):
+                updates[lang][key] = row[lang]
+        if key in refresh and all(row.get(lang) for lang in languages):
+            updates['en'][key] = row['en'].strip()
+    
+    counts = {}
+    for lang, lang_updates in updates.items():
+        counts[lang] = catalogue.update(lang, lang_updates) if lang_updates else 0
+        if counts[lang]:
+            catalogue.export_locale(lang)
+    
+    return counts
+
+def translate_rows(rows, languages, batches, journal):
+    """Translate rows in place, one batch at a time"""
+    
+    for lang in languages:
         print(f"\nTranslating to {lang.upper()}...")
         
-        for batch_idx in range(0, len(rows), batch_size):
-            batch_num = batch_idx // batch_size + 1
-            print(f"  Batch {batch_num}/{total_batches}...", end='', flush=True)
+        for batch_num, batch in enumerate(batches, 1):
+            print(f"  Batch {batch_num}/{len(batches)} ({len(batch)} strings)...", end='', flush=True)
             
-            batch_rows = rows[batch_idx:batch_idx + batch_size]
+            batch_rows = [rows[row_idx] for row_idx in batch]
             texts = [row['en'] for row in batch_rows]
             
-            translations = translate_batch(texts, lang)
+            translations = journal.get(lang, batch_num)
+            if translations is None:
+                translations = translate_batch(texts, lang)
+                # Batches with failed strings stay unjournaled so --resume retries them
+                if all(translations):
+                    journal.record(lang, batch_num, translations)
+            else:
+                print(" (journaled)", end='')
             
             # Assign translations to rows
-            for i, trans in enumerate(translations):
-                if i < len(batch_rows):
-                    batch_rows[i][lang] = trans
+            for row, trans in zip(batch_rows, translations):
+                row[lang] = trans
             
             print(" ✓")
+
+async def translate_rows_async(rows, languages, batches, journal, concurrency, rpm, tpm):
+    """Translate rows in place, running (language, batch) requests concurrently"""
+    async_client = AsyncOpenAI(max_retries=0)  # retries are handled here
+    limits = (TokenBucket(rpm), TokenBucket(tpm))
+    semaphore = asyncio.Semaphore(concurrency)
     
-    # Write output CSV
-    print(f"\nWriting {output_file}...")
-    with open(output_file, 'w', encoding='utf-8', newline='') as f:
-        fieldnames = ['key', 'en', 'es', 'fr', 'ar']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+    async def run(lang, batch_num, batch):
+        batch_rows = [rows[row_idx] for row_idx in batch]
+        texts = [row['en'] for row in batch_rows]
+        
+        translations = journal.get(lang, batch_num)
+        if translations is not None:
+            for row, trans in zip(batch_rows, translations):
+                row[lang] = trans
+            return
+        
+        async with semaphore:
+            translations = await translate_batch_async(async_client, limits, texts, lang)
+        # Batches with failed strings stay unjournaled so --resume retries them
+        if all(translations):
+            journal.record(lang, batch_num, translations)
+        
+        # Assign translations to rows
+        for row, trans in zip(batch_rows, translations):
+            row[lang] = trans
         
-        writer.writeheader()
-        for row in rows:
-            writer.writerow({
-                'key': row['key'],
-                'en': row['en'],
-                'es': row.get('es', ''),
-                'fr': row.get('fr', ''),
-                'ar': row.get('ar', '')
-            })
+        print(f"  {lang.upper()} batch {batch_num}/{len(batches)} ({len(batch)} strings) ✓")
+    
+    print(f"\nTranslating to {', '.join(lang.upper() for lang in languages)} "
+          f"(concurrency {concurrency}, {rpm} req/min, {tpm} tokens/min)...")
+    
+    try:
+        await asyncio.gather(*(run(lang, batch_num, batch)
+                               for lang in languages
+                               for batch_num, batch in enumerate(batches, 1)))
+    finally:
+        await async_client.close()
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Translate translations_template.csv to ES, FR and AR')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='run batches concurrently across languages')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='with --async, maximum requests in flight (default: 8)')
+    parser.add_argument('--rpm', type=int, default=500,
+                        help='with --async, requests per minute limit (default: 500)')
+    parser.add_argument('--tpm', type=int, default=200000,
+                        help='with --async, tokens per minute limit (default: 200000)')
+    parser.add_argument('--token-budget', type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help=f'estimated source tokens per request (default: {DEFAULT_TOKEN_BUDGET})')
+    parser.add_argument('--max-batch', type=int, default=None,
+                        help='optional cap on strings per request')
+    parser.add_argument('--no-dedup', action='store_true',
+                        help='translate every row even if its English text repeats')
+    parser.add_argument('--resume', action='store_true',
+                        help=f'skip batches already journaled in {JOURNAL_FILE} by an interrupted run')
+    parser.add_argument('--delta', action='store_true',
+                        help='only translate keys that are new, changed or missing in the locale files '
+                             'and update those files in place')
+    parser.add_argument('--locale-files', default=LOCALE_FILES,
+                        help=f'locale files of the translation catalogue, updated by --delta and --update-locales '
+                             f'(default: {LOCALE_FILES})')
+    parser.add_argument('--update-locales', action='store_true',
+                        help='without --delta, also write the new translations into the locale files '
+                             '(default: only translations_complete_all.csv shows them)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not reuse or update the persistent translation memory')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global memory
+    args = parse_args(argv)
+    
+    if args.no_memory:
+        memory.close()
+        memory = TranslationMemory(':memory:')
+    
+    output_file = 'translations_complete_all.csv'
+    
+    # Strings and existing translations come from the catalogue, which picks up
+    # any template or locale file edited since it last saw them
+    catalogue = TranslationCatalogue(locale_files=args.locale_files)
+    if catalogue.imported:
+        print(f"Catalogue: imported {', '.join(catalogue.imported)}")
+    
+    rows = catalogue.extracted()
+    
+    print(f"Found {len(rows)} strings to translate")
+    
+    languages = ['es', 'fr', 'ar']
+    
+    # Delta mode: translate only what the existing locale files lack
+    all_rows = rows
+    if args.delta:
+        delta = catalogue.classify_delta(languages)
+        pending = delta['new'] | delta['changed'] | delta['missing']
+        rows = [row for row in rows if row['key'] in pending]
+        
+        print(f"Delta against {args.locale_files}: {len(delta['new'])} new, {len(delta['changed'])} changed, "
+              f"{len(delta['missing'])} missing a translation, "
+              f"{len(all_rows) - len(rows)} unchanged")
+        if delta['stale']:
+            print(f"   {len(delta['stale'])} key(s) in the locale files are not in the template "
+                  f"(kept; they may come from t() calls)")
+        if not rows:
+            print("✅ Locale files are up to date")
+            catalogue.close()
+            memory.close()
+            return
+    
+    start = time.perf_counter()
+    
+    # Identical labels on different screens are translated once and fanned out
+    if args.no_dedup:
+        units, groups = rows, [[row_idx] for row_idx in range(len(rows))]
+    else:
+        units, groups = dedupe_sources(rows)
+        saved = 1 - len(units) / len(rows) if rows else 0
+        batches_before = len(pack_batches([row['en'] for row in rows], args.token_budget, args.max_batch))
+        batches_after = len(pack_batches([unit['en'] for unit in units], args.token_budget, args.max_batch))
+        print(f"Deduplicated to {len(units)} unique source strings ({saved:.1%} fewer); "
+              f"{batches_after * len(languages)} requests instead of {batches_before * len(languages)}")
+    
+    # Pack batches to a token budget rather than a fixed number of strings
+    batches = pack_batches([unit['en'] for unit in units], args.token_budget, args.max_batch)
+    
+    fingerprint = run_fingerprint(
+        MODEL,
+        [prompt_fingerprint(*build_prompts(lang)) for lang in languages],
+        [[units[row_idx]['en'] for row_idx in batch] for batch in batches]
+    )
+    journal = TranslationJournal(JOURNAL_FILE, fingerprint, resume=args.resume)
+    if journal.completed:
+        print(f"Resuming: {len(journal.completed)}/{len(batches) * len(languages)} batches already journaled")
+    
+    try:
+        if args.use_async:
+            asyncio.run(translate_rows_async(units, languages, batches, journal,
+                                             args.concurrency, args.rpm, args.tpm))
+        else:
+            translate_rows(units, languages, batches, journal)
+    except KeyboardInterrupt:
+        journal.close()
+        print(f"\n⚠️  Interrupted; completed batches are in {JOURNAL_FILE}. Rerun with --resume to continue.")
+        raise SystemExit(130)
+    
+    if not args.no_dedup:
+        fan_out(rows, units, groups, languages)
+    
+    elapsed = time.perf_counter() - start
+    
+    if args.delta:
+        counts = merge_delta(catalogue, rows, delta, languages)
+        print("\nUpdated locale files: " + ', '.join(f"{lang.upper()} {count}" for lang, count in counts.items()))
+    elif args.update_locales:
+        counts = {lang: catalogue.update(lang, {row['key']: row[lang] for row in rows if row.get(lang)})
+                  for lang in languages}
+        for lang, count in counts.items():
+            if count:
+                catalogue.export_locale(lang)
+        print("\nUpdated locale files: " + ', '.join(f"{lang.upper()} {count}" for lang, count in counts.items()))
+    else:
+        # A full run's machine translations stay out of the hand-edited locale files
+        counts = {lang: catalogue.record(lang, {row['key']: row[lang] for row in rows if row.get(lang)})
+                  for lang in languages}
+        print("\nRecorded machine translations: "
+              + ', '.join(f"{lang.upper()} {count}" for lang, count in counts.items())
+              + f"; {args.locale_files} left as they are (--update-locales to write them)")
+    
+    # Regenerate the wide CSV from the catalogue
+    print(f"\nWriting {output_file}...")
+    catalogue.export(output_file, 'wide', 'extracted')
+    rows = all_rows
+    catalogue.close()
+    
+    incomplete = len(batches) * len(languages) - len(journal.completed)
+    if incomplete:
+        journal.close()
+    else:
+        journal.finish()
     
     print(f"✅ Translation complete! Output: {output_file}")
     print(f"   Total strings: {len(rows)}")
     print(f"   Languages: EN, ES, FR, AR")
+    print(f"   Translation time: {elapsed:.1f}s")
+    print(f"   {memory.summary()}")
+    memory.close()
+    if incomplete:
+        print(f"⚠️  {incomplete} batch(es) had failed strings; rerun with --resume to retry only those")
 
 if __name__ == '__main__':
     main()
@@ -5,86 +5,122 @@ Then generate en.csv and fr.csv files
 """
 
 import csv
+import argparse
 import os
 from openai import OpenAI
+from translation_memory import TranslationMemory, prompt_fingerprint
+from translation_batching import RESPONSE_INSTRUCTIONS, format_items, pack_batches, translate_items
+from translation_journal import TranslationJournal, run_fingerprint
+from translation_catalogue import TranslationCatalogue
 
 # Initialize OpenAI client
 client = OpenAI()
 
-def translate_batch(texts, target_lang='fr'):
-    """Translate a batch of texts to French"""
-    
-    prompt = f"""Translate the following English texts to French.
+MODEL = "gpt-4.1-mini"
+
+# Translations already paid for are reused across runs and scripts
+memory = TranslationMemory()
+
+SYSTEM_PROMPT = "You are a professional translator specializing in software localization. Translate English to French maintaining technical accuracy and UI conventions."
+
+PROMPT = f"""Translate the following English texts to French.
 Maintain technical terminology and context.
 For UI elements, use standard French conventions.
-Return ONLY the translations, one per line, in the same order.
+{RESPONSE_INSTRUCTIONS}
 
 Texts to translate:
 """
-    
-    for i, text in enumerate(texts, 1):
-        prompt += f"{i}. {text}\n"
+
+PROMPT_VERSION = prompt_fingerprint(SYSTEM_PROMPT, PROMPT)
+
+# Completed batches are journaled here so an interrupted run can --resume
+JOURNAL_FILE = '.translate_en_fr.journal.jsonl'
+
+def request_translations(items):
+    """Send one batch of {id: text} items to the model and return the raw reply"""
     
     try:
         response = client.chat.completions.create(
-            model="gpt-4.1-mini",
+            model=MODEL,
             messages=[
-                {"role": "system", "content": "You are a professional translator specializing in software localization. Translate English to French maintaining technical accuracy and UI conventions."},
-                {"role": "user", "content": prompt}
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": PROMPT + format_items(items)}
             ],
-            temperature=0.3
+            temperature=0.3,
+            response_format={"type": "json_object"}
         )
         
-        # Parse response
-        translations = response.choices[0].message.content.strip().split('\n')
-        
-        # Clean up translations
-        cleaned = []
-        for trans in translations:
-            trans = trans.strip()
-            if trans and trans[0].isdigit() and '. ' in trans:
-                trans = trans.split('. ', 1)[1]
-            cleaned.append(trans)
-        
-        return cleaned
+        return response.choices[0].message.content
     
     except Exception as e:
         print(f"Error: {e}")
-        return [''] * len(texts)
+        return None
 
-def main():
-    input_file = 'translations_template.csv'
+def translate_batch(texts, target_lang='fr'):
+    """Translate a batch of texts to French, reusing translation memory"""
     
-    print(f"Reading {input_file}...")
+    known = memory.lookup(texts, 'fr', MODEL, PROMPT_VERSION)
+    pending = [text for text in dict.fromkeys(texts) if text not in known]
     
-    # Read input CSV
-    rows = []
-    with open(input_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            rows.append(row)
+    if pending:
+        translations = translate_items(request_translations, pending)
+        memory.store(zip(pending, translations), 'fr', MODEL, PROMPT_VERSION)
+        known.update(zip(pending, translations))
+    
+    return [known.get(text, '') for text in texts]
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--resume', action='store_true',
+                        help=f'skip batches already journaled in {JOURNAL_FILE} by an interrupted run')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    # Strings come from the catalogue, which picks up an edited template
+    catalogue = TranslationCatalogue()
+    rows = catalogue.extracted()
     
     print(f"Found {len(rows)} strings")
     print(f"Translating to French...")
     
-    # Translate in batches
-    batch_size = 20
-    total_batches = (len(rows) + batch_size - 1) // batch_size
+    # Pack batches to a token budget rather than a fixed number of strings
+    batches = pack_batches([row['en'] for row in rows])
     
-    for batch_idx in range(0, len(rows), batch_size):
-        batch_num = batch_idx // batch_size + 1
-        print(f"  Batch {batch_num}/{total_batches}...", end='', flush=True)
-        
-        batch_rows = rows[batch_idx:batch_idx + batch_size]
-        texts = [row['en'] for row in batch_rows]
-        
-        translations = translate_batch(texts)
-        
-        for i, trans in enumerate(translations):
-            if i < len(batch_rows):
-                batch_rows[i]['fr'] = trans
-        
-        print(" ✓")
+    fingerprint = run_fingerprint(MODEL, PROMPT_VERSION, [[rows[row_idx]['en'] for row_idx in batch] for batch in batches])
+    journal = TranslationJournal(JOURNAL_FILE, fingerprint, resume=args.resume)
+    if journal.completed:
+        print(f"Resuming: {len(journal.completed)}/{len(batches)} batches already journaled")
+    
+    try:
+        for batch_num, batch in enumerate(batches, 1):
+            print(f"  Batch {batch_num}/{len(batches)} ({len(batch)} strings)...", end='', flush=True)
+            
+            batch_rows = [rows[row_idx] for row_idx in batch]
+            texts = [row['en'] for row in batch_rows]
+            
+            translations = journal.get('fr', batch_num)
+            if translations is None:
+                translations = translate_batch(texts)
+                # Batches with failed strings stay unjournaled so --resume retries them
+                if all(translations):
+                    journal.record('fr', batch_num, translations)
+            else:
+                print(" (journaled)", end='')
+            
+            for row, trans in zip(batch_rows, translations):
+                row['fr'] = trans
+            
+            print(" ✓")
+    except KeyboardInterrupt:
+        journal.close()
+        print(f"\n⚠️  Interrupted; completed batches are in {JOURNAL_FILE}. Rerun with --resume to continue.")
+        raise SystemExit(130)
+    
+    # Recorded as machine translations: fr.csv shows them, public/locales is left alone
+    catalogue.record('fr', {row['key']: row['fr'] for row in rows if row.get('fr')})
     
     # Write en.csv
     print(f"\nGenerating en.csv...")
@@ -96,15 +132,21 @@ def main():
     
     # Write fr.csv
     print(f"Generating fr.csv...")
-    with open('fr.csv', 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['key', 'translation'])
-        for row in rows:
-            writer.writerow([row['key'], row.get('fr', '')])
+    catalogue.export('fr.csv', 'locale', 'extracted', 'fr')
+    catalogue.close()
+    
+    incomplete = len(batches) - len(journal.completed)
+    if incomplete:
+        journal.close()
+    else:
+        journal.finish()
     
     print(f"\n✅ Complete!")
+    print(f"   {memory.summary()}")
     print(f"   en.csv: {len(rows)} strings")
     print(f"   fr.csv: {len(rows)} strings")
+    if incomplete:
+        print(f"⚠️  {incomplete} batch(es) had failed strings; rerun with --resume to retry only those")
 
 if __name__ == '__main__':
     main()
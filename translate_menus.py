@@ -1,74 +1,126 @@
 #!/usr/bin/env python3
 import csv
 import os
+import argparse
 from openai import OpenAI
+from translation_memory import TranslationMemory, prompt_fingerprint
+from translation_batching import RESPONSE_INSTRUCTIONS, format_items, pack_batches, translate_items
+from translation_catalogue import TranslationCatalogue
 
 client = OpenAI()
 
-# Read English menu translations
-with open('menu_translations_en.csv', 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    menu_items = list(reader)
+MODEL = "gpt-4.1-mini"
 
-print(f"Loaded {len(menu_items)} menu translations")
+# Translations already paid for are reused across runs and scripts
+memory = TranslationMemory()
 
-# Translate to Spanish, French, and Arabic
-for target_lang, lang_name in [('es', 'Spanish'), ('fr', 'French'), ('ar', 'Arabic')]:
-    print(f"\nTranslating to {lang_name}...")
-    
-    translations = []
-    
-    # Translate in batches of 10
-    batch_size = 10
-    for i in range(0, len(menu_items), batch_size):
-        batch = menu_items[i:i+batch_size]
-        
-        # Prepare batch for translation
-        texts_to_translate = [item['translation'] for item in batch]
-        
-        prompt = f"""Translate the following UI menu items to {lang_name}.
+PROMPT = """Translate the following UI menu items to {lang_name}.
 Maintain professional tone and technical terminology.
-Return ONLY the translations, one per line, in the same order.
+{response_instructions}
 
 Texts to translate:
-{chr(10).join(f"{idx+1}. {text}" for idx, text in enumerate(texts_to_translate))}"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
-        )
+"""
+
+def build_prompt(lang_name):
+    """Prompt header for a target language"""
+    return PROMPT.format(lang_name=lang_name, response_instructions=RESPONSE_INSTRUCTIONS)
+
+def request_translations(items, lang_name):
+    """Send one batch of {id: text} items to the model and return the raw reply"""
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": build_prompt(lang_name) + format_items(items)}],
+        temperature=0.3,
+        response_format={"type": "json_object"}
+    )
+    
+    return response.choices[0].message.content
+
+def translate_batch(texts, target_lang, lang_name):
+    """Translate a batch of menu items, reusing translation memory"""
+    prompt_version = prompt_fingerprint(build_prompt(lang_name))
+    known = memory.lookup(texts, target_lang, MODEL, prompt_version)
+    pending = [text for text in dict.fromkeys(texts) if text not in known]
+    
+    if pending:
+        translations = translate_items(lambda items: request_translations(items, lang_name), pending)
+        memory.store(zip(pending, translations), target_lang, MODEL, prompt_version)
+        known.update(zip(pending, translations))
+    
+    return [known.get(text, '') for text in texts]
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Translate menu_translations_en.csv to ES, FR and AR')
+    parser.add_argument('--update-locales', action='store_true',
+                        help='also add the menu keys to public/locales/*.csv, English included '
+                             '(default: only menu_translations_{lang}.csv)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    # Read English menu translations
+    with open('menu_translations_en.csv', 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        menu_items = list(reader)
+    
+    print(f"Loaded {len(menu_items)} menu translations")
+    
+    menus = {'en': {item['key']: item['translation'] for item in menu_items if item['translation']}}
+    
+    # Translate to Spanish, French, and Arabic
+    for target_lang, lang_name in [('es', 'Spanish'), ('fr', 'French'), ('ar', 'Arabic')]:
+        print(f"\nTranslating to {lang_name}...")
         
-        translated_lines = response.choices[0].message.content.strip().split('\n')
+        translations = []
         
-        # Clean up numbering if present
-        cleaned_translations = []
-        for line in translated_lines:
-            # Remove leading numbers like "1. ", "2. ", etc.
-            cleaned = line.strip()
-            if cleaned and cleaned[0].isdigit():
-                # Find the first non-digit, non-dot, non-space character
-                for j, char in enumerate(cleaned):
-                    if char not in '0123456789. ':
-                        cleaned = cleaned[j:]
-                        break
-            cleaned_translations.append(cleaned)
+        # Pack batches to a token budget rather than a fixed number of items
+        batches = pack_batches([item['translation'] for item in menu_items])
+        for batch_num, batch_indexes in enumerate(batches, 1):
+            batch = [menu_items[idx] for idx in batch_indexes]
+            
+            # Prepare batch for translation
+            texts_to_translate = [item['translation'] for item in batch]
+            
+            batch_translations = translate_batch(texts_to_translate, target_lang, lang_name)
+            
+            for item, translation in zip(batch, batch_translations):
+                translations.append({
+                    'key': item['key'],
+                    'translation': translation
+                })
+            
+            print(f"  Batch {batch_num}/{len(batches)} done")
         
-        for item, translation in zip(batch, cleaned_translations):
-            translations.append({
-                'key': item['key'],
-                'translation': translation
-            })
+        # Write to file
+        output_file = f'menu_translations_{target_lang}.csv'
+        with open(output_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['key', 'translation'])
+            writer.writeheader()
+            writer.writerows(translations)
         
-        print(f"  Batch {i//batch_size + 1}/{(len(menu_items) + batch_size - 1)//batch_size} done")
+        menus[target_lang] = {item['key']: item['translation'] for item in translations if item['translation']}
+        print(f"✓ Saved {output_file}")
     
-    # Write to file
-    output_file = f'menu_translations_{target_lang}.csv'
-    with open(output_file, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['key', 'translation'])
-        writer.writeheader()
-        writer.writerows(translations)
+    catalogue = TranslationCatalogue()
+    if args.update_locales:
+        # Every locale, English included, gets the menu keys so they stay aligned
+        changed = {lang: catalogue.update(lang, translations) for lang, translations in menus.items()}
+        for lang, count in changed.items():
+            if count:
+                catalogue.export_locale(lang)
+        print("\nUpdated locale files: " + ', '.join(f"{lang.upper()} {count}" for lang, count in changed.items()))
+    else:
+        # Kept as machine translations; the locale files are left alone
+        for lang, translations in menus.items():
+            if lang != 'en':
+                catalogue.record(lang, translations)
+    catalogue.close()
     
-    print(f"✓ Saved {output_file}")
+    print("\n✓ All menu translations completed!")
+    print(memory.summary())
+    memory.close()
 
-print("\n✓ All menu translations completed!")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Token-budget batching and ID-tagged structured replies for the translate_*.py scripts
+Each text is sent as {"id", "text"} and the model answers with the same ids, so a
+merged, missing or extra line only costs a re-request of the affected ids
+"""
+
+import re
+import json
+
+# Estimated source tokens per request, including per-item JSON overhead
+DEFAULT_TOKEN_BUDGET = 1000
+ITEM_OVERHEAD_TOKENS = 8
+
+# First request plus re-requests for ids that came back missing or invalid
+MAX_ATTEMPTS = 3
+
+RESPONSE_INSTRUCTIONS = """The texts are given as a JSON array of objects with an "id" and a "text".
+Return ONLY a JSON object of the form {"translations": [{"id": <id>, "text": "<translation>"}]}
+with exactly one entry for every input id."""
+
+CODE_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+def pack_batches(texts, token_budget=DEFAULT_TOKEN_BUDGET, max_items=None):
+    """
+    Greedily pack texts, in order, into batches that fit the token budget.
+    
+    Returns a list of index lists. A single text larger than the budget still
+    gets a batch of its own.
+    """
+    batches = []
+    current = []
+    used = 0
+    
+    for idx, text in enumerate(texts):
+        cost = estimate_tokens(text) + ITEM_OVERHEAD_TOKENS
+        full = max_items is not None and len(current) >= max_items
+        if current and (used + cost > token_budget or full):
+            batches.append(current)
+            current = []
+            used = 0
+        current.append(idx)
+        used += cost
+    
+    if current:
+        batches.append(current)
+    
+    return batches
+
+def format_items(items):
+    """Render {id: text} as the JSON array appended to the prompt"""
+    return json.dumps([{'id': item_id, 'text': text} for item_id, text in items.items()],
+                      ensure_ascii=False, indent=1)
+
+def parse_reply(content, expected_ids):
+    """
+    Extract {id: translation} from a structured reply.
+    
+    Unknown ids, duplicates after the first, and empty or non-string texts are
+    dropped so that the caller re-requests them.
+    """
+    if not content:
+        return {}
+    
+    try:
+        data = json.loads(CODE_FENCE.sub('', content.strip()))
+    except ValueError:
+        return {}
+    
+    if isinstance(data, dict):
+        data = data.get('translations', [])
+    if not isinstance(data, list):
+        return {}
+    
+    results = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        try:
+            item_id = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        text = item.get('text')
+        if item_id in expected_ids and item_id not in results and isinstance(text, str) and text.strip():
+            results[item_id] = text.strip()
+    
+    return results
+
+def translate_items(send, texts, max_attempts=MAX_ATTEMPTS):
+    """
+    Translate texts through send(items) -> reply content (or None on failure).
+    
+    Only ids missing or invalid in a reply are sent again. Returns one
+    translation per text, '' where every attempt failed.
+    """
+    pending = dict(enumerate(texts))
+    results = {}
+    
+    for _ in range(max_attempts):
+        if not pending:
+            break
+        results.update(parse_reply(send(pending), pending))
+        pending = {item_id: text for item_id, text in pending.items() if item_id not in results}
+    
+    return [results.get(item_id, '') for item_id in range(len(texts))]
+
+async def translate_items_async(send, texts, max_attempts=MAX_ATTEMPTS):
+    """translate_items for an async send(items) coroutine"""
+    pending = dict(enumerate(texts))
+    results = {}
+    
+    for _ in range(max_attempts):
+        if not pending:
+            break
+        results.update(parse_reply(await send(pending), pending))
+        pending = {item_id: text for item_id, text in pending.items() if item_id not in results}
+    
+    return [results.get(item_id, '') for item_id in range(len(texts))]
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Indexed translation catalogue shared by extract_translations.py and the translate_*.py scripts
+One SQLite store of every string (key -> extracted English source, context, screen)
+and every translation (key, locale), replacing the CSVs each script used to re-parse
+and rewrite in full. Lookups, deltas and updates are indexed queries; the CSV formats
+(template, wide key,en,es,fr,ar tables and key,translation locale files) are exports.
+
+The template and public/locales/*.csv remain the files people edit and commit: the
+catalogue records their size and mtime and re-imports any that changed behind its
+back, so a hand edit or an upload always wins over what the catalogue held.
+Machine translations from full translate_*.py runs are kept in a separate table
+that re-imports never touch; they feed the derived CSVs (translations_complete*.csv,
+*_final.csv) but reach the locale files only through --delta or --update-locales.
+
+Usage:
+    python3 translation_catalogue.py export             # regenerate every CSV that differs
+    python3 translation_catalogue.py diff               # what an export would change
+    python3 translation_catalogue.py get common.save reporting.
+    python3 translation_catalogue.py import             # rebuild from the CSVs
+"""
+
+import io
+import os
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+from locale_files import LANGUAGES, detect_line_terminator, parse_locale, read_locale, update_locale, write_bytes
+
+CATALOGUE_FILE = '.translation_catalogue.sqlite'
+
+TEMPLATE_FILE = 'translations_template.csv'
+TEMPLATE_FIELDS = ['key', 'en', 'es', 'fr', 'ar', 'context', 'screen']
+LOCALE_FILES = 'public/locales/{lang}.csv'
+
+# Every CSV the catalogue regenerates: (path, format, scope). Scope picks the keys:
+# 'extracted' = the current template, 'all' = every key of the locale (in file order),
+# 'file' = the keys the file already lists, in its order
+EXPORTS = [
+    (TEMPLATE_FILE, 'template', 'extracted'),
+    ('public/translations_template.csv', 'template', 'extracted'),
+    ('translations_complete_all.csv', 'wide', 'extracted'),
+    ('translations_complete.csv', 'wide', 'file'),
+    (LOCALE_FILES, 'locale', 'all'),
+    ('{lang}_final.csv', 'locale', 'file'),
+]
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_CHUNK = 500
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def render_csv(header, rows, line_terminator):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator=line_terminator)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+class TranslationCatalogue:
+    """SQLite store of strings (key -> source, context, screen) and translations (key, lang)"""
+    
+    def __init__(self, path=CATALOGUE_FILE, template=TEMPLATE_FILE, locale_files=LOCALE_FILES,
+                 languages=LANGUAGES, sync=True):
+        self.path = path
+        self.template = template
+        self.locale_files = locale_files
+        self.languages = list(languages)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS strings (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                context TEXT NOT NULL,
+                screen TEXT NOT NULL,
+                extracted INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS strings_extracted ON strings (extracted, key);
+            
+            CREATE TABLE IF NOT EXISTS translations (
+                lang TEXT NOT NULL,
+                key TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (lang, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS translations_key ON translations (key);
+            CREATE INDEX IF NOT EXISTS translations_position ON translations (lang, position);
+            
+            CREATE TABLE IF NOT EXISTS generated (
+                lang TEXT NOT NULL,
+                key TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (lang, key)
+            ) WITHOUT ROWID;
+            
+            -- What the derived exports show: a machine translation newer than the
+            -- locale file's row, else the locale file's row
+            CREATE VIEW IF NOT EXISTS latest_translations AS
+            SELECT g.lang, g.key, g.translation FROM generated g
+            WHERE NOT EXISTS (SELECT 1 FROM translations t
+                              WHERE t.lang = g.lang AND t.key = g.key AND t.updated_at >= g.updated_at)
+            UNION ALL
+            SELECT t.lang, t.key, t.translation FROM translations t
+            WHERE NOT EXISTS (SELECT 1 FROM generated g
+                              WHERE g.lang = t.lang AND g.key = t.key AND g.updated_at > t.updated_at);
+            
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                lang TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+        self.imported = self.sync_sources() if sync else []
+    
+    # Source CSVs
+    
+    def source_paths(self):
+        """{path: lang} of the files the catalogue imports (lang None for the template)"""
+        paths = {self.template: None}
+        paths.update({self.locale_files.format(lang=lang): lang for lang in self.languages})
+        return paths
+    
+    def sync_sources(self, force=False):
+        """Re-import source CSVs whose size or mtime changed since the catalogue last saw them"""
+        known = {path: (mtime_ns, size) for path, mtime_ns, size
+                 in self.conn.execute("SELECT path, mtime_ns, size FROM sources")}
+        imported = []
+        for path, lang in self.source_paths().items():
+            signature = file_signature(path)
+            if signature is None or (not force and known.get(path) == signature):
+                continue
+            if lang is None:
+                self.import_template(path)
+            else:
+                self.import_locale(lang, path)
+            imported.append(path)
+        return imported
+    
+    def mark_source(self, path):
+        """
+        Record the current signature of a source file just imported or written.
+        
+        Only one file per language is current: importing the locale from another
+        --locale-files pattern forgets the old one, so switching back re-imports it.
+        """
+        paths = self.source_paths()
+        signature = file_signature(path)
+        if signature is None or path not in paths:
+            return
+        lang = paths[path] or ''
+        with self.conn:
+            self.conn.execute("DELETE FROM sources WHERE lang = ? AND path != ?", (lang, path))
+            self.conn.execute("INSERT OR REPLACE INTO sources (path, lang, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                              (path, lang, *signature))
+    
+    def import_template(self, path):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            stats = self.sync_extraction(csv.DictReader(f))
+        self.mark_source(path)
+        return stats
+    
+    def import_locale(self, lang, path):
+        """
+        Replace a locale with the content of its key,translation CSV.
+        
+        Rows whose translation did not change keep their updated_at, so touching
+        the file does not make it look newer than the machine translations.
+        """
+        now = time.time()
+        with self.conn:
+            previous = {key: (translation, updated_at) for key, translation, updated_at in self.conn.execute(
+                "SELECT key, translation, updated_at FROM translations WHERE lang = ?", (lang,))}
+            self.conn.execute("DELETE FROM translations WHERE lang = ?", (lang,))
+            self.conn.executemany(
+                "INSERT INTO translations (lang, key, translation, position, updated_at) VALUES (?, ?, ?, ?, ?)",
+                ((lang, key, translation, position,
+                  previous[key][1] if previous.get(key, (None,))[0] == translation else now)
+                 for position, (key, translation) in enumerate(read_locale(path).items()))
+            )
+        self.mark_source(path)
+    
+    # Strings
+    
+    def sync_extraction(self, strings):
+        """
+        Make the extracted strings exactly the given rows (dicts with key, en, context, screen).
+        
+        Keys no longer extracted keep their row (and translations) with extracted = 0.
+        Returns {'added', 'changed', 'removed'} key counts.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS extraction "
+                              "(key TEXT PRIMARY KEY, source TEXT, context TEXT, screen TEXT)")
+            self.conn.execute("DELETE FROM extraction")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO extraction VALUES (?, ?, ?, ?)",
+                ((row['key'], row['en'], row.get('context') or '', row.get('screen') or '') for row in strings)
+            )
+            (added,), = self.conn.execute(
+                "SELECT count(*) FROM extraction e LEFT JOIN strings s ON s.key = e.key "
+                "WHERE s.key IS NULL OR NOT s.extracted")
+            (changed,), = self.conn.execute(
+                "SELECT count(*) FROM extraction e JOIN strings s ON s.key = e.key "
+                "WHERE s.extracted AND (s.source, s.context, s.screen) IS NOT (e.source, e.context, e.screen)")
+            removed = self.conn.execute(
+                "UPDATE strings SET extracted = 0, updated_at = ? "
+                "WHERE extracted AND key NOT IN (SELECT key FROM extraction)", (now,)).rowcount
+            self.conn.execute(
+                "INSERT INTO strings (key, source, context, screen, extracted, updated_at) "
+                "SELECT key, source, context, screen, 1, ? FROM extraction WHERE true "
+                "ON CONFLICT (key) DO UPDATE SET source = excluded.source, context = excluded.context, "
+                "screen = excluded.screen, extracted = 1, updated_at = excluded.updated_at "
+                "WHERE NOT extracted OR (source, context, screen) IS NOT "
+                "(excluded.source, excluded.context, excluded.screen)", (now,))
+        return {'added': added, 'changed': changed, 'removed': removed}
+    
+    def extracted(self):
+        """The template rows, sorted by key: [{'key', 'en', 'context', 'screen'}]"""
+        return [{'key': key, 'en': source, 'context': context, 'screen': screen}
+                for key, source, context, screen in self.conn.execute(
+                    "SELECT key, source, context, screen FROM strings WHERE extracted ORDER BY key")]
+    
+    # Translations
+    
+    def lookup(self, keys, lang):
+        """{key: translation} for the given keys that have one in lang"""
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(unique), LOOKUP_CHUNK):
+            chunk = unique[i:i + LOOKUP_CHUNK]
+            found.update(self.conn.execute(
+                f"SELECT key, translation FROM translations WHERE lang = ? "
+                f"AND key IN ({','.join('?' * len(chunk))})", [lang, *chunk]))
+        return found
+    
+    def locale(self, lang):
+        """{key: translation} of a locale in file order"""
+        return dict(self.conn.execute(
+            "SELECT key, translation FROM translations WHERE lang = ? ORDER BY position", (lang,)))
+    
+    def prefix(self, prefix):
+        """{key: {lang: translation}} for every key starting with prefix (an index range scan)"""
+        found = {}
+        for key, lang, translation in self.conn.execute(
+                "SELECT key, lang, translation FROM translations WHERE key >= ? AND key < ? ORDER BY key",
+                (prefix, prefix + '\U0010ffff')):
+            found.setdefault(key, {})[lang] = translation
+        return found
+    
+    def update(self, lang, translations):
+        """
+        Apply {key: translation} to a locale.
+        
+        Existing keys keep their position, new ones are appended in the order
+        given, like locale_files.update_locale. Returns the number of keys whose
+        translation was added or changed. Follow with export_locale: a changed
+        locale file is re-imported, replacing whatever was not written to it.
+        Machine translations that should not reach the locale files go through
+        record instead.
+        """
+        now = time.time()
+        with self.conn:
+            (position,), = self.conn.execute(
+                "SELECT coalesce(max(position), -1) FROM translations WHERE lang = ?", (lang,))
+            changed = 0
+            for key, translation in translations.items():
+                cursor = self.conn.execute(
+                    "UPDATE translations SET translation = ?, updated_at = ? "
+                    "WHERE lang = ? AND key = ? AND translation IS NOT ?", (translation, now, lang, key, translation))
+                if cursor.rowcount:
+                    changed += 1
+                    continue
+                position += 1
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO translations (lang, key, translation, position, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)", (lang, key, translation, position, now))
+                changed += cursor.rowcount
+        return changed
+    
+    def record(self, lang, translations):
+        """
+        Keep {key: translation} machine translations of lang apart from the locale files.
+        
+        They survive re-imports and show in the derived exports until the locale
+        file's row for the key is newer. Returns the number of keys added or changed.
+        """
+        now = time.time()
+        with self.conn:
+            changed = 0
+            for key, translation in translations.items():
+                cursor = self.conn.execute(
+                    "INSERT INTO generated (lang, key, translation, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (lang, key) DO UPDATE SET translation = excluded.translation, "
+                    "updated_at = excluded.updated_at WHERE translation IS NOT excluded.translation",
+                    (lang, key, translation, now))
+                changed += cursor.rowcount
+        return changed
+    
+    def classify_delta(self, languages):
+        """
+        Compare the extracted strings against the locales, as translate_all --delta does.
+        
+        Returns sets of keys: 'new' (no English translation), 'changed' (English
+        differs from the extracted source), 'missing' (empty or absent in one of
+        languages) and 'stale' (in the English locale but no longer extracted).
+        """
+        joins = ''.join(f" LEFT JOIN translations t{i} ON t{i}.lang = '{lang}' AND t{i}.key = s.key"
+                        for i, lang in enumerate(languages))
+        missing = ' OR '.join(f"coalesce(t{i}.translation, '') = ''" for i in range(len(languages))) or '0'
+        delta = {'new': set(), 'changed': set(), 'missing': set()}
+        for key, english, source, is_missing in self.conn.execute(
+                f"SELECT s.key, en.translation, s.source, {missing} FROM strings s "
+                f"LEFT JOIN translations en ON en.lang = 'en' AND en.key = s.key{joins} WHERE s.extracted"):
+            if english is None:
+                delta['new'].add(key)
+            elif english != source.strip():
+                delta['changed'].add(key)
+            elif is_missing:
+                delta['missing'].add(key)
+        delta['stale'] = {key for key, in self.conn.execute(
+            "SELECT t.key FROM translations t LEFT JOIN strings s ON s.key = t.key "
+            "WHERE t.lang = 'en' AND NOT coalesce(s.extracted, 0)")}
+        return delta
+    
+    # Exports
+    
+    def scoped_keys(self, keys):
+        """Load an explicit key order into the temp table the 'file' scope joins against"""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS scope (position INTEGER PRIMARY KEY, key TEXT)")
+        self.conn.execute("DELETE FROM scope")
+        self.conn.executemany("INSERT INTO scope (key) VALUES (?)", ((key,) for key in keys))
+    
+    def export_rows(self, fmt, scope, lang=None, path=None):
+        """
+        (header, rows) of an export.
+        
+        The 'file' scope reads the key order from path; keys the catalogue does
+        not know keep the row the file has. The locale files themselves ('locale'
+        format, 'all' scope) only get their own rows; every other export also shows
+        newer machine translations (latest_translations).
+        """
+        existing = {}
+        if scope == 'file':
+            if fmt == 'locale':
+                existing = {key: [translation] for key, translation in read_locale(path).items()}
+            else:
+                with open(path, 'r', encoding='utf-8', newline='') as f:
+                    reader = csv.reader(f)
+                    next(reader, None)
+                    existing = {row[0]: row[1:] for row in reader if row and row[0]}
+            self.scoped_keys(existing)
+        
+        if fmt == 'template':
+            return TEMPLATE_FIELDS, self.conn.execute(
+                "SELECT key, source, '', '', '', context, screen FROM strings WHERE extracted ORDER BY key")
+        
+        if fmt == 'locale':
+            if scope == 'all':
+                rows = self.conn.execute(
+                    "SELECT key, translation FROM translations WHERE lang = ? ORDER BY position", (lang,))
+            elif scope == 'extracted':
+                rows = self.conn.execute(
+                    "SELECT s.key, coalesce(t.translation, '') FROM strings s LEFT JOIN latest_translations t "
+                    "ON t.lang = ? AND t.key = s.key WHERE s.extracted ORDER BY s.key", (lang,))
+            else:
+                rows = ([key] + existing[key] if translation is None else [key, translation]
+                        for key, translation in self.conn.execute(
+                            "SELECT k.key, t.translation FROM scope k LEFT JOIN latest_translations t "
+                            "ON t.lang = ? AND t.key = k.key ORDER BY k.position", (lang,)))
+            return ['key', 'translation'], rows
+        
+        # Wide key,en,es,fr,ar: en is the extracted source, else the English translation
+        others = [other for other in self.languages if other != 'en']
+        columns = ''.join(f", coalesce(t{i}.translation, '')" for i in range(len(others)))
+        joins = ''.join(f" LEFT JOIN latest_translations t{i} ON t{i}.lang = '{other}' AND t{i}.key = k.key"
+                        for i, other in enumerate(others))
+        header = ['key', 'en'] + others
+        if scope == 'extracted':
+            return header, self.conn.execute(
+                f"SELECT k.key, k.source{columns} FROM strings k{joins} WHERE k.extracted ORDER BY k.key")
+        rows = self.conn.execute(
+            f"SELECT k.key, s.key IS NOT NULL OR EXISTS (SELECT 1 FROM latest_translations x WHERE x.key = k.key), "
+            f"coalesce(CASE WHEN s.extracted THEN s.source END, en.translation, ''){columns} FROM scope k "
+            f"LEFT JOIN strings s ON s.key = k.key "
+            f"LEFT JOIN latest_translations en ON en.lang = 'en' AND en.key = k.key{joins} ORDER BY k.position")
+        return header, ([key] + existing[key] if not known else [key, *values] for key, known, *values in rows)
+    
+    def locale_updates(self, lang, path):
+        """{key: translation} where the catalogue differs from an existing locale file"""
+        current = read_locale(path)
+        return {key: translation for key, translation in self.locale(lang).items()
+                if current.get(key) != translation}
+    
+    def render(self, path, fmt, scope, lang=None):
+        """The bytes an export would write to path (None when a 'file' scope has no file yet)"""
+        if scope == 'file' and not os.path.exists(path):
+            return None
+        header, rows = self.export_rows(fmt, scope, lang, path)
+        return render_csv(header, rows, detect_line_terminator(path))
+    
+    def export(self, path, fmt, scope='all', lang=None):
+        """
+        Write one export if its content changed; returns True when the file was written.
+        
+        An existing locale file is patched with update_locale, so hand-made
+        formatting of the rows the catalogue agrees with is left alone.
+        """
+        if fmt == 'locale' and scope == 'all' and os.path.exists(path):
+            updates = self.locale_updates(lang, path)
+            written = bool(updates) and update_locale(path, updates) > 0
+        else:
+            data = self.render(path, fmt, scope, lang)
+            if data is None:
+                return False
+            written = write_bytes(path, data)
+        self.mark_source(path)
+        return written
+    
+    def export_locale(self, lang):
+        """Patch the catalogue's locale file for lang with the rows applied by update"""
+        return self.export(self.locale_files.format(lang=lang), 'locale', 'all', lang)
+    
+    def targets(self, exports=EXPORTS):
+        """(path, format, scope, lang) of every configured export, per language for {lang} paths"""
+        for path, fmt, scope in exports:
+            if path == LOCALE_FILES:
+                path = self.locale_files
+            if '{lang}' in path:
+                for lang in self.languages:
+                    yield path.format(lang=lang), fmt, scope, lang
+            else:
+                yield path, fmt, scope, None
+    
+    def export_all(self, exports=EXPORTS):
+        """Regenerate every export; returns the paths that were written"""
+        return [path for path, fmt, scope, lang in self.targets(exports)
+                if self.export(path, fmt, scope, lang)]
+    
+    def summary(self):
+        (strings,), = self.conn.execute("SELECT count(*) FROM strings WHERE extracted")
+        counts = dict(self.conn.execute(
+            "SELECT lang, count(*) FROM translations WHERE translation != '' GROUP BY lang"))
+        pending = dict(self.conn.execute(
+            "SELECT g.lang, count(*) FROM generated g LEFT JOIN translations t ON t.lang = g.lang AND t.key = g.key "
+            "WHERE g.updated_at > coalesce(t.updated_at, 0) AND g.translation IS NOT t.translation GROUP BY g.lang"))
+        summary = (f"Translation catalogue: {strings} extracted strings; "
+                   + ', '.join(f"{lang.upper()} {counts.get(lang, 0)}" for lang in self.languages))
+        if pending:
+            summary += ("; machine translations not in the locale files: "
+                        + ', '.join(f"{lang.upper()} {count}" for lang, count in sorted(pending.items())))
+        return summary
+    
+    def close(self):
+        self.conn.close()
+
+def diff_rows(old, new, fmt):
+    """(added, removed, changed) row counts between two renderings of a CSV, by key"""
+    def rows(data):
+        lines = io.StringIO(data.decode('utf-8'))
+        if fmt == 'locale':
+            return parse_locale(lines)
+        reader = csv.reader(lines)
+        next(reader, None)
+        return {row[0]: row[1:] for row in reader if row}
+    old, new = rows(old), rows(new)
+    changed = sum(1 for key in old.keys() & new.keys() if old[key] != new[key])
+    return len(new.keys() - old.keys()), len(old.keys() - new.keys()), changed
+
+def run_diff(catalogue):
+    """Print what export would change; returns the number of files that differ"""
+    stale = 0
+    for path, fmt, scope, lang in catalogue.targets():
+        if fmt == 'locale' and scope == 'all' and os.path.exists(path):
+            updates = catalogue.locale_updates(lang, path)
+            if updates:
+                stale += 1
+                print(f"  {path}: {len(updates)} rows to add or update")
+            continue
+        new = catalogue.render(path, fmt, scope, lang)
+        if new is None:
+            continue
+        try:
+            with open(path, 'rb') as f:
+                old = f.read()
+        except OSError:
+            old = None
+        if old == new:
+            continue
+        stale += 1
+        if old is None:
+            print(f"  {path}: new file")
+            continue
+        added, removed, changed = diff_rows(old, new, fmt)
+        print(f"  {path}: +{added} -{removed} ~{changed} rows"
+              + ('' if added or removed or changed else ' (formatting only)'))
+    return stale
+
+def run_get(catalogue, keys):
+    """Print the translations of keys; arguments ending with '.' are namespace prefixes"""
+    for key in keys:
+        entries = catalogue.prefix(key) if key.endswith('.') else {key: {
+            lang: translation for lang in catalogue.languages
+            for translation in catalogue.lookup([key], lang).values()}}
+        for found, translations in entries.items():
+            if not translations:
+                print(f"❌ {found}: not in the catalogue")
+                continue
+            print(found)
+            for lang in catalogue.languages:
+                print(f"   {lang}: {translations.get(lang, '')}")
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Query and export the translation catalogue')
+    parser.add_argument('command', choices=['import', 'export', 'diff', 'get', 'stats'])
+    parser.add_argument('keys', nargs='*', help="with get: keys, or namespace prefixes ending with '.'")
+    parser.add_argument('--catalogue', default=CATALOGUE_FILE,
+                        help=f'catalogue database (default: {CATALOGUE_FILE})')
+    parser.add_argument('--locale-files', default=LOCALE_FILES,
+                        help=f'locale file pattern imported and exported (default: {LOCALE_FILES})')
+    args = parser.parse_args(argv)
+    if args.command == 'get' and not args.keys:
+        parser.error('get needs at least one key')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    catalogue = TranslationCatalogue(args.catalogue, locale_files=args.locale_files)
+    if catalogue.imported and args.command != 'import':
+        print(f"Imported {len(catalogue.imported)} changed source file(s): {', '.join(catalogue.imported)}")
+    
+    if args.command == 'import':
+        imported = catalogue.sync_sources(force=True)
+        print(f"✅ Imported {', '.join(imported)} in {time.perf_counter() - start:.2f}s")
+        print(f"   {catalogue.summary()}")
+    elif args.command == 'export':
+        written = catalogue.export_all()
+        for path in written:
+            print(f"  wrote {path}")
+        print(f"✅ {len(written)} file(s) regenerated, the rest already matched "
+              f"({time.perf_counter() - start:.2f}s)")
+    elif args.command == 'diff':
+        stale = run_diff(catalogue)
+        print(f"{'⚠️ ' if stale else '✅'} {stale} file(s) differ from the catalogue")
+        catalogue.close()
+        sys.exit(1 if stale else 0)
+    elif args.command == 'get':
+        run_get(catalogue, args.keys)
+    else:
+        print(catalogue.summary())
+    catalogue.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Append-only journal of completed translation batches for the translate_*.py scripts
+Each finished (language, batch) pair is written and fsynced as soon as it completes,
+so an interrupted run can be resumed without paying for the same batches again
+"""
+
+import os
+import json
+import hashlib
+
+def run_fingerprint(*parts):
+    """Hash of everything that defines a run's batches; a resume must match it"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class TranslationJournal:
+    """JSONL journal: a header line with the run fingerprint, then one line per batch"""
+    
+    def __init__(self, path, fingerprint, resume=False):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.completed = {}
+        
+        if resume and os.path.exists(path) and self.replay():
+            self.file = open(path, 'a', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+            self.write({'fingerprint': fingerprint})
+    
+    def replay(self):
+        """
+        Load completed batches, dropping a torn last line from a crash.
+        
+        Returns False when the run crashed before its header was written, so
+        there is nothing to resume and the journal is started afresh.
+        """
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+        
+        if not end:
+            print(f"⚠️  {self.path} has no header (the run stopped while starting it); starting over")
+            return False
+        lines = data[:end].decode('utf-8').split('\n')
+        
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            raise SystemExit(f"❌ {self.path} has no readable header; run without --resume to start over")
+        
+        if header.get('fingerprint') != self.fingerprint:
+            raise SystemExit(f"❌ {self.path} belongs to a different run (input, batching or prompts "
+                             f"changed); run without --resume to start over")
+        
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self.completed[(entry['lang'], entry['batch'])] = entry['translations']
+        return True
+    
+    def write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    
+    def get(self, lang, batch_num):
+        """Journaled translations for a batch, or None if it still has to run"""
+        return self.completed.get((lang, batch_num))
+    
+    def record(self, lang, batch_num, translations):
+        self.completed[(lang, batch_num)] = translations
+        self.write({'lang': lang, 'batch': batch_num, 'translations': translations})
+    
+    def finish(self):
+        """Remove the journal once the run's output has been written"""
+        self.file.close()
+        os.remove(self.path)
+    
+    def close(self):
+        self.file.close()
@@ -0,0 +1,80 @@
+"""
+Local translation memory shared by the translate_*.py scripts
+Stores model output keyed by source text, target language, model and prompt version
+so repeat runs only send strings that were never translated before
+"""
+
+import time
+import sqlite3
+import hashlib
+
+MEMORY_FILE = '.translation_memory.sqlite'
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_CHUNK = 500
+
+def prompt_fingerprint(*parts):
+    """Short hash of the prompt text, so editing a prompt invalidates old entries"""
+    digest = hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+    return digest[:12]
+
+class TranslationMemory:
+    """SQLite-backed cache of (source, target_lang, model, prompt_version) -> translation"""
+    
+    def __init__(self, path=MEMORY_FILE):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (source, target_lang, model, prompt_version)
+            )
+        """)
+        self.conn.commit()
+    
+    def lookup(self, texts, target_lang, model, prompt_version):
+        """Return {source: translation} for every text already in memory"""
+        unique = list(dict.fromkeys(texts))
+        found = {}
+        
+        for i in range(0, len(unique), LOOKUP_CHUNK):
+            chunk = unique[i:i + LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT source, translation FROM translations "
+                f"WHERE target_lang = ? AND model = ? AND prompt_version = ? "
+                f"AND source IN ({placeholders})",
+                [target_lang, model, prompt_version, *chunk]
+            )
+            found.update(rows)
+        
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+    
+    def store(self, pairs, target_lang, model, prompt_version):
+        """Remember (source, translation) pairs; empty translations are skipped"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO translations "
+            "(source, target_lang, model, prompt_version, translation, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(source, target_lang, model, prompt_version, translation, now)
+             for source, translation in pairs if source and translation]
+        )
+        self.conn.commit()
+    
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"Translation memory: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
+    
+    def close(self):
+        self.conn.close()
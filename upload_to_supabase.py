@@ -1,10 +1,29 @@
 #!/usr/bin/env python3
 """
 Upload translation CSV files to Supabase Storage
+
+--sync uploads every locale in public/locales, skipping files whose content hash
+matches the manifest.json kept in the bucket; changed files are uploaded
+concurrently over keep-alive connections with retries, so an unchanged deploy
+costs a single manifest request.
+
+--versioned publishes content-addressed {lang}.{hash}.csv files that clients can
+cache as immutable, a no-cache locales.json pointing at the current versions, and
+key-level patches between consecutive versions.
 """
 
 import os
-from supabase import create_client, Client
+import glob
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit, quote
+from concurrent.futures import ThreadPoolExecutor
+from locale_files import LOCALES_DIR, parse_locale
 
 # Get Supabase credentials from environment
 SUPABASE_URL = os.getenv('SUPABASE_URL')
@@ -15,8 +34,35 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     print("   Please provide Supabase credentials")
     exit(1)
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+BUCKET = 'translations'
+
+# Content hashes of the uploaded locales, stored next to them in the bucket
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# --versioned: immutable fingerprinted locales, a short-lived manifest pointing at
+# them, and key-level patches between consecutive versions
+VERSIONS_MANIFEST = 'locales.json'
+FINGERPRINT_LENGTH = 12
+MAX_PATCHES = 5
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+MANIFEST_CACHE = 'no-cache'
+
+# Retry rate limits, server errors and dropped connections with exponential backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Supabase client for the one-file-at-a-time upload, created on first use
+supabase = None
+
+def get_client():
+    global supabase
+    if supabase is None:
+        from supabase import create_client
+        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return supabase
 
 def upload_file(file_path, bucket='translations'):
     """Upload a file to Supabase Storage"""
@@ -32,12 +78,12 @@ def upload_file(file_path, bucket='translations'):
         
         # Delete existing file if it exists
         try:
-            supabase.storage.from_(bucket).remove([file_name])
+            get_client().storage.from_(bucket).remove([file_name])
         except:
             pass  # File might not exist
         
         # Upload new file
-        result = supabase.storage.from_(bucket).upload(
+        result = get_client().storage.from_(bucket).upload(
             file_name,
             file_content,
             file_options={"content-type": "text/csv"}
@@ -45,12 +91,379 @@ def upload_file(file_path, bucket='translations'):
         
         print(" ✓")
         return True
-        
+    
     except Exception as e:
         print(f" ✗ Error: {e}")
         return False
 
-def main():
+class StorageError(Exception):
+    """A Storage API request that failed after all retries"""
+    
+    def __init__(self, status, message):
+        super().__init__(f"{status or 'connection'}: {message}")
+        self.status = status
+
+def retry_delay(attempt, retry_after=None):
+    """Backoff for the given attempt, honouring a Retry-After header when present"""
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = BACKOFF_BASE * 2 ** attempt
+    delay = min(delay, BACKOFF_MAX)
+    return delay + random.uniform(0, delay * 0.1)
+
+class StorageSession:
+    """
+    Minimal Supabase Storage REST client.
+    
+    Each worker thread keeps one keep-alive connection that is reused for all of
+    its requests; retryable failures are retried with backoff.
+    """
+    
+    def __init__(self, url, key, timeout=30):
+        parts = urlsplit(url)
+        self.connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                                 else http.client.HTTPConnection)
+        self.host = parts.netloc
+        self.base_path = parts.path.rstrip('/') + '/storage/v1'
+        self.headers = {'Authorization': f'Bearer {key}', 'apikey': key}
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.requests = 0
+        self.retries = 0
+    
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.connection_class(self.host, timeout=self.timeout)
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+    
+    def reset(self):
+        """Drop this thread's connection after a network error"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+    
+    def request(self, method, path, body=None, headers=None):
+        """Send a request, returning (status, body) of the final attempt"""
+        for attempt in range(MAX_RETRIES + 1):
+            with self.lock:
+                self.requests += 1
+            try:
+                conn = self.connection()
+                conn.request(method, self.base_path + path, body=body,
+                             headers={**self.headers, **(headers or {})})
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.reset()
+                if attempt == MAX_RETRIES:
+                    raise StorageError(None, e)
+                retry_after = None
+            else:
+                if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    return response.status, data
+                retry_after = response.getheader('Retry-After')
+            
+            with self.lock:
+                self.retries += 1
+            time.sleep(retry_delay(attempt, retry_after))
+    
+    def object_path(self, bucket, name):
+        return f"/object/{quote(bucket)}/{quote(name)}"
+    
+    def download(self, bucket, name):
+        """Object content, or None if it does not exist"""
+        status, data = self.request('GET', self.object_path(bucket, name))
+        if status == 200:
+            return data
+        if is_not_found(status, data):
+            return None
+        raise StorageError(status, data.decode('utf-8', 'replace'))
+    
+    def upload(self, bucket, name, data, content_type, cache_control=None):
+        """Create or overwrite an object in a single request"""
+        headers = {'Content-Type': content_type, 'x-upsert': 'true'}
+        if cache_control:
+            headers['Cache-Control'] = cache_control
+        status, body = self.request('POST', self.object_path(bucket, name), body=data, headers=headers)
+        if status not in (200, 201):
+            raise StorageError(status, body.decode('utf-8', 'replace'))
+    
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+
+def is_not_found(status, data):
+    """Storage reports a missing object as 404, or as 400 with a 404 statusCode in the body"""
+    if status == 404:
+        return True
+    if status != 400:
+        return False
+    try:
+        error = json.loads(data)
+    except ValueError:
+        return False
+    return isinstance(error, dict) and (str(error.get('statusCode')) == '404' or error.get('error') == 'not_found')
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+def fetch_manifest(session, bucket):
+    """{name: {'sha256', 'size'}} of what the bucket currently holds"""
+    data = session.download(bucket, MANIFEST_NAME)
+    if data is None:
+        return {}
+    try:
+        manifest = json.loads(data)
+    except ValueError:
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+def sync_locales(session, paths, bucket=BUCKET, jobs=4, force=False, dry_run=False):
+    """
+    Upload the locale files whose content differs from the bucket manifest.
+    
+    Returns (uploaded, skipped, failed) lists of file names. The manifest is only
+    rewritten for files that actually uploaded, so failures are retried next run;
+    a manifest that cannot be read fails every file, one that cannot be written
+    is reported as failed itself.
+    """
+    contents = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents[os.path.basename(path)] = f.read()
+    
+    try:
+        remote = fetch_manifest(session, bucket)
+    except StorageError as e:
+        print(f"  {MANIFEST_NAME} ✗ Error: {e}")
+        return [], [], list(contents)
+    local = {name: {'sha256': file_digest(data), 'size': len(data)} for name, data in contents.items()}
+    
+    changed = [name for name in local if force or remote.get(name, {}).get('sha256') != local[name]['sha256']]
+    skipped = [name for name in local if name not in changed]
+    for name in skipped:
+        print(f"  {name} unchanged")
+    
+    if dry_run or not changed:
+        return changed if dry_run else [], skipped, []
+    
+    def upload(name):
+        started = time.perf_counter()
+        try:
+            session.upload(bucket, name, contents[name], 'text/csv')
+        except StorageError as e:
+            print(f"  {name} ✗ Error: {e}")
+            return name, False
+        print(f"  {name} ✓ ({len(contents[name]):,} bytes, {time.perf_counter() - started:.2f}s)")
+        return name, True
+    
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        results = list(executor.map(upload, changed))
+    
+    uploaded = [name for name, ok in results if ok]
+    failed = [name for name, ok in results if not ok]
+    
+    manifest = dict(remote)
+    manifest.update({name: local[name] for name in uploaded})
+    try:
+        session.upload(bucket, MANIFEST_NAME, json.dumps({
+            'version': MANIFEST_VERSION,
+            'files': dict(sorted(manifest.items())),
+        }, indent=2).encode('utf-8'), 'application/json')
+    except StorageError as e:
+        # The files are in place; without the manifest entry the next run uploads them again
+        print(f"  {MANIFEST_NAME} ✗ Error: {e}")
+        failed.append(MANIFEST_NAME)
+    
+    return uploaded, skipped, failed
+
+def fingerprinted_name(lang, digest):
+    return f"{lang}.{digest[:FINGERPRINT_LENGTH]}.csv"
+
+def locale_patch(old_data, new_data):
+    """Key-level difference between two locale CSVs: {'set': {key: value}, 'delete': [keys]}"""
+    old = parse_locale(old_data.decode('utf-8').splitlines())
+    new = parse_locale(new_data.decode('utf-8').splitlines())
+    return {
+        'set': {key: value for key, value in new.items() if old.get(key) != value},
+        'delete': sorted(key for key in old if key not in new),
+    }
+
+def publish_versioned(session, paths, bucket=BUCKET, jobs=4, dry_run=False):
+    """
+    Publish changed locales under content-addressed names.
+    
+    Each new version is uploaded as {lang}.{hash}.csv with an immutable cache
+    policy. When a previous version exists, a {lang}.{old}-{new}.patch.json with
+    the changed and deleted keys is uploaded too, and the locale's patch chain in
+    locales.json keeps the last MAX_PATCHES steps, so a client holding any recent
+    version can catch up by applying patches in order. locales.json itself is
+    uploaded last, with no-cache, once the files it points to exist.
+    
+    Returns (published, skipped, failed) lists of languages. If locales.json
+    cannot be written the new versions are unreachable, so they count as failed
+    along with locales.json itself.
+    """
+    names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    try:
+        data = session.download(bucket, VERSIONS_MANIFEST)
+    except StorageError as e:
+        print(f"  {VERSIONS_MANIFEST} ✗ Error: {e}")
+        return [], [], names
+    try:
+        remote = json.loads(data) if data else {}
+    except ValueError:
+        remote = {}
+    if remote.get('version') != MANIFEST_VERSION:
+        remote = {'version': MANIFEST_VERSION, 'locales': {}}
+    
+    contents = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    
+    changed = []
+    skipped = []
+    for lang, content in contents.items():
+        previous = remote['locales'].get(lang)
+        if previous and previous['sha256'] == file_digest(content):
+            print(f"  {lang} unchanged ({previous['file']})")
+            skipped.append(lang)
+        else:
+            changed.append(lang)
+    
+    if dry_run or not changed:
+        return changed if dry_run else [], skipped, []
+    
+    def publish(lang):
+        content = contents[lang]
+        digest = file_digest(content)
+        entry = {
+            'file': fingerprinted_name(lang, digest),
+            'sha256': digest,
+            'size': len(content),
+            'patches': [],
+        }
+        previous = remote['locales'].get(lang)
+        
+        try:
+            session.upload(bucket, entry['file'], content, 'text/csv', IMMUTABLE_CACHE)
+            
+            if previous:
+                old_content = session.download(bucket, previous['file'])
+                if old_content is not None:
+                    patch = locale_patch(old_content, content)
+                    step = {
+                        'from': previous['sha256'][:FINGERPRINT_LENGTH],
+                        'to': digest[:FINGERPRINT_LENGTH],
+                        'file': f"{lang}.{previous['sha256'][:FINGERPRINT_LENGTH]}-{digest[:FINGERPRINT_LENGTH]}.patch.json",
+                        'set': len(patch['set']),
+                        'delete': len(patch['delete']),
+                    }
+                    session.upload(bucket, step['file'],
+                                   json.dumps(patch, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                                   'application/json', IMMUTABLE_CACHE)
+                    # A gap in the chain (missing old file) drops the older steps
+                    entry['patches'] = ([step] + previous.get('patches', []))[:MAX_PATCHES]
+        except StorageError as e:
+            print(f"  {lang} ✗ Error: {e}")
+            return lang, None
+        
+        patch_note = ''
+        if entry['patches']:
+            step = entry['patches'][0]
+            patch_note = f", patch {step['set']} set / {step['delete']} deleted"
+        print(f"  {lang} ✓ {entry['file']} ({len(content):,} bytes{patch_note})")
+        return lang, entry
+    
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        results = list(executor.map(publish, changed))
+    
+    published = [lang for lang, entry in results if entry]
+    failed = [lang for lang, entry in results if not entry]
+    
+    for lang, entry in results:
+        if entry:
+            remote['locales'][lang] = entry
+    remote['locales'] = dict(sorted(remote['locales'].items()))
+    remote['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    try:
+        session.upload(bucket, VERSIONS_MANIFEST, json.dumps(remote, indent=2).encode('utf-8'),
+                       'application/json', MANIFEST_CACHE)
+    except StorageError as e:
+        print(f"  {VERSIONS_MANIFEST} ✗ Error: {e}")
+        return [], skipped, failed + published + [VERSIONS_MANIFEST]
+    
+    return published, skipped, failed
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Upload translation CSV files to Supabase Storage')
+    parser.add_argument('--sync', action='store_true',
+                        help='upload only changed locales, concurrently, using the bucket manifest')
+    parser.add_argument('--dir', default=LOCALES_DIR,
+                        help=f'directory holding the locale CSVs for --sync (default: {LOCALES_DIR})')
+    parser.add_argument('--bucket', default=BUCKET, help=f'storage bucket (default: {BUCKET})')
+    parser.add_argument('--jobs', '-j', type=int, default=4,
+                        help='concurrent uploads for --sync (default: 4)')
+    parser.add_argument('--versioned', action='store_true',
+                        help=f'publish fingerprinted, immutable locales plus {VERSIONS_MANIFEST} and '
+                             f'delta patches (implies --sync)')
+    parser.add_argument('--force', action='store_true',
+                        help='with --sync, upload every locale even if the manifest matches')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='with --sync, only report which locales would be uploaded')
+    return parser.parse_args(argv)
+
+def sync(args):
+    paths = sorted(glob.glob(os.path.join(args.dir, '*.csv')))
+    if not paths:
+        print(f"❌ No locale files found in {args.dir}")
+        return
+    
+    print(f"Syncing {len(paths)} locale files from {args.dir} to Supabase Storage...")
+    print(f"Bucket: {args.bucket}")
+    print()
+    
+    session = StorageSession(SUPABASE_URL, SUPABASE_KEY)
+    start = time.perf_counter()
+    try:
+        if args.versioned:
+            uploaded, skipped, failed = publish_versioned(session, paths, args.bucket, args.jobs, args.dry_run)
+        else:
+            uploaded, skipped, failed = sync_locales(session, paths, args.bucket, args.jobs,
+                                                     args.force, args.dry_run)
+    finally:
+        session.close()
+    elapsed = time.perf_counter() - start
+    
+    print()
+    if args.dry_run:
+        print(f"Dry run: {len(uploaded)} to upload, {len(skipped)} unchanged")
+    else:
+        print(f"✅ Sync complete: {len(uploaded)} uploaded, {len(skipped)} unchanged, {len(failed)} failed")
+        print(f"   {session.requests} requests ({session.retries} retries) in {elapsed:.2f}s")
+    if failed:
+        print(f"⚠️  Failed: {', '.join(failed)}; rerun to retry them")
+        exit(1)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    if args.sync or args.versioned:
+        sync(args)
+        return
+    
     print("Uploading translation files to Supabase Storage...")
     print(f"Bucket: translations")
     print()